@@ -0,0 +1,113 @@
+"""numeric scores and pool indexes
+
+Stores every score column as NUMERIC (older rows may hold text such as
+"42.5%") and adds the indexes behind the /pools filter and sort shapes.
+Also creates pool_apy_history on databases that predate it. Downgrading
+drops that table only if this migration created it (marked with a table
+comment); a pool_apy_history that was already there keeps its history.
+
+Revision ID: 3f9c2a1d7b10
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9c2a1d7b10"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCORE_COLUMNS = {
+    "pools": ["risk_score", "final_score"],
+    "recommendations": ["score", "tvl_score", "risk_score", "final_score"],
+}
+# A number, optionally followed by "%"; anything else becomes NULL
+NUMBER_PATTERN = r"^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*%?\s*$"
+# Comment on pool_apy_history when this migration created it, so downgrade knows it may drop it
+CREATED_HERE = f"created by migration {revision}"
+
+APY_DESC = [sa.text("apy DESC NULLS LAST"), sa.text("id DESC")]
+POOL_INDEXES = [
+    ("ix_pools_apy", APY_DESC, None),
+    ("ix_pools_chain_apy", [sa.text("chain")] + APY_DESC, None),
+    ("ix_pools_project_apy", [sa.text("project")] + APY_DESC, None),
+    ("ix_pools_risk_score", ["risk_score", "id"], None),
+    ("ix_pools_chain_risk_score", ["chain", "risk_score", "id"], None),
+    ("ix_pools_project_risk_score", ["project", "risk_score", "id"], None),
+    ("ix_pools_stablecoin_apy", APY_DESC, sa.text("stablecoin IS true")),
+]
+
+
+def _to_numeric(inspector, table: str, column: str) -> None:
+    current = {c["name"]: c["type"] for c in inspector.get_columns(table)}.get(column)
+    if current is None or isinstance(current, sa.Numeric):
+        return
+    # Through text() so the "%" characters are escaped for the driver
+    op.execute(sa.text(
+        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE NUMERIC USING "
+        f"CASE WHEN {column}::text ~ '{NUMBER_PATTERN}' "
+        f"THEN rtrim(btrim({column}::text), '%')::numeric END"
+    ))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, columns in SCORE_COLUMNS.items():
+        if table in tables:
+            for column in columns:
+                _to_numeric(inspector, table, column)
+
+    if "pool_apy_history" not in tables:
+        op.create_table(
+            "pool_apy_history",
+            sa.Column("pool_id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("timestamp", sa.TIMESTAMP(), primary_key=True),
+            sa.Column("apy", sa.Numeric(), nullable=True),
+            sa.Column("apy_base", sa.Numeric(), nullable=True),
+            sa.Column("apy_reward", sa.Numeric(), nullable=True),
+            sa.Column("tvl_usd", sa.Numeric(), nullable=True),
+            sa.Column("il_7d", sa.Numeric(), nullable=True),
+            sa.Column("apy_base_7d", sa.Numeric(), nullable=True),
+            comment=CREATED_HERE,
+        )
+        op.create_index(
+            "ix_pool_apy_history_latest_valid",
+            "pool_apy_history",
+            ["pool_id", sa.text("timestamp DESC")],
+            postgresql_where=sa.text("apy <> 0"),
+        )
+
+    # CONCURRENTLY can't run inside the migration transaction, and keeps
+    # /pools readable while the indexes build on a live table
+    with op.get_context().autocommit_block():
+        for name, columns, where in POOL_INDEXES:
+            op.create_index(
+                name,
+                "pools",
+                columns,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema. Score columns stay numeric, the model declares them that way."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(POOL_INDEXES):
+            op.drop_index(name, table_name="pools", postgresql_concurrently=True, if_exists=True)
+    inspector = sa.inspect(op.get_bind())
+    if ("pool_apy_history" in inspector.get_table_names()
+            and inspector.get_table_comment("pool_apy_history").get("text") == CREATED_HERE):
+        op.drop_index("ix_pool_apy_history_latest_valid", table_name="pool_apy_history", if_exists=True)
+        op.drop_table("pool_apy_history", if_exists=True)
@@ -0,0 +1,44 @@
+"""recommendations user_id index
+
+Every /recommendations/{user_id} read and the per-run replacement of all
+users' recommendations filter on user_id.
+
+Revision ID: 8b41d0c2e6a5
+Revises: 3f9c2a1d7b10
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b41d0c2e6a5"
+down_revision: Union[str, Sequence[str], None] = "3f9c2a1d7b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY so the recommendation routes stay readable while it builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_recommendations_user_id",
+            "recommendations",
+            ["user_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_recommendations_user_id",
+            table_name="recommendations",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
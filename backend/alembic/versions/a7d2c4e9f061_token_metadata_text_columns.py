@@ -0,0 +1,39 @@
+"""token metadata text columns
+
+name, symbol and logo come straight from token contracts, and spam tokens
+return values far longer than the old String(255/100/500) limits, which
+failed the whole batch insert. They are unbounded Text now. Downgrading
+truncates values to the old widths.
+
+Revision ID: a7d2c4e9f061
+Revises: e3a1f6c8d024
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7d2c4e9f061"
+down_revision: Union[str, Sequence[str], None] = "e3a1f6c8d024"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OLD_LENGTHS = {"name": 255, "symbol": 100, "logo": 500}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column, length in OLD_LENGTHS.items():
+        op.alter_column("token_metadata", column, type_=sa.Text(), existing_type=sa.String(length=length),
+                        existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column, length in OLD_LENGTHS.items():
+        op.alter_column("token_metadata", column, type_=sa.String(length=length), existing_type=sa.Text(),
+                        existing_nullable=True, postgresql_using=f"left({column}, {length})")
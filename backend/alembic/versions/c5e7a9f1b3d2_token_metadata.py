@@ -0,0 +1,52 @@
+"""token metadata
+
+Persistent ERC-20 metadata per (chain, contract_address), so portfolio
+loads only ask Alchemy about tokens nobody has held before. Downgrading
+drops the table only if this migration created it (marked with a table
+comment), not one the models' create_all made earlier.
+
+Revision ID: c5e7a9f1b3d2
+Revises: 8b41d0c2e6a5
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5e7a9f1b3d2"
+down_revision: Union[str, Sequence[str], None] = "8b41d0c2e6a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Comment on token_metadata when this migration created it, so downgrade knows it may drop it
+CREATED_HERE = f"created by migration {revision}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The models' create_all may have created it already
+    if "token_metadata" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "token_metadata",
+        sa.Column("chain", sa.String(length=50), primary_key=True),
+        sa.Column("contract_address", sa.String(length=42), primary_key=True),
+        sa.Column("name", sa.String(length=255), nullable=True),
+        sa.Column("symbol", sa.String(length=100), nullable=True),
+        sa.Column("decimals", sa.Integer(), nullable=True),
+        sa.Column("logo", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+        comment=CREATED_HERE,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if ("token_metadata" in inspector.get_table_names()
+            and inspector.get_table_comment("token_metadata").get("text") == CREATED_HERE):
+        op.drop_table("token_metadata", if_exists=True)
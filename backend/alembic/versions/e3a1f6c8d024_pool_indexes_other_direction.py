@@ -0,0 +1,48 @@
+"""pool indexes for the other sort direction
+
+/pools sorts NULLs last in both directions. A backward scan of the
+existing indexes returns NULLs first, so apy ascending and risk_score
+descending fell back to a sequential scan and a sort. These indexes
+cover those directions.
+
+Revision ID: e3a1f6c8d024
+Revises: c5e7a9f1b3d2
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a1f6c8d024"
+down_revision: Union[str, Sequence[str], None] = "c5e7a9f1b3d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RISK_DESC = [sa.text("risk_score DESC NULLS LAST"), sa.text("id DESC")]
+POOL_INDEXES = [
+    ("ix_pools_apy_asc", ["apy", "id"]),
+    ("ix_pools_chain_apy_asc", ["chain", "apy", "id"]),
+    ("ix_pools_project_apy_asc", ["project", "apy", "id"]),
+    ("ix_pools_risk_score_desc", RISK_DESC),
+    ("ix_pools_chain_risk_score_desc", [sa.text("chain")] + RISK_DESC),
+    ("ix_pools_project_risk_score_desc", [sa.text("project")] + RISK_DESC),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY so /pools stays readable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, columns in POOL_INDEXES:
+            op.create_index(name, "pools", columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(POOL_INDEXES):
+            op.drop_index(name, table_name="pools", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+
+from app.core.db_pool import pool_metrics
+from app.db import ENGINES
+from app.services.pull_data import get_http_cache
+from app.services.response_cache import response_cache
+
+router = APIRouter()
+
+
+@router.get("/cache", description="Hit ratio of the API response cache per dataset")
+async def get_cache_metrics():
+    return await response_cache.stats()
+
+
+@router.get("/http-cache", description="Hits, misses and 304 revalidations of the upstream (DefiLlama) HTTP cache")
+def get_http_cache_metrics():
+    # Sync route: the Redis backend uses the sync client, so this runs in the threadpool
+    cache = get_http_cache()
+    return {"scope": "all processes" if cache.shared_counters else "this process", "counters": cache.stats()}
+
+
+@router.get("/db", description="Connection pool occupancy and checkout waits per engine (this process only)")
+async def get_db_pool_metrics():
+    return {name: pool_metrics(engine.pool) for name, engine in ENGINES.items()}
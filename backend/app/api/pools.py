@@ -1,78 +1,185 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
 from app.models.models import User, Wallet, Transaction, TokenTransfer, WalletActivityScore, Pool, Protocol, Recommendation
-from app.db import SessionLocal
-from sqlalchemy.orm import Session
-from typing import Optional, List
+from app.db import read_session_at
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List, Tuple
 from fastapi import Query
+from fastapi.responses import Response, StreamingResponse
+from app.core.responses import (
+    FastJSONResponse, dumps, encoded_response, etag_matches, negotiate_encoding, not_modified
+)
+from app.services.pool_listing import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORT_FIELDS, PoolFilters, fetch_page, iter_ndjson, parse_fields, pools_query
+)
+from app.services.downsample import METHODS, downsample
+from app.services.protocol_listing import DEFAULT_MAX_POINTS, MAX_POINTS, list_protocols, tvl_series
+from app.services.ranked_index import MAX_TOP_N, RISK_TOLERANCE_MAX_SCORE, ranked_index
+from app.services.response_cache import dataset_etag, get_dataset_state, response_cache
 
 router = APIRouter()
 
-def get_db():
-    try:
-        # Create a new session
-        db = SessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
-    except Exception as e:
-        print(f"DATABASE_CONNECTION_ERROR {e}")
-        raise e
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    return etag is not None and etag_matches(request.headers.get("if-none-match"), etag)
+
+async def weak_etag(dataset: str, params: dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    ETag for responses the GZip middleware may compress (None while Redis is
+    unreachable), and the WAL position to read at for it (see read_session_at).
+    """
+    version, lsn = await get_dataset_state(dataset)
+    return (dataset_etag(dataset, version, params, weak=True) if version >= 0 else None), lsn
+
+async def cached_json(request: Request, dataset: str, params: dict, build) -> Response:
+    """
+    Answer a matching If-None-Match with 304 before any cache or database
+    work; otherwise serve from the response cache in the encoding the
+    client accepts, or build the payload (plain dicts) with build(db),
+    serialize it once and cache it. db has caught up with the commit of
+    the version the payload is cached and tagged under.
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    version, lsn = await get_dataset_state(dataset)
+    etag = dataset_etag(dataset, version, params, encoding) if version >= 0 else None
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    _, body = await response_cache.get(dataset, params, encoding or "gzip", version)
+    if body is not None:
+        response = encoded_response({encoding or "gzip": body}, encoding)
+    else:
+        async with read_session_at(lsn) as db:
+            body = dumps(await build(db))
+        bodies = await response_cache.set(dataset, version, params, body, encoding)
+        response = encoded_response(bodies, encoding, identity=body)
+    if etag:
+        response.headers["ETag"] = etag
+    return response
 
 @router.get("/pools", description="Fetch pools with optional filters")
 async def get_pools_endpoint(
-    db: Session = Depends(get_db),
+    request: Request,
     protocol: Optional[str] = Query(None, description="Filter by protocol name"),
     chain: Optional[str] = Query(None, description="Filter by chain"),
     min_risk_score: Optional[float] = Query(None, description="Minimum risk score"),
     max_risk_score: Optional[float] = Query(None, description="Maximum risk score"),
     min_apy: Optional[float] = Query(None, description="Minimum APY"),
     max_apy: Optional[float] = Query(None, description="Maximum APY"),
+    stablecoin: Optional[bool] = Query(None, description="Only stablecoin (true) or non-stablecoin (false) pools"),
     sort_by: Optional[str] = Query("apy", description="Sort by 'apy' or 'risk_score'"),
-    order: Optional[str] = Query("desc", description="Order: 'asc' or 'desc'")
+    order: Optional[str] = Query("desc", description="Order: 'asc' or 'desc'"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. 'pool_id,chain,apy'"),
+    format: Optional[str] = Query("json", description="'json' (one page) or 'ndjson' (stream every match)"),
 ):
-    query = db.query(Pool)
-
-    if protocol:
-        query = query.filter(Pool.project == protocol)
-    if chain:
-        query = query.filter(Pool.chain == chain)
-    if min_risk_score is not None:
-        query = query.filter(Pool.risk_score >= min_risk_score)
-    if max_risk_score is not None:
-        query = query.filter(Pool.risk_score <= max_risk_score)
-    if min_apy is not None:
-        query = query.filter(Pool.apy >= min_apy)
-    if max_apy is not None:
-        query = query.filter(Pool.apy <= max_apy)
-
-    if sort_by not in {"apy", "risk_score"}:
+    if sort_by not in SORT_FIELDS:
         sort_by = "apy"
-    sort_column = getattr(Pool, sort_by)
+    order = "asc" if order == "asc" else "desc"
+    filters = PoolFilters(protocol, chain, min_risk_score, max_risk_score, min_apy, max_apy, stablecoin)
+    try:
+        columns = parse_fields(fields)
+        query = pools_query(filters, sort_by, order, columns, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    if order == "asc":
-        query = query.order_by(sort_column.asc())
-    else:
-        query = query.order_by(sort_column.desc())
+    params = {**vars(filters), "sort_by": sort_by, "order": order, "limit": limit, "cursor": cursor, "fields": columns}
+    if format == "ndjson":
+        etag, lsn = await weak_etag("pools", {**params, "limit": None, "format": format})
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        headers = {"ETag": etag} if etag else None
+        return StreamingResponse(iter_ndjson(query, columns, lsn), media_type="application/x-ndjson", headers=headers)
 
-    pools = query.all()
-    return {"pools": pools}
+    async def build(db: AsyncSession):
+        pools, next_cursor = await fetch_page(db, query, columns, sort_by, order, limit)
+        return {"pools": pools, "next_cursor": next_cursor}
 
+    return await cached_json(request, "pools", params, build)
+
+
+@router.get("/pools/top", description="Best-scored pools from the in-memory ranked index (no database query)")
+async def get_top_pools_endpoint(
+    request: Request,
+    n: int = Query(10, ge=1, le=MAX_TOP_N, description="Number of pools"),
+    risk_tolerance: Optional[str] = Query(None, description=f"One of {', '.join(RISK_TOLERANCE_MAX_SCORE)}"),
+    chain: Optional[str] = Query(None, description="Filter by chain (case-insensitive)"),
+    stablecoin: Optional[bool] = Query(None, description="Only stablecoin (true) or non-stablecoin (false) pools"),
+):
+    index = await ranked_index.get()
+    # From the version the index was built from, which can trail Redis while a rebuild runs
+    params = {"view": "top", "n": n, "risk_tolerance": risk_tolerance, "chain": chain, "stablecoin": stablecoin}
+    etag = dataset_etag("pools", index.version, params, weak=True) if index.version >= 0 else None
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    try:
+        pools = index.top(n, risk_tolerance, chain, stablecoin)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Records are plain JSON types already, no jsonable_encoder pass needed
+    return FastJSONResponse({"version": index.version, "pools": pools}, headers={"ETag": etag} if etag else None)
 
 
 @router.get("/protocols", description="Fetch protocols from external API")
-async def get_protocols_endpoint(db: Session = Depends(get_db)):
-    protocols = db.query(Protocol).all()
-    return {"protocols": protocols}
+async def get_protocols_endpoint(
+    request: Request,
+    include_tvls: bool = Query(False, description="Also return the full chain_tvls series (large)"),
+):
+    async def build(db: AsyncSession):
+        return {"protocols": await list_protocols(db, include_tvls)}
+
+    return await cached_json(request, "protocols", {"include_tvls": include_tvls}, build)
+
+@router.get("/protocols/{slug}/tvl", description="Downsampled TVL series of a protocol")
+async def get_protocol_tvl_endpoint(
+    slug: str,
+    request: Request,
+    chain: Optional[str] = Query(None, description="One chainTvls key, e.g. 'Ethereum'; default sums the protocol's chains"),
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=3, le=MAX_POINTS, description="Upper bound on returned points"),
+    method: str = Query("lttb", description="'lttb' (keeps peaks) or 'avg' (bucket averages)"),
+):
+    if method not in METHODS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"method must be one of {', '.join(METHODS)}")
+
+    async def build(db: AsyncSession):
+        result = await tvl_series(db, slug, chain)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Protocol not found")
+        chains, dates, values = result
+        x, y = downsample(dates, values, max_points, method)
+        return {
+            "slug": slug,
+            "chains": chains,
+            "method": method,
+            "total_points": len(dates),
+            "tvl": [{"date": int(d), "totalLiquidityUSD": round(v, 2)} for d, v in zip(x.tolist(), y.tolist())],
+        }
+
+    params = {"slug": slug, "chain": chain, "max_points": max_points, "method": method}
+    return await cached_json(request, "protocols", params, build)
 
 @router.get("/recommendations/{user_id}", description="Get pool recommendations for a user")
-async def get_recommendations_endpoint(user_id: str, db: Session = Depends(get_db)):
-    recommendations = db.query(Recommendation).filter(Recommendation.user_id == user_id).all()
+async def get_recommendations_endpoint(user_id: int, request: Request, response: Response):
+    etag, lsn = await weak_etag("recommendations", {"user_id": user_id})
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    if etag:
+        response.headers["ETag"] = etag
+    query = (select(Recommendation).where(Recommendation.user_id == user_id)
+             .order_by(Recommendation.score.desc().nulls_last(), Recommendation.id))
+    async with read_session_at(lsn) as db:
+        recommendations = (await db.execute(query)).scalars().all()
     return {"user_id": user_id, "recommendations": recommendations}
 
-@router.get("/recommendations/{id}", description="Get Specific Recommendation by ID")
-async def get_specific_recommendation_endpoint(id: str, db: Session = Depends(get_db)):
-    recommendation = db.query(Recommendation).filter(Recommendation.id == id).first()
+@router.get("/recommendations/by-id/{id}", description="Get Specific Recommendation by ID")
+async def get_specific_recommendation_endpoint(id: int, request: Request, response: Response):
+    etag, lsn = await weak_etag("recommendations", {"id": id})
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    if etag:
+        response.headers["ETag"] = etag
+    async with read_session_at(lsn) as db:
+        recommendation = (await db.execute(select(Recommendation).where(Recommendation.id == id))).scalars().first()
     if not recommendation:
         raise HTTPException(status_code=404, detail="Recommendation not found")
     return {"id": id, "recommendation": recommendation}
\ No newline at end of file
@@ -1,41 +1,46 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.models.schemas import UserSchema, WalletSchema, WalletBase, WalletCreate
+from app.services.user_cache import UserSnapshot
 from app.services.user_services import get_current_user_dep
-from app.services.wallet_services import create_wallet, delete_wallet, get_wallet_balance_eth
+from app.services.wallet_services import create_wallet, delete_wallet, get_portfolio_value, get_user_wallets, get_wallet_balance_eth
 from typing import Dict, Any, List, Optional
 from app.models.models import User, Wallet
-from app.db import get_db
-from sqlalchemy.orm import Session
+from app.db import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
 
 @router.get("/me",description="Get my wallets", response_model=Dict[str, Any])
-async def get_my_wallet(current_user: User = Depends(get_current_user_dep)):
-    wallets = current_user.wallets
-    if not wallets:
-        wallets = []
-    return {"wallets": wallets}
+async def get_my_wallet(current_user: UserSnapshot = Depends(get_current_user_dep), db: AsyncSession = Depends(get_async_db)):
+    # Explicit query: lazy-loading current_user.wallets isn't possible on an AsyncSession
+    wallets = await get_user_wallets(db, current_user.id)
+    return {"wallets": [WalletSchema.model_validate(wallet) for wallet in wallets]}
+
+@router.get("/me/portfolio", description="USD value of the ERC-20 tokens held across my wallets", response_model=Dict[str, Any])
+async def get_my_portfolio(current_user: UserSnapshot = Depends(get_current_user_dep), db: AsyncSession = Depends(get_async_db)):
+    wallets = await get_user_wallets(db, current_user.id)
+    return await get_portfolio_value(db, [(wallet.address, wallet.chain) for wallet in wallets])
 
 @router.post("/me", description="Create a new wallet", response_model=WalletSchema)
-async def create_my_wallet(wallet_data: WalletCreate, current_user: User = Depends(get_current_user_dep), db: Session = Depends(get_db)):
+async def create_my_wallet(wallet_data: WalletCreate, current_user: UserSnapshot = Depends(get_current_user_dep), db: AsyncSession = Depends(get_async_db)):
     wallet_data.user_id = current_user.id
-    wallet = create_wallet(db, wallet_data)
+    wallet = await create_wallet(db, wallet_data)
     return wallet
 
 @router.delete("/{wallet_id}", description="Delete my wallet")
-async def delete_my_wallet(wallet_id: int, current_user: User = Depends(get_current_user_dep), db: Session = Depends(get_db)):
-    wallet = db.query(Wallet).filter(Wallet.id == wallet_id).first()
+async def delete_my_wallet(wallet_id: int, current_user: UserSnapshot = Depends(get_current_user_dep), db: AsyncSession = Depends(get_async_db)):
+    wallet = await db.get(Wallet, wallet_id)
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
     if wallet.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this wallet")
-    wallet = delete_wallet(db, wallet)
+    wallet = await delete_wallet(db, wallet)
     return wallet
 
 @router.get("/{wallet_id}", description="Get my wallet", response_model=WalletSchema)
-def get_wallet(wallet_id: int, current_user: User = Depends(get_current_user_dep), db: Session = Depends(get_db)):
-    wallet = db.query(Wallet).filter(Wallet.id == wallet_id).first()
+async def get_wallet(wallet_id: int, current_user: UserSnapshot = Depends(get_current_user_dep), db: AsyncSession = Depends(get_async_db)):
+    wallet = await db.get(Wallet, wallet_id)
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
     if wallet.user_id != current_user.id:
@@ -43,11 +48,11 @@ def get_wallet(wallet_id: int, current_user: User = Depends(get_current_user_dep
     return wallet
 
 @router.get("/{wallet_id}/balance", description="Get my wallet balance", response_model=Dict[str, Any])
-def get_wallet_balance(wallet_id: int, current_user: User = Depends(get_current_user_dep), db: Session = Depends(get_db)):
-    wallet = db.query(Wallet).filter(Wallet.id == wallet_id).first()
+async def get_wallet_balance(wallet_id: int, current_user: UserSnapshot = Depends(get_current_user_dep), db: AsyncSession = Depends(get_async_db)):
+    wallet = await db.get(Wallet, wallet_id)
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
     if wallet.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this wallet")
-    balance = get_wallet_balance_eth(wallet.address)
+    balance = await get_wallet_balance_eth(wallet.address)
     return {"address": wallet.address, "balance": balance}
\ No newline at end of file
@@ -17,6 +17,54 @@ class Settings(BaseSettings):
     REDIS_URL: str
     ENV: str = "dev"
 
+    # Upstream HTTP cache: "file" or "redis"; offline serves only cached responses
+    HTTP_CACHE_BACKEND: str = "file"
+    HTTP_CACHE_DIR: str = "/tmp/yieldsync-http-cache"
+    HTTP_CACHE_OFFLINE: bool = False
+
+    # Columnar per-pool history files (see app/services/history_store.py)
+    HISTORY_DIR: str = "/tmp/yieldsync-history"
+
+    # API response cache; entries are also invalidated by dataset version bumps
+    RESPONSE_CACHE_TTL: int = 3600
+
+    # Connection pools, per engine and per process (API worker or Celery worker)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Server-side per-statement limit in milliseconds for the API's engines, 0 disables
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    # Same for the sync engine of the Celery tasks (full COPY refreshes, backfills, lock waits); off by default
+    WORKER_STATEMENT_TIMEOUT_MS: int = 0
+    # Comma-separated postgresql:// URLs of read replicas for the read-only API routes
+    DATABASE_REPLICA_URLS: str = ""
+
+    # Token -> user snapshot cache in front of get_current_user_dep (see app/services/user_cache.py)
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 60
+    # Shared tier in Redis, keyed by user id
+    USER_CACHE_REDIS: bool = False
+    USER_CACHE_REDIS_TTL: int = 600
+
+    # Password hashing (see app/services/passwords.py); stored hashes move to BCRYPT_ROUNDS on the next login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    # Signup/login calls running or queued for a hash; beyond this they get a 503
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # Shared price cache (see app/services/price_oracle.py): fresh for PRICE_TTL, served stale up to PRICE_STALE_TTL
+    PRICE_TTL: int = 30
+    PRICE_STALE_TTL: int = 600
+    # Cross-process single-flight: lock lifetime, and how long other processes wait for the lock holder
+    PRICE_LOCK_TIMEOUT: int = 10
+    PRICE_LOCK_WAIT: float = 2.0
+
+    # In-process LRU in front of the token_metadata table (see app/services/token_metadata.py)
+    TOKEN_METADATA_CACHE_SIZE: int = 50000
+
     class Config:
         env_file = ".env"
 
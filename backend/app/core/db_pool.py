@@ -0,0 +1,82 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Checkout counters of one engine's pool, for the lifetime of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class _TimedPoolMixin:
+    """
+    Times every checkout, including the wait for a free connection once
+    pool_size + max_overflow are all out. The stats object survives
+    recreate() (engine.dispose()), so the numbers are per engine.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_metrics(pool) -> Dict[str, Any]:
+    """Current occupancy plus checkout wait counters of a Timed*QueuePool."""
+    # max_overflow < 0 means no upper bound
+    capacity = pool.size() + pool._max_overflow if pool._max_overflow >= 0 else None
+    checked_out = pool.checkedout()
+    stats = pool.stats
+    attempts = stats.checkouts + stats.timeouts
+    return {
+        "pool_size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 4) if capacity else None,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "wait_ms_avg": round(stats.wait_seconds_total / attempts * 1e3, 3) if attempts else None,
+        "wait_ms_max": round(stats.wait_seconds_max * 1e3, 3),
+    }
@@ -0,0 +1,27 @@
+import asyncio
+import weakref
+
+import redis
+import redis.asyncio
+from app.core.config import settings
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_redis() -> redis.Redis:
+    """Shared client for the Redis instance Celery already uses as its broker."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Async client for the running event loop (its connections can't cross loops)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+        _async_clients[loop] = client
+    return client
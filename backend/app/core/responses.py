@@ -0,0 +1,108 @@
+import gzip
+import uuid
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import brotli
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+# Smaller bodies aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+# On a 10k-pool listing quality 5 is ~11% smaller than gzip -6 for ~1.5x the CPU, paid once per cache entry
+BROTLI_QUALITY = 5
+ENCODINGS = ("br", "gzip")
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    # Only reached for types orjson doesn't handle natively; the /pools query casts these away in SQL
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        # asyncpg's UUID subclass isn't the exact type orjson serializes natively
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    orjson encoding of plain dicts/lists: datetime, UUID and numpy values are
+    native, so there is no jsonable_encoder walk over the payload first.
+    """
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; content must be plain data (dicts, rows as dicts)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Preferred encoding ("br", "gzip") among those the client accepts, or
+    None for identity. "*" stands for the encodings not listed otherwise,
+    so "br;q=0, *" still refuses brotli.
+    """
+    accepted, refused = set(), set()
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        name, quality = name.strip(), params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    refused.add(name)
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    for encoding in ENCODINGS:
+        if encoding in refused:
+            continue
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check; weak comparison, as RFC 9110 prescribes for it."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress(body: bytes, encoding: str) -> bytes:
+    return brotli.decompress(body) if encoding == "br" else gzip.decompress(body)
+
+
+def encoded_response(bodies: Dict[str, bytes], encoding: Optional[str], identity: Optional[bytes] = None,
+                     media_type: str = "application/json") -> Response:
+    """
+    Response from pre-encoded bodies ({"gzip": ..., "br": ...}): the one the
+    client negotiated is sent as is, otherwise the identity body (decoded
+    from whatever is available when not given).
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding in bodies:
+        headers["Content-Encoding"] = encoding
+        return Response(bodies[encoding], media_type=media_type, headers=headers)
+    if identity is None:
+        source = next(iter(bodies))
+        identity = decompress(bodies[source], source)
+    return Response(identity, media_type=media_type, headers=headers)
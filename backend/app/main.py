@@ -1,10 +1,16 @@
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from app.core.config import settings
 from app.api.users import router as user_router
 from app.api.wallets import router as wallet_router
+from app.api.pools import router as pool_router
+from app.api.metrics import router as metrics_router
+from app.core.responses import GZIP_LEVEL, MIN_COMPRESS_SIZE
 from app.db import engine, Base
 
 app = FastAPI(title=settings.PROJECT_NAME)
+# Compresses the remaining responses; cached ones already carry a Content-Encoding and pass through
+app.add_middleware(GZipMiddleware, minimum_size=MIN_COMPRESS_SIZE, compresslevel=GZIP_LEVEL)
 
 @app.get("/health")
 def health_check():
@@ -16,3 +22,5 @@ def health_check():
 
 app.include_router(user_router, prefix="/users")
 app.include_router(wallet_router, prefix="/wallets")
+app.include_router(pool_router)
+app.include_router(metrics_router, prefix="/metrics")
@@ -1,5 +1,5 @@
 # app/db/models.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Enum, Boolean, TIMESTAMP, Text, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Enum, Boolean, TIMESTAMP, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from app.db import Base, engine
 
@@ -217,7 +217,7 @@ class Pool(Base):
     final_score = Column(Numeric, nullable=True)
     breakdown = Column(JSONB, nullable=True)  # Store explanation, breakdown, etc.
 
-    metadata = Column(JSONB, nullable=True)
+    pool_metadata = Column("metadata", JSONB, nullable=True)  # "metadata" is reserved by declarative
     supported_chains = Column(JSONB, nullable=True)
     underlying_assets = Column(JSONB, nullable=True)
 
@@ -239,6 +239,83 @@ class Pool(Base):
     protocol = relationship("Protocol", back_populates="pools")
     recommendations = relationship("Recommendation", back_populates="pool")
 
+    # Match the /pools filter + sort shapes: equality filter first, then the
+    # sort key, then id like the keyset cursor. Both orders sort NULLs last,
+    # which a backward scan can't give, so each direction has its own index.
+    # Created on existing databases by alembic/versions/3f9c2a1d7b10 and e3a1f6c8d024.
+    __table_args__ = (
+        Index("ix_pools_apy", apy.desc().nulls_last(), id.desc()),
+        Index("ix_pools_chain_apy", "chain", apy.desc().nulls_last(), id.desc()),
+        Index("ix_pools_project_apy", "project", apy.desc().nulls_last(), id.desc()),
+        Index("ix_pools_apy_asc", "apy", "id"),
+        Index("ix_pools_chain_apy_asc", "chain", "apy", "id"),
+        Index("ix_pools_project_apy_asc", "project", "apy", "id"),
+        Index("ix_pools_risk_score", "risk_score", "id"),
+        Index("ix_pools_chain_risk_score", "chain", "risk_score", "id"),
+        Index("ix_pools_project_risk_score", "project", "risk_score", "id"),
+        Index("ix_pools_risk_score_desc", risk_score.desc().nulls_last(), id.desc()),
+        Index("ix_pools_chain_risk_score_desc", "chain", risk_score.desc().nulls_last(), id.desc()),
+        Index("ix_pools_project_risk_score_desc", "project", risk_score.desc().nulls_last(), id.desc()),
+        Index(
+            "ix_pools_stablecoin_apy",
+            apy.desc().nulls_last(),
+            id.desc(),
+            postgresql_where=(stablecoin.is_(True)),
+        ),
+    )
+
+
+# -------------------------------
+# Pool APY History Table
+# -------------------------------
+class PoolApyHistory(Base):
+    """
+    One row per point of DefiLlama's /chart/{pool_id} series, appended
+    incrementally: only points newer than the newest stored timestamp
+    (the pool's watermark) are inserted.
+
+    The primary key (pool_id, timestamp) serves watermark and "latest point"
+    lookups; the partial index serves "latest non-zero APY".
+    """
+    __tablename__ = "pool_apy_history"
+
+    pool_id = Column(UUID(as_uuid=True), primary_key=True)  # DefiLlama pool UUID, same as pools.pool_id
+    timestamp = Column(TIMESTAMP, primary_key=True)
+    apy = Column(Numeric, nullable=True)
+    apy_base = Column(Numeric, nullable=True)
+    apy_reward = Column(Numeric, nullable=True)
+    tvl_usd = Column(Numeric, nullable=True)
+    il_7d = Column(Numeric, nullable=True)
+    apy_base_7d = Column(Numeric, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_pool_apy_history_latest_valid",
+            "pool_id",
+            timestamp.desc(),
+            postgresql_where=(apy != 0),
+        ),
+    )
+
+
+class TokenMetadata(Base):
+    """
+    ERC-20 name, symbol and decimals per contract, fetched once from
+    Alchemy: token metadata practically never changes, so rows are never
+    refreshed. contract_address is stored lowercase. name, symbol and logo
+    are whatever the contract returns (spam tokens send kilobytes), so they
+    are unbounded Text.
+    """
+    __tablename__ = "token_metadata"
+
+    chain = Column(String(50), primary_key=True)
+    contract_address = Column(String(42), primary_key=True)
+    name = Column(Text, nullable=True)
+    symbol = Column(Text, nullable=True)
+    decimals = Column(Integer, nullable=True)
+    logo = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+
 
 # -------------------------------
 # Recommendations Table
@@ -247,7 +324,7 @@ class Recommendation(Base):
     __tablename__ = "recommendations"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=True)  # connect to users table later
+    user_id = Column(Integer, nullable=True, index=True)  # connect to users table later
     pool_id = Column(Integer, ForeignKey("pools.id", ondelete="CASCADE"))
     protocol_id = Column(Integer, ForeignKey("protocols.id", ondelete="CASCADE"))
 
@@ -0,0 +1,171 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.models import PoolApyHistory
+from app.services import http_client
+from app.services.pull_data import fetch_pool_chart, afetch_pool_chart
+
+BACKFILL_CONCURRENCY = 16
+INSERT_BATCH_SIZE = 5000
+
+# Newest stored point per pool, one index probe each (PK is (pool_id, timestamp))
+WATERMARKS_SQL = text("""
+    SELECT ids.pool_id, h.timestamp
+    FROM unnest(CAST(:pool_ids AS uuid[])) AS ids(pool_id)
+    CROSS JOIN LATERAL (
+        SELECT timestamp FROM pool_apy_history
+        WHERE pool_id = ids.pool_id
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ) h
+""")
+
+
+def _parse_timestamp(value: str) -> datetime:
+    # DefiLlama sends "2024-04-23T00:00:00.000Z"; stored as naive UTC like the other tables
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def get_watermarks(db: Session, pool_ids: Sequence[str]) -> Dict[str, datetime]:
+    if not pool_ids:
+        return {}
+    rows = db.execute(WATERMARKS_SQL, {"pool_ids": [str(p) for p in pool_ids]}).all()
+    return {str(pool_id): ts for pool_id, ts in rows}
+
+
+def new_history_rows(pool_id: str, chart: Iterable[Dict[str, Any]], watermark: Optional[datetime]) -> List[Dict[str, Any]]:
+    """Rows for the chart points strictly newer than the watermark."""
+    rows = []
+    for entry in chart:
+        ts = _parse_timestamp(entry["timestamp"])
+        if watermark is not None and ts <= watermark:
+            continue
+        rows.append({
+            "pool_id": pool_id,
+            "timestamp": ts,
+            "apy": entry.get("apy"),
+            "apy_base": entry.get("apyBase"),
+            "apy_reward": entry.get("apyReward"),
+            "tvl_usd": entry.get("tvlUsd"),
+            "il_7d": entry.get("il7d"),
+            "apy_base_7d": entry.get("apyBase7d"),
+        })
+    return rows
+
+
+def insert_history_rows(db: Session, rows: Sequence[Dict[str, Any]]) -> int:
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        stmt = pg_insert(PoolApyHistory.__table__).on_conflict_do_nothing()
+        db.execute(stmt, list(rows[start:start + INSERT_BATCH_SIZE]))
+    db.commit()
+    return len(rows)
+
+
+def refresh_pool_history(db: Session, pool_id: str) -> int:
+    """Append the points of one pool's chart that are newer than its watermark."""
+    watermark = get_watermarks(db, [pool_id]).get(str(pool_id))
+    return insert_history_rows(db, new_history_rows(str(pool_id), fetch_pool_chart(pool_id), watermark))
+
+
+async def _backfill(pool_ids: Sequence[str], concurrency: int) -> Dict[str, int]:
+    db = SessionLocal()
+    # The session's queries run on this one thread: off the event loop, never two at once
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="apy_history")
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"pools": 0, "points": 0, "failed": 0}
+    try:
+        watermarks = await loop.run_in_executor(writer, get_watermarks, db, pool_ids)
+
+        async def fetch(pool_id):
+            async with semaphore:
+                try:
+                    return pool_id, await afetch_pool_chart(pool_id)
+                except Exception as e:
+                    print(f"APY_HISTORY_FETCH_ERROR: {pool_id} - {str(e)}")
+                    return pool_id, None
+
+        for done in asyncio.as_completed([fetch(p) for p in pool_ids]):
+            pool_id, chart = await done
+            if chart is None:
+                stats["failed"] += 1
+                continue
+            rows = new_history_rows(pool_id, chart, watermarks.get(pool_id))
+            # Downloads already started keep going while this pool's rows are written
+            stats["points"] += await loop.run_in_executor(writer, insert_history_rows, db, rows)
+            stats["pools"] += 1
+    finally:
+        await loop.run_in_executor(writer, db.close)
+        writer.shutdown()
+    return stats
+
+
+def backfill_history(pool_ids: Sequence[str], concurrency: int = BACKFILL_CONCURRENCY) -> Dict[str, int]:
+    """
+    Fill history for many pools: at most `concurrency` chart downloads in
+    flight, each pool's new points written as soon as its chart arrives,
+    on a writer thread so the inserts don't stall the downloads.
+    """
+    async def run():
+        try:
+            return await _backfill([str(p) for p in pool_ids], concurrency)
+        finally:
+            await http_client.aclose()
+
+    return asyncio.run(run())
+
+
+def _entry(row: PoolApyHistory) -> Dict[str, Any]:
+    def num(value):
+        return float(value) if value is not None else None
+
+    return {
+        "timestamp": row.timestamp.isoformat(),
+        "tvlUsd": num(row.tvl_usd),
+        "apy": num(row.apy),
+        "apyBase": num(row.apy_base),
+        "apyReward": num(row.apy_reward),
+        "il7d": num(row.il_7d),
+        "apyBase7d": num(row.apy_base_7d),
+    }
+
+
+def latest_valid_apy(db: Session, pool_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Newest point with a non-zero APY, flagged "latest" when it is also the
+    newest point overall; otherwise "main_apy" carries the newest APY.
+    Falls back to the newest point when every APY is zero.
+    Two index lookups, independent of how long the history is.
+    """
+    base = db.query(PoolApyHistory).filter(PoolApyHistory.pool_id == pool_id)
+    newest = base.order_by(PoolApyHistory.timestamp.desc()).first()
+    if newest is None:
+        return None
+    valid = newest
+    if not newest.apy:
+        valid = base.filter(PoolApyHistory.apy != 0).order_by(PoolApyHistory.timestamp.desc()).first() or newest
+
+    entry = _entry(valid)
+    entry["latest"] = valid is newest
+    if valid is not newest:
+        entry["main_apy"] = _entry(newest)["apy"]
+    return entry
+
+
+def apy_search(pool_id: str, db: Optional[Session] = None, refresh: bool = True) -> Optional[Dict[str, Any]]:
+    """Bring the pool's history up to date, then look up its latest valid APY."""
+    session = db or SessionLocal()
+    try:
+        if refresh:
+            refresh_pool_history(session, pool_id)
+        return latest_valid_apy(session, pool_id)
+    finally:
+        if db is None:
+            session.close()
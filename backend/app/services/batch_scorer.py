@@ -0,0 +1,196 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Same constants as score_defillama_pool, kept side by side so the two stay in sync.
+TVL_CAP_USD = 40_000_000_000
+APY_CAP = 500
+SIGMA_CAP = 1.0
+
+
+@dataclass
+class PoolColumns:
+    """
+    Columnar (struct-of-arrays) view of a list of DefiLlama pool dicts.
+
+    Every array has one entry per pool, in the order of the input list.
+    Missing numeric values are stored as 0, except predicted_prob which
+    keeps NaN so "no prediction" can be told apart from a 0% prediction.
+    """
+    apy: np.ndarray
+    apy_base: np.ndarray
+    apy_reward: np.ndarray
+    tvl_usd: np.ndarray
+    sigma: np.ndarray
+    predicted_prob: np.ndarray
+    il_risk: np.ndarray
+    stablecoin: np.ndarray
+    multi_exposure: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.apy)
+
+
+@dataclass
+class BatchScores:
+    """Scores for every pool of a PoolColumns, index-aligned with the input."""
+    apy: np.ndarray
+    tvl_score: np.ndarray
+    risk_score: np.ndarray  # percent, 0-100
+    final_score: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.final_score)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        Per-pool score dicts with plain Python numbers, shaped like the
+        numeric part of score_defillama_pool's result (risk_score is the
+        percent as a number rather than the "42.5%" string).
+        """
+        return [
+            {
+                "apy": apy,
+                # score_defillama_pool's min(100, ...) yields the int 100 when capped
+                "tvl_score": 100 if tvl_score == 100 else tvl_score,
+                "risk_score": risk_score,
+                "final_score": final_score,
+            }
+            for apy, tvl_score, risk_score, final_score in zip(
+                self.apy.tolist(),
+                self.tvl_score.tolist(),
+                self.risk_score.tolist(),
+                self.final_score.tolist(),
+            )
+        ]
+
+
+def _num(value: Any) -> float:
+    return float(value) if value else 0.0
+
+
+def pools_to_columns(pools: Sequence[Dict[str, Any]]) -> PoolColumns:
+    """Turn a list of pool dicts into NumPy columns in a single pass."""
+    n = len(pools)
+    apy = np.empty(n, dtype=np.float64)
+    apy_base = np.empty(n, dtype=np.float64)
+    apy_reward = np.empty(n, dtype=np.float64)
+    tvl_usd = np.empty(n, dtype=np.float64)
+    sigma = np.empty(n, dtype=np.float64)
+    predicted_prob = np.empty(n, dtype=np.float64)
+    il_risk = np.empty(n, dtype=bool)
+    stablecoin = np.empty(n, dtype=bool)
+    multi_exposure = np.empty(n, dtype=bool)
+
+    for i, pool in enumerate(pools):
+        apy[i] = _num(pool.get("apy"))
+        apy_base[i] = _num(pool.get("apyBase"))
+        apy_reward[i] = _num(pool.get("apyReward"))
+        tvl_usd[i] = _num(pool.get("tvlUsd"))
+        sigma[i] = _num(pool.get("sigma", 0))
+        prob = (pool.get("predictions") or {}).get("predictedProbability", 100)
+        predicted_prob[i] = prob if prob is not None else np.nan
+        il_risk[i] = str(pool.get("ilRisk", "no")).lower() == "yes"
+        stablecoin[i] = bool(pool.get("stablecoin", False))
+        multi_exposure[i] = str(pool.get("exposure", "single")).lower() == "multi"
+
+    return PoolColumns(
+        apy=apy,
+        apy_base=apy_base,
+        apy_reward=apy_reward,
+        tvl_usd=tvl_usd,
+        sigma=sigma,
+        predicted_prob=predicted_prob,
+        il_risk=il_risk,
+        stablecoin=stablecoin,
+        multi_exposure=multi_exposure,
+    )
+
+
+def round_half_even(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Vectorized equivalent of Python's built-in round(x, decimals).
+
+    np.round scales by 10**decimals before rounding, which can land on the
+    other side of a .5 tie than Python's correctly-rounded round(). Those
+    near-tie entries are rare, so they are re-rounded with round() itself.
+    """
+    rounded = np.round(values, decimals)
+    scaled = values * (10 ** decimals)
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), decimals)
+    return rounded
+
+
+def score_columns(cols: PoolColumns) -> BatchScores:
+    """
+    Vectorized version of score_defillama_pool over all pools at once.
+
+    Operations are applied in the same order as in the per-pool function
+    so the float results match it exactly.
+    """
+    # 1) APY: apyBase + apyReward when either is set, otherwise apy
+    use_parts = (cols.apy_base != 0) | (cols.apy_reward != 0)
+    apy = np.where(use_parts, cols.apy_base + cols.apy_reward, cols.apy)
+
+    # 2) TVL score (log-scaled, 0-100)
+    tvl_score = np.minimum(100, round_half_even(np.log10(cols.tvl_usd + 1) * 20, 2))
+
+    # 3) Risk factors
+    tvl_norm = 1 - np.minimum(cols.tvl_usd / TVL_CAP_USD, 1)
+    apy_norm = np.minimum(apy / APY_CAP, 1)
+    volatility_norm = np.minimum(cols.sigma / SIGMA_CAP, 1)
+    il_penalty = np.where(cols.il_risk, 0.2, 0.0)
+    stablecoin_penalty = np.where(cols.stablecoin, 0.0, 0.1)
+    has_prob = ~np.isnan(cols.predicted_prob) & (cols.predicted_prob != 0)
+    prediction_penalty = np.where(has_prob, 1 - (cols.predicted_prob / 100), 1.0)
+    exposure_penalty = np.where(cols.multi_exposure, 0.05, 0.0)
+
+    risk = (
+        0.3 * tvl_norm +
+        0.2 * apy_norm +
+        0.2 * volatility_norm +
+        0.1 * prediction_penalty +
+        il_penalty +
+        stablecoin_penalty +
+        exposure_penalty
+    )
+    risk = np.minimum(risk, 1.0)
+    risk_score = round_half_even(risk * 100, 2)
+
+    # 4) Final score
+    final_score = round_half_even((apy * 0.5) + (tvl_score * 0.3) - (risk_score * 0.2), 2)
+
+    return BatchScores(
+        apy=round_half_even(apy, 4),
+        tvl_score=tvl_score,
+        risk_score=risk_score,
+        final_score=final_score,
+    )
+
+
+def score_pools_batch(pools: Sequence[Dict[str, Any]]) -> BatchScores:
+    return score_columns(pools_to_columns(pools))
+
+
+def top_n_indices(final_score: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Indices of the top_n highest scores, best first.
+
+    Uses argpartition so only the winners get sorted. Ties are broken by
+    input position, which gives the same order as a stable sorted(...,
+    reverse=True) over the whole list.
+    """
+    n = len(final_score)
+    if top_n <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if top_n >= n:
+        candidates = np.arange(n)
+    else:
+        kth = np.argpartition(-final_score, top_n - 1)[top_n - 1]
+        candidates = np.flatnonzero(final_score >= final_score[kth])
+    order = np.lexsort((candidates, -final_score[candidates]))
+    return candidates[order][:top_n]
+
@@ -0,0 +1,51 @@
+from typing import Tuple
+
+import numpy as np
+
+METHODS = ("lttb", "avg")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point and, from
+    each of max_points - 2 equal buckets, the point forming the largest
+    triangle with the previously kept point and the next bucket's average.
+    Spikes and dips survive, unlike with averaging. x must be sorted.
+    """
+    size = len(x)
+    if max_points >= size or max_points < 3:
+        return x, y
+
+    every = (size - 2) / (max_points - 2)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, size)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def bucket_average(x: np.ndarray, y: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean x and mean y of max_points consecutive, equally sized buckets."""
+    size = len(x)
+    if max_points >= size or max_points < 1:
+        return x, y
+    bucket = np.arange(size) * max_points // size
+    counts = np.bincount(bucket, minlength=max_points)
+    return (np.bincount(bucket, weights=x, minlength=max_points) / counts,
+            np.bincount(bucket, weights=y, minlength=max_points) / counts)
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int, method: str = "lttb") -> Tuple[np.ndarray, np.ndarray]:
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if method == "avg":
+        return bucket_average(x, y, max_points)
+    return lttb(x, y, max_points)
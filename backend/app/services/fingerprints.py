@@ -0,0 +1,82 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import redis
+
+from app.core.redis_client import get_redis
+
+FINGERPRINT_KEY = "yieldsync:pool_fingerprints"
+# Bump when scoring or the pool -> row mapping changes, so every pool is rewritten once
+FINGERPRINT_VERSION = 2
+REDIS_CHUNK_SIZE = 5000
+
+# Feed fields that end up in Pool columns (directly or through the scores)
+FINGERPRINT_FIELDS = [
+    "chain",
+    "project",
+    "symbol",
+    "tvlUsd",
+    "apyBase",
+    "apyReward",
+    "apy",
+    "apyPct1D",
+    "apyPct7D",
+    "apyPct30D",
+    "apyMean30d",
+    "apyBaseInception",
+    "predictions",
+    "poolMeta",
+    "stablecoin",
+    "ilRisk",
+    "exposure",
+    "rewardTokens",
+    "underlyingTokens",
+    "volumeUsd1d",
+    "volumeUsd7d",
+    "mu",
+    "sigma",
+    "count",
+    "outlier",
+]
+
+
+def pool_fingerprint(pool: Dict[str, Any]) -> bytes:
+    """8-byte digest of the fields of a pool that map onto Pool columns."""
+    values = [FINGERPRINT_VERSION] + [pool.get(field) for field in FINGERPRINT_FIELDS]
+    payload = json.dumps(values, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest()
+
+
+class PoolFingerprintStore:
+    """
+    Last-written fingerprint per pool_id, kept in one Redis hash.
+
+    Fingerprints are only saved after the rows they describe were committed,
+    so a failed run just rewrites the same pools next time.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None, key: str = FINGERPRINT_KEY):
+        self.client = client or get_redis()
+        self.key = key
+
+    def changed(self, pools: Sequence[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, bytes]]:
+        """Return the pools whose fingerprint differs from the stored one, and their new fingerprints."""
+        changed, fingerprints = [], {}
+        for start in range(0, len(pools), REDIS_CHUNK_SIZE):
+            chunk = pools[start:start + REDIS_CHUNK_SIZE]
+            stored = self.client.hmget(self.key, [p.get("pool") for p in chunk])
+            for pool, old in zip(chunk, stored):
+                new = pool_fingerprint(pool)
+                if new != old:
+                    changed.append(pool)
+                    fingerprints[pool.get("pool")] = new
+        return changed, fingerprints
+
+    def save(self, fingerprints: Dict[str, bytes]) -> None:
+        items = list(fingerprints.items())
+        for start in range(0, len(items), REDIS_CHUNK_SIZE):
+            self.client.hset(self.key, mapping=dict(items[start:start + REDIS_CHUNK_SIZE]))
+
+    def clear(self) -> None:
+        self.client.delete(self.key)
@@ -0,0 +1,217 @@
+import mmap
+import os
+import re
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import PoolApyHistory
+
+# File layout: 16-byte header, then the three columns back to back.
+#   header  magic b"YSH1", uint32 reserved, uint64 point count
+#   ts      int64[n]    unix seconds, ascending
+#   apy     float32[n]  NaN where unknown
+#   tvl     float32[n]  NaN where unknown
+MAGIC = b"YSH1"
+HEADER = struct.Struct("<4sIQ")
+SUFFIX = ".ysh"
+EXPORT_CHUNK_SIZE = 50_000
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+@dataclass
+class Series:
+    """One pool's history. The arrays are read-only views straight onto the file."""
+
+    key: str
+    ts: np.ndarray
+    apy: np.ndarray
+    tvl: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def range(self, start: Optional[int] = None, end: Optional[int] = None) -> "Series":
+        """Points with start <= ts < end (unix seconds), still without copying."""
+        lo = 0 if start is None else int(np.searchsorted(self.ts, start, side="left"))
+        hi = len(self.ts) if end is None else int(np.searchsorted(self.ts, end, side="left"))
+        return Series(self.key, self.ts[lo:hi], self.apy[lo:hi], self.tvl[lo:hi])
+
+
+def _float32(values) -> np.ndarray:
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float32, copy=False)
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float32)
+
+
+def _as_columns(ts, apy, tvl) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ts, apy, tvl = np.asarray(ts, dtype=np.int64), _float32(apy), _float32(tvl)
+    if not (len(ts) == len(apy) == len(tvl)):
+        raise ValueError("ts, apy and tvl must have the same length")
+    return ts, apy, tvl
+
+
+class HistoryStore:
+    """
+    Columnar per-pool history: one small file per pool, read through mmap.
+
+    A year of daily points is ~6 KB instead of a few hundred ORM rows, and
+    reads hand back NumPy views on the mapped file, so range queries and
+    rolling statistics never copy or parse anything. Writes replace the file
+    atomically (temp file + rename); readers holding the old mapping keep a
+    consistent snapshot.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, _SAFE_NAME.sub("_", str(key)) + SUFFIX)
+
+    def keys(self) -> List[str]:
+        return sorted(name[:-len(SUFFIX)] for name in os.listdir(self.directory) if name.endswith(SUFFIX))
+
+    def open(self, key: str) -> Optional[Series]:
+        try:
+            with open(self.path(key), "rb") as f:
+                # The mapping outlives the file handle; the arrays keep it alive
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: empty file
+            return None
+        magic, _, n = HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path(key)} is not a history file")
+        ts = np.frombuffer(mapped, dtype=np.int64, count=n, offset=HEADER.size)
+        apy = np.frombuffer(mapped, dtype=np.float32, count=n, offset=HEADER.size + 8 * n)
+        tvl = np.frombuffer(mapped, dtype=np.float32, count=n, offset=HEADER.size + 12 * n)
+        return Series(str(key), ts, apy, tvl)
+
+    def write(self, key: str, ts, apy, tvl) -> None:
+        """Replace a pool's history. Points must be sorted by ts."""
+        ts, apy, tvl = _as_columns(ts, apy, tvl)
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, 0, len(ts)))
+            f.write(ts.tobytes())
+            f.write(apy.tobytes())
+            f.write(tvl.tobytes())
+        os.replace(tmp, path)
+
+    def append(self, key: str, ts, apy, tvl) -> int:
+        """Add the points newer than the last stored one; returns how many were added."""
+        ts, apy, tvl = _as_columns(ts, apy, tvl)
+        current = self.open(key)
+        if current is not None and len(current):
+            newer = ts > current.ts[-1]
+            ts, apy, tvl = ts[newer], apy[newer], tvl[newer]
+            if not len(ts):
+                return 0
+            ts = np.concatenate([current.ts, ts])
+            apy = np.concatenate([current.apy, apy])
+            tvl = np.concatenate([current.tvl, tvl])
+            added = int(newer.sum())
+        else:
+            added = len(ts)
+        self.write(key, ts, apy, tvl)
+        return added
+
+    def last_ts(self, key: str) -> Optional[int]:
+        series = self.open(key)
+        return int(series.ts[-1]) if series is not None and len(series) else None
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of every `window` consecutive points (NaNs skipped); len(values) - window + 1 results."""
+    return _rolling_sums(values, window)[0]
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Population std of every `window` consecutive points (NaNs skipped)."""
+    mean, sq_mean = _rolling_sums(values, window)
+    return np.sqrt(np.maximum(sq_mean - mean * mean, 0.0))
+
+
+def _rolling_sums(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    if window < 1:
+        raise ValueError("window must be >= 1")
+    if len(values) < window:
+        return np.empty(0), np.empty(0)
+    x = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(x)
+    x = np.where(valid, x, 0.0)
+
+    def windowed(a):
+        c = np.concatenate([[0.0], np.cumsum(a)])
+        return c[window:] - c[:-window]
+
+    count = windowed(valid.astype(np.float64))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return windowed(x) / count, windowed(x * x) / count
+
+
+def window_summary(store: HistoryStore, keys: Sequence[str], start: Optional[int] = None,
+                   end: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+    """Mean / min / max / last APY and last TVL per pool over [start, end)."""
+    summary = {}
+    for key in keys:
+        series = store.open(key)
+        if series is None:
+            continue
+        part = series.range(start, end)
+        apy = part.apy[~np.isnan(part.apy)]
+        if not len(apy):
+            continue
+        summary[key] = {
+            "points": len(part),
+            "apy_mean": float(apy.mean(dtype=np.float64)),
+            "apy_min": float(apy.min()),
+            "apy_max": float(apy.max()),
+            "apy_last": float(apy[-1]),
+            "tvl_last": float(part.tvl[-1]),
+        }
+    return summary
+
+
+def _to_unix(ts: datetime) -> int:
+    # pool_apy_history stores naive UTC
+    return int(ts.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _grouped_history(db: Session, since: Optional[datetime]) -> Iterator[Tuple[str, List[tuple]]]:
+    h = PoolApyHistory
+    query = select(h.pool_id, h.timestamp, h.apy, h.tvl_usd).order_by(h.pool_id, h.timestamp)
+    if since is not None:
+        query = query.where(h.timestamp > since)
+    result = db.execute(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    current, points = None, []
+    for pool_id, ts, apy, tvl in result:
+        if pool_id != current and points:
+            yield str(current), points
+            points = []
+        current = pool_id
+        points.append((_to_unix(ts), apy, tvl))
+    if points:
+        yield str(current), points
+
+
+def export_history(db: Session, store: HistoryStore, since: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Copy pool_apy_history into the store in one streamed pass ordered by the
+    primary key. Only points newer than each file's last one are appended,
+    so re-running with the same `since` is cheap.
+    """
+    stats = {"pools": 0, "points": 0}
+    for pool_id, points in _grouped_history(db, since):
+        ts, apy, tvl = zip(*points)
+        added = store.append(pool_id, ts, apy, tvl)
+        stats["pools"] += 1
+        stats["points"] += added
+    return stats
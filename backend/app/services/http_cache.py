@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+import redis
+
+from app.services import http_client
+
+COMPRESS_LEVEL = 6
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+# Entries outlive their TTL so they can still be revalidated with a 304
+MAX_ENTRY_AGE = 7 * 24 * 60 * 60
+
+
+class HttpCacheMiss(Exception):
+    """Raised in offline mode when a URL was never cached."""
+
+
+class FileCacheBackend:
+    """Entries as <key>.json (metadata) + <key>.z (zlib body) in one directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        try:
+            with open(self._path(key, "json")) as f:
+                meta = json.load(f)
+            with open(self._path(key, "z"), "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, meta: Dict[str, Any], body: Optional[bytes] = None) -> None:
+        # Write to temp files and rename so readers never see half an entry
+        if body is not None:
+            tmp = self._path(key, f"z.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self._path(key, "z"))
+        tmp = self._path(key, f"json.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(key, "json"))
+
+
+class RedisCacheBackend:
+    """
+    Entries as one Redis hash per URL: meta (JSON) and body (zlib). The
+    cache's counters are kept in one more hash, summed over every process
+    using the backend.
+    """
+
+    def __init__(self, client, prefix: str = "yieldsync:http_cache:"):
+        self.client = client
+        self.prefix = prefix
+        self.stats_key = prefix + "stats"
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        meta, body = self.client.hmget(self.prefix + key, ["meta", "body"])
+        if meta is None or body is None:
+            return None
+        return json.loads(meta), body
+
+    def set(self, key: str, meta: Dict[str, Any], body: Optional[bytes] = None) -> None:
+        mapping = {"meta": json.dumps(meta)}
+        if body is not None:
+            mapping["body"] = body
+        pipe = self.client.pipeline()
+        pipe.hset(self.prefix + key, mapping=mapping)
+        pipe.expire(self.prefix + key, MAX_ENTRY_AGE)
+        pipe.execute()
+
+    def incr_counters(self, counts: Dict[str, int]) -> None:
+        # Metrics only: a failure must not fail the fetch
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for name, amount in counts.items():
+                pipe.hincrby(self.stats_key, name, amount)
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"HTTP_CACHE_ERROR: counters - {str(e)}")
+
+    def counters(self) -> Optional[Dict[str, int]]:
+        """Counters of all processes, None when Redis is unreachable."""
+        try:
+            return {k.decode(): int(v) for k, v in self.client.hgetall(self.stats_key).items()}
+        except redis.RedisError as e:
+            print(f"HTTP_CACHE_ERROR: counters - {str(e)}")
+            return None
+
+
+class HttpCache:
+    """
+    GET cache for upstream JSON endpoints.
+
+    - fresh entries (younger than the endpoint's TTL) are served directly
+    - stale entries are revalidated with If-None-Match / If-Modified-Since,
+      a 304 only refreshes the timestamp
+    - offline=True never touches the network and serves whatever is cached
+    Bodies are stored zlib-compressed; counters track hits, misses and
+    revalidations per endpoint, in this process and, when the backend
+    keeps counters (Redis), across every process sharing it.
+    """
+
+    def __init__(self, backend, ttls: Dict[str, int], default_ttl: int = 300, offline: bool = False):
+        self.backend = backend
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.offline = offline
+        self.counters = Counter()
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        raw = url + "?" + json.dumps(params or {}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @property
+    def shared_counters(self) -> bool:
+        return hasattr(self.backend, "counters")
+
+    def stats(self) -> Dict[str, int]:
+        """The backend's counters when it keeps them, else this process's."""
+        shared = self.backend.counters() if self.shared_counters else None
+        return dict(self.counters) if shared is None else shared
+
+    def _count(self, endpoint: str, outcome: str) -> None:
+        counts = {outcome: 1, f"{endpoint}.{outcome}": 1}
+        self.counters.update(counts)
+        if self.shared_counters:
+            self.backend.incr_counters(counts)
+
+    def _lookup(self, key: str, endpoint: str):
+        """Return (entry, fresh) where entry is (meta, compressed body) or None."""
+        entry = self.backend.get(key)
+        if entry is None:
+            return None, False
+        age = time.time() - entry[0].get("fetched_at", 0)
+        return entry, self.offline or age < self.ttls.get(endpoint, self.default_ttl)
+
+    @staticmethod
+    def _conditional_headers(entry) -> Dict[str, str]:
+        headers = {}
+        if entry is not None:
+            meta = entry[0]
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    @staticmethod
+    def _meta(response: httpx.Response) -> Dict[str, Any]:
+        return {
+            "fetched_at": time.time(),
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+        }
+
+    def _revalidated(self, key: str, endpoint: str, entry) -> None:
+        self.backend.set(key, {**entry[0], "fetched_at": time.time()})
+        self._count(endpoint, "revalidated")
+
+    def _offline_miss(self, url: str, endpoint: str):
+        self._count(endpoint, "miss")
+        raise HttpCacheMiss(f"{url} is not cached and the HTTP cache is offline")
+
+    def get_bytes(self, url: str, endpoint: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+        key = self.key(url, params)
+        entry, fresh = self._lookup(key, endpoint)
+        if fresh:
+            self._count(endpoint, "hit")
+            return zlib.decompress(entry[1])
+        if self.offline:
+            self._offline_miss(url, endpoint)
+
+        response = http_client.get(url, params=params, headers=self._conditional_headers(entry))
+        if response.status_code == 304 and entry is not None:
+            self._revalidated(key, endpoint, entry)
+            return zlib.decompress(entry[1])
+        response.raise_for_status()
+        self.backend.set(key, self._meta(response), zlib.compress(response.content, COMPRESS_LEVEL))
+        self._count(endpoint, "miss")
+        return response.content
+
+    async def aget_bytes(self, url: str, endpoint: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+        key = self.key(url, params)
+        entry, fresh = self._lookup(key, endpoint)
+        if fresh:
+            self._count(endpoint, "hit")
+            return zlib.decompress(entry[1])
+        if self.offline:
+            self._offline_miss(url, endpoint)
+
+        response = await http_client.aget(url, params=params, headers=self._conditional_headers(entry))
+        if response.status_code == 304 and entry is not None:
+            self._revalidated(key, endpoint, entry)
+            return zlib.decompress(entry[1])
+        response.raise_for_status()
+        self.backend.set(key, self._meta(response), zlib.compress(response.content, COMPRESS_LEVEL))
+        self._count(endpoint, "miss")
+        return response.content
+
+    def iter_bytes(self, url: str, endpoint: str, chunk_size: int = DECOMPRESS_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Streaming variant for large bodies. Cached bodies are decompressed
+        chunk by chunk; a downloaded body is compressed as it streams and only
+        stored if the consumer read it to the end.
+        """
+        key = self.key(url)
+        entry, fresh = self._lookup(key, endpoint)
+        if fresh:
+            self._count(endpoint, "hit")
+            yield from _decompress_chunks(entry[1], chunk_size)
+            return
+        if self.offline:
+            self._offline_miss(url, endpoint)
+
+        with http_client.stream("GET", url, headers=self._conditional_headers(entry)) as response:
+            if response.status_code == 304 and entry is not None:
+                self._revalidated(key, endpoint, entry)
+                yield from _decompress_chunks(entry[1], chunk_size)
+                return
+            response.raise_for_status()
+            self._count(endpoint, "miss")
+            compressor = zlib.compressobj(COMPRESS_LEVEL)
+            parts = []
+            for chunk in response.iter_bytes(chunk_size):
+                parts.append(compressor.compress(chunk))
+                yield chunk
+            parts.append(compressor.flush())
+            self.backend.set(key, self._meta(response), b"".join(parts))
+
+
+def _decompress_chunks(body: bytes, chunk_size: int) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj()
+    for start in range(0, len(body), chunk_size):
+        chunk = decompressor.decompress(body[start:start + chunk_size])
+        if chunk:
+            yield chunk
+    tail = decompressor.flush()
+    if tail:
+        yield tail
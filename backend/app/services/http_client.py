@@ -0,0 +1,147 @@
+import asyncio
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Iterator, AsyncIterator
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+
+# Max in-flight requests per upstream host, per process
+HOST_CONCURRENCY = {
+    "yields.llama.fi": 8,
+    "api.llama.fi": 8,
+    "api.etherscan.io": 5,  # free tier allows 5 calls/sec
+    "eth-mainnet.g.alchemy.com": 10,
+    "api.coingecko.com": 4,
+}
+DEFAULT_HOST_CONCURRENCY = 8
+USER_AGENT = "YieldSync/1.0"
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_async_clients = weakref.WeakKeyDictionary()
+_async_semaphores = weakref.WeakKeyDictionary()
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+def _new_client_kwargs() -> dict:
+    return {
+        "http2": HTTP2_ENABLED,
+        "timeout": DEFAULT_TIMEOUT,
+        "limits": DEFAULT_LIMITS,
+        "headers": {"User-Agent": USER_AGENT},
+        "follow_redirects": True,
+    }
+
+
+def get_client() -> httpx.Client:
+    """
+    Process-wide httpx.Client. Connections are pooled and kept alive per
+    origin, so repeated calls to the same upstream skip DNS/TCP/TLS setup.
+    Recreated after a fork (Celery prefork workers) so sockets aren't shared.
+    """
+    global _client, _client_pid
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = httpx.Client(**_new_client_kwargs())
+            _client_pid = os.getpid()
+            _host_semaphores.clear()
+        return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """httpx.AsyncClient for the running event loop (async clients can't cross loops)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(**_new_client_kwargs())
+        _async_clients[loop] = client
+        _async_semaphores[loop] = {}
+    return client
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = _host(url)
+    with _lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+        return _host_semaphores[host]
+
+
+def _async_host_semaphore(url: str) -> asyncio.Semaphore:
+    get_async_client()
+    semaphores = _async_semaphores[asyncio.get_running_loop()]
+    host = _host(url)
+    if host not in semaphores:
+        semaphores[host] = asyncio.Semaphore(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+    return semaphores[host]
+
+
+def request(method: str, url: str, **kwargs) -> httpx.Response:
+    client = get_client()
+    with _host_semaphore(url):
+        return client.request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> httpx.Response:
+    return request("POST", url, **kwargs)
+
+
+@contextmanager
+def stream(method: str, url: str, **kwargs) -> Iterator[httpx.Response]:
+    """Streamed response; the host slot is held until the body is closed."""
+    client = get_client()
+    with _host_semaphore(url):
+        with client.stream(method, url, **kwargs) as response:
+            yield response
+
+
+async def arequest(method: str, url: str, **kwargs) -> httpx.Response:
+    client = get_async_client()
+    async with _async_host_semaphore(url):
+        return await client.request(method, url, **kwargs)
+
+
+async def aget(url: str, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> httpx.Response:
+    return await arequest("POST", url, **kwargs)
+
+
+@asynccontextmanager
+async def astream(method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+    client = get_async_client()
+    async with _async_host_semaphore(url):
+        async with client.stream(method, url, **kwargs) as response:
+            yield response
+
+
+async def aclose() -> None:
+    """Close the running loop's async client (call on app shutdown)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.pop(loop, None)
+    _async_semaphores.pop(loop, None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,284 @@
+import io
+import json
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import column, literal_column, select, table, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Pool, Protocol
+from app.services.batch_scorer import score_pools_batch
+from app.services.rec_engine import build_breakdown
+
+# Pool columns written by ingestion. pool_id is the conflict key, the rest
+# are overwritten on conflict when any of them actually changed. Pool has no
+# tvl_score column, the TVL score only ends up in the breakdown text.
+DATA_COLUMNS = [
+    "protocol_id",
+    "pool_name",
+    "chain",
+    "project",
+    "symbol",
+    "tvl_usd",
+    "apy_base",
+    "apy_reward",
+    "apy",
+    "apy_pct_1d",
+    "apy_pct_7d",
+    "apy_pct_30d",
+    "apy_mean_30d",
+    "apy_base_inception",
+    "predictions",
+    "pool_meta",
+    "stablecoin",
+    "il_risk",
+    "exposure",
+    "reward_tokens",
+    "underlying_tokens",
+    "volume_usd_1d",
+    "volume_usd_7d",
+    "mu",
+    "sigma",
+    "count",
+    "outlier",
+    "risk_score",
+    "final_score",
+    "breakdown",
+]
+INSERT_COLUMNS = ["pool_id"] + DATA_COLUMNS + ["created_at", "updated_at"]
+
+UPSERT_BATCH_SIZE = 1000
+# Above this many rows pull_pool_data switches from batched upserts to COPY + merge
+COPY_THRESHOLD = 5000
+STAGING_TABLE = "pools_staging"
+
+
+@dataclass
+class IngestStats:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def add(self, total: int, returned: int, inserted: int) -> None:
+        self.inserted += inserted
+        self.updated += returned - inserted
+        self.unchanged += total - returned
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def pool_row(pool_json: Dict[str, Any], protocol_id: int, score: Dict[str, Any]) -> Dict[str, Any]:
+    """Map one DefiLlama pool dict plus its scores onto Pool columns."""
+    return {
+        "pool_id": pool_json.get("pool"),
+        "protocol_id": protocol_id,
+        "pool_name": f"{pool_json.get('project')} - {pool_json.get('symbol')}",
+        "chain": pool_json.get("chain"),
+        "project": pool_json.get("project"),
+        "symbol": pool_json.get("symbol"),
+        "tvl_usd": pool_json.get("tvlUsd"),
+        "apy_base": pool_json.get("apyBase"),
+        "apy_reward": pool_json.get("apyReward"),
+        "apy": pool_json.get("apy"),
+        "apy_pct_1d": pool_json.get("apyPct1D"),
+        "apy_pct_7d": pool_json.get("apyPct7D"),
+        "apy_pct_30d": pool_json.get("apyPct30D"),
+        "apy_mean_30d": pool_json.get("apyMean30d"),
+        "apy_base_inception": pool_json.get("apyBaseInception"),
+        "predictions": pool_json.get("predictions"),
+        "pool_meta": pool_json.get("poolMeta"),
+        "stablecoin": pool_json.get("stablecoin"),
+        "il_risk": pool_json.get("ilRisk"),
+        "exposure": pool_json.get("exposure"),
+        "reward_tokens": pool_json.get("rewardTokens"),
+        "underlying_tokens": pool_json.get("underlyingTokens"),
+        "volume_usd_1d": pool_json.get("volumeUsd1d"),
+        "volume_usd_7d": pool_json.get("volumeUsd7d"),
+        "mu": pool_json.get("mu"),
+        "sigma": pool_json.get("sigma"),
+        "count": pool_json.get("count"),
+        "outlier": pool_json.get("outlier"),
+
+        "risk_score": score.get("risk_score"),
+        "final_score": score.get("final_score"),
+        "breakdown": build_breakdown(pool_json, score.get("tvl_score")),
+    }
+
+
+def build_pool_rows(pools: Sequence[Dict[str, Any]], protocol_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """Score all pools in one vectorized pass and build their Pool rows."""
+    scores = score_pools_batch(pools).records()
+    return [pool_row(p, pid, s) for p, pid, s in zip(pools, protocol_ids, scores)]
+
+
+def _dedupe_sorted(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # ON CONFLICT can't touch the same row twice in one statement, and writing
+    # in pool_id order keeps lock acquisition order stable across workers.
+    by_id = {str(row["pool_id"]): row for row in rows}
+    return [by_id[k] for k in sorted(by_id)]
+
+
+def _on_conflict_update(stmt):
+    """Turn an INSERT into an upsert that only rewrites rows whose data changed."""
+    pools = Pool.__table__
+    excluded = stmt.excluded
+    changed = tuple_(*[pools.c[c] for c in DATA_COLUMNS]).is_distinct_from(
+        tuple_(*[excluded[c] for c in DATA_COLUMNS])
+    )
+    set_ = {c: excluded[c] for c in DATA_COLUMNS}
+    set_["updated_at"] = excluded.updated_at
+    return stmt.on_conflict_do_update(
+        index_elements=[pools.c.pool_id], set_=set_, where=changed
+    ).returning(literal_column("xmax = 0").label("inserted"))
+
+
+def upsert_pools(db: Session, rows: Iterable[Dict[str, Any]], batch_size: int = UPSERT_BATCH_SIZE) -> IngestStats:
+    """
+    Write pool rows with batched INSERT ... ON CONFLICT (pool_id) DO UPDATE.
+
+    Each batch is its own short transaction, so row locks are held for one
+    batch at a time instead of for the whole refresh.
+    """
+    stats = IngestStats()
+    rows = _dedupe_sorted(rows)
+    now = datetime.utcnow()
+    for start in range(0, len(rows), batch_size):
+        batch = [{**row, "created_at": now, "updated_at": now} for row in rows[start:start + batch_size]]
+        # executemany form: compiled once, sent as multi-row VALUES by the driver
+        result = db.execute(_on_conflict_update(pg_insert(Pool.__table__)), batch).scalars().all()
+        db.commit()
+        stats.add(len(batch), len(result), sum(result))
+    return stats
+
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_buffer(rows: Sequence[Dict[str, Any]], now: datetime) -> io.StringIO:
+    buf = io.StringIO()
+    for row in rows:
+        row = {**row, "created_at": now, "updated_at": now}
+        buf.write("\t".join(_copy_value(row[c]) for c in INSERT_COLUMNS))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def copy_merge_pools(db: Session, rows: Iterable[Dict[str, Any]]) -> IngestStats:
+    """
+    Full-feed path: COPY all rows into a temp staging table, then merge them
+    into pools with a single INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+    """
+    rows = _dedupe_sorted(rows)
+    stats = IngestStats()
+    if not rows:
+        return stats
+
+    cols = ", ".join(INSERT_COLUMNS)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE {STAGING_TABLE} ON COMMIT DROP AS "
+            f"SELECT {cols} FROM pools WITH NO DATA"
+        )
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({cols}) FROM STDIN",
+            _copy_buffer(rows, datetime.utcnow()),
+        )
+    finally:
+        cursor.close()
+
+    staging = table(STAGING_TABLE, *[column(c) for c in INSERT_COLUMNS])
+    source = select(*[staging.c[c] for c in INSERT_COLUMNS]).order_by(staging.c.pool_id)
+    stmt = _on_conflict_update(pg_insert(Pool.__table__).from_select(INSERT_COLUMNS, source))
+    result = db.execute(stmt).scalars().all()
+    db.commit()
+    stats.add(len(rows), len(result), sum(result))
+    return stats
+
+
+def load_protocol_ids(db: Session) -> Dict[str, int]:
+    """
+    One query for the whole run: protocol name and slug -> protocols.id.
+    Pool "project" values are DefiLlama slugs, so slugs win over names.
+    """
+    ids = {}
+    rows = db.query(Protocol.id, Protocol.name, Protocol.slug).all()
+    for protocol_id, name, _ in rows:
+        ids[name] = protocol_id
+    for protocol_id, _, slug in rows:
+        ids[slug] = protocol_id
+    return ids
+
+
+def _defillama_id(value: Any) -> Optional[int]:
+    # Parent protocols come back with ids like "parent#aave"
+    return int(value) if str(value).isdigit() else None
+
+
+def protocol_row(proto_json: Dict[str, Any], slug: Optional[str] = None) -> Dict[str, Any]:
+    """Map a DefiLlama /protocol/{slug} response onto Protocol columns."""
+    now = datetime.utcnow()
+    return {
+        "name": proto_json.get("name"),
+        "protocol_id": _defillama_id(proto_json.get("id")),
+        "address": proto_json.get("address"),
+        "symbol": proto_json.get("symbol"),
+        "url": proto_json.get("url"),
+        "description": proto_json.get("description"),
+        "chain": proto_json.get("chain"),
+        "logo": proto_json.get("logo"),
+        "audits": proto_json.get("audits"),
+        "category": proto_json.get("category"),
+        "twitter": proto_json.get("twitter"),
+        "parent_protocol": proto_json.get("parentProtocol"),
+        "chains": proto_json.get("chains"),
+        "chain_tvls": proto_json.get("chainTvls"),
+        "listed_at": proto_json.get("listedAt"),
+        "slug": proto_json.get("slug") or slug,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def upsert_protocols(db: Session, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    """Insert or refresh protocols by slug; returns slug -> protocols.id."""
+    if not rows:
+        return {}
+    rows = list({row["slug"]: row for row in rows}.values())
+    stmt = pg_insert(Protocol.__table__)
+    update_cols = [c for c in rows[0] if c not in ("slug", "created_at")]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Protocol.__table__.c.slug],
+        set_={c: stmt.excluded[c] for c in update_cols},
+    ).returning(Protocol.__table__.c.slug, Protocol.__table__.c.id)
+    result = db.execute(stmt, rows).all()
+    db.commit()
+    return {slug: protocol_id for slug, protocol_id in result}
+
+
+def ingest_pool_rows(db: Session, rows: Sequence[Dict[str, Any]], mode: Optional[str] = None) -> IngestStats:
+    """Write rows with `mode` "upsert" or "copy"; picks by row count when not given."""
+    if mode is None:
+        mode = "copy" if len(rows) >= COPY_THRESHOLD else "upsert"
+    if mode == "copy":
+        return copy_merge_pools(db, rows)
+    if mode == "upsert":
+        return upsert_pools(db, rows)
+    raise ValueError(f"Unknown ingestion mode: {mode}")
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+from app.core.config import settings
+
+
+class PasswordHasherBusy(Exception):
+    """More password operations are waiting than PASSWORD_HASH_MAX_PENDING allows."""
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor of a "$2b$12$..." bcrypt hash, None if it isn't one."""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    bcrypt on a small dedicated thread pool, so signup and login never run
+    it on the event loop. bcrypt releases the GIL, so the loop keeps
+    serving other requests while a hash is computed.
+
+    At most workers hashes run at once and max_pending calls may be in
+    flight (running or queued). Past that, calls fail fast with
+    PasswordHasherBusy instead of queueing a login burst for seconds.
+    """
+
+    def __init__(self, rounds: Optional[int] = None, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None):
+        self.rounds = rounds or settings.BCRYPT_ROUNDS
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self._executor = ThreadPoolExecutor(max_workers=workers or settings.PASSWORD_HASH_WORKERS,
+                                            thread_name_prefix="bcrypt")
+        # Only touched from the event loop thread
+        self._pending = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusy()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds)).decode("utf-8")
+
+    @staticmethod
+    def _verify(password: str, hashed: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+        except ValueError:
+            # Not a bcrypt hash
+            return False
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self._verify, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True when the stored hash was made with a different cost than BCRYPT_ROUNDS."""
+        return hash_rounds(hashed) != self.rounds
+
+
+password_hasher = PasswordHasher()
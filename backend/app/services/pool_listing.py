@@ -0,0 +1,140 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import Float, Numeric, Select, String, Uuid, cast, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.responses import dumps
+from app.db import read_session_at
+from app.models.models import Pool
+
+# Attribute name -> column, in model order ("pool_metadata" is the "metadata" column)
+POOL_FIELDS = {attr.key: getattr(Pool, attr.key) for attr in Pool.__mapper__.column_attrs}
+SORT_FIELDS = ("apy", "risk_score")
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+# Raw sort key and id of each row, for the cursor; never part of the output
+SORT_KEY = "_sort_key"
+PK_KEY = "_pk"
+
+
+@dataclass
+class PoolFilters:
+    protocol: Optional[str] = None
+    chain: Optional[str] = None
+    min_risk_score: Optional[float] = None
+    max_risk_score: Optional[float] = None
+    min_apy: Optional[float] = None
+    max_apy: Optional[float] = None
+    stablecoin: Optional[bool] = None
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Comma-separated field list -> attribute names; every column when empty."""
+    if not fields:
+        return list(POOL_FIELDS)
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [name for name in names if name not in POOL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def encode_cursor(sort_by: str, order: str, value: Any, pool_pk: int) -> str:
+    raw = json.dumps([sort_by, order, None if value is None else str(value), pool_pk])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple[Optional[Decimal], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, value, pool_pk = json.loads(raw)
+        value = None if value is None else Decimal(value)
+        pool_pk = int(pool_pk)
+    except (ValueError, TypeError, InvalidOperation, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort_by, order):
+        raise ValueError("Cursor belongs to a different sort order")
+    return value, pool_pk
+
+
+def _output_column(name: str):
+    # Numeric columns come back as float8 and UUIDs as text: the driver builds
+    # the final Python values, nothing is converted per value when encoding
+    column = POOL_FIELDS[name]
+    if isinstance(column.type, Numeric) and not isinstance(column.type, Float):
+        return cast(column, Float).label(name)
+    if isinstance(column.type, Uuid):
+        return cast(column, String).label(name)
+    return column.label(name)
+
+
+def pools_query(filters: PoolFilters, sort_by: str, order: str, fields: List[str],
+                cursor: Optional[str] = None) -> Select:
+    """
+    SELECT of the requested columns (plus the raw sort key and id, which the
+    cursor needs), ordered by (sort key, id) with NULLs last. The cursor is
+    the last row's (sort key, id); the next page is a row-value comparison
+    against it, so deep pages cost the same as the first one.
+    """
+    sort_column = POOL_FIELDS[sort_by]
+    query = select(*[_output_column(name) for name in fields], sort_column.label(SORT_KEY), Pool.id.label(PK_KEY))
+
+    if filters.protocol:
+        query = query.where(Pool.project == filters.protocol)
+    if filters.chain:
+        query = query.where(Pool.chain == filters.chain)
+    if filters.min_risk_score is not None:
+        query = query.where(Pool.risk_score >= filters.min_risk_score)
+    if filters.max_risk_score is not None:
+        query = query.where(Pool.risk_score <= filters.max_risk_score)
+    if filters.min_apy is not None:
+        query = query.where(Pool.apy >= filters.min_apy)
+    if filters.max_apy is not None:
+        query = query.where(Pool.apy <= filters.max_apy)
+    if filters.stablecoin is not None:
+        query = query.where(Pool.stablecoin.is_(filters.stablecoin))
+
+    descending = order == "desc"
+    if cursor:
+        value, last_pk = decode_cursor(cursor, sort_by, order)
+        if value is None:
+            # Already inside the NULL tail
+            query = query.where(sort_column.is_(None), Pool.id < last_pk if descending else Pool.id > last_pk)
+        else:
+            key = tuple_(sort_column, Pool.id)
+            after = key < (value, last_pk) if descending else key > (value, last_pk)
+            query = query.where(or_(after, sort_column.is_(None)))
+
+    if descending:
+        return query.order_by(sort_column.desc().nulls_last(), Pool.id.desc())
+    return query.order_by(sort_column.asc().nulls_last(), Pool.id.asc())
+
+
+async def fetch_page(db: AsyncSession, query: Select, fields: List[str], sort_by: str, order: str,
+                     limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of rows and the cursor for the next one (None on the last page)."""
+    rows = (await db.execute(query.limit(limit + 1))).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort_by, order, rows[-1][SORT_KEY], rows[-1][PK_KEY])
+    return [{name: row[name] for name in fields} for row in rows], next_cursor
+
+
+async def iter_ndjson(query: Select, fields: List[str], lsn: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Every row of the query as one JSON object per line, read from a
+    server-side cursor in chunks so memory stays flat whatever the size.
+    Opens its own read session (caught up to lsn): the request's session
+    is closed before a streaming body is sent.
+    """
+    async with read_session_at(lsn) as db:
+        result = await db.stream(query, execution_options={"yield_per": STREAM_CHUNK_SIZE})
+        async for rows in result.mappings().partitions():
+            yield b"".join(dumps({name: row[name] for name in fields}) + b"\n" for row in rows)
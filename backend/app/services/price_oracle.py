@@ -0,0 +1,250 @@
+import asyncio
+import json
+import time
+import weakref
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis
+from app.services import http_client
+
+COINGECKO_URL = "https://api.coingecko.com/api/v3"
+# Chain (as in token_metadata.ALCHEMY_NETWORKS) -> CoinGecko asset platform id
+COINGECKO_PLATFORMS = {
+    "ethereum": "ethereum",
+    "polygon": "polygon-pos",
+    "arbitrum": "arbitrum-one",
+    "optimism": "optimistic-ethereum",
+    "base": "base",
+}
+PRICE_KEY = "yieldsync:price:{vs}:{asset}"
+LOCK_KEY = "yieldsync:price_lock:{vs}:{asset}"
+LOCK_POLL_INTERVAL = 0.1
+# Upstream request limits: URL length many proxies and CDNs accept, and ids/contracts per call
+MAX_URL_LENGTH = 2000
+MAX_ASSETS_PER_CALL = 100
+
+
+def coin(coin_id: str) -> str:
+    """Asset name of a CoinGecko coin id, e.g. coin("ethereum")."""
+    return f"coin:{coin_id.lower()}"
+
+
+def token(platform: str, address: str) -> str:
+    """Asset name of a token contract on a CoinGecko platform, e.g. token("ethereum", "0x...")."""
+    return f"token:{platform.lower()}:{address.lower()}"
+
+
+async def _fetch_group(url: str, params: dict, assets: List[str], vs: str) -> Dict[str, Optional[float]]:
+    response = await http_client.aget(url, params=params)
+    response.raise_for_status()
+    quotes = {key.lower(): quote for key, quote in response.json().items()}
+    # Asked for but not in the response: unknown to CoinGecko
+    return {asset: quotes.get(asset.rsplit(":", 1)[1], {}).get(vs) for asset in assets}
+
+
+def chunk_by_url_length(url: str, list_param: str, values: List[str], params: dict,
+                        max_length: int = MAX_URL_LENGTH, max_count: int = MAX_ASSETS_PER_CALL) -> List[List[str]]:
+    """
+    Split values into runs whose request URL, with the run joined by commas
+    into list_param next to params, stays within max_length.
+    """
+    base = len(str(httpx.URL(url, params={list_param: "", **params})))
+    chunks, chunk, length = [], [], base
+    for value in values:
+        # Each value after the first also costs an encoded comma
+        cost = len(str(httpx.URL("", params={"": value}))) - 2 + (3 if chunk else 0)
+        if chunk and (length + cost > max_length or len(chunk) >= max_count):
+            chunks.append(chunk)
+            chunk, length, cost = [], base, cost - 3
+        chunk.append(value)
+        length += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+async def fetch_prices(assets: List[str], vs: str) -> Dict[str, Optional[float]]:
+    """
+    Upstream prices: /simple/price for coins and /simple/token_price per
+    platform, each split into as few calls as the URL limits allow and
+    sent concurrently (http_client bounds calls per host). Assets CoinGecko
+    doesn't know map to None; assets whose call failed are left out.
+    """
+    coins, tokens = [], defaultdict(list)
+    for asset in assets:
+        kind, _, name = asset.partition(":")
+        if kind == "coin":
+            coins.append(asset)
+        else:
+            tokens[name.partition(":")[0]].append(asset)
+
+    groups = []
+    requests = [(coins, f"{COINGECKO_URL}/simple/price", "ids")] if coins else []
+    requests += [(platform_assets, f"{COINGECKO_URL}/simple/token_price/{platform}", "contract_addresses")
+                 for platform, platform_assets in tokens.items()]
+    for group_assets, url, list_param in requests:
+        names = {asset.rsplit(":", 1)[1]: asset for asset in group_assets}
+        for chunk in chunk_by_url_length(url, list_param, list(names), {"vs_currencies": vs}):
+            groups.append(([names[name] for name in chunk], url, {list_param: ",".join(chunk), "vs_currencies": vs}))
+
+    results = await asyncio.gather(*[_fetch_group(url, params, group, vs) for group, url, params in groups],
+                                   return_exceptions=True)
+    prices = {}
+    for (group, url, _), result in zip(groups, results):
+        if isinstance(result, (httpx.HTTPError, ValueError)):
+            print(f"PRICE_ORACLE_ERROR: {url} ({len(group)} assets) - {str(result)}")
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            prices.update(result)
+    return prices
+
+
+class PriceOracle:
+    """
+    USD (or any vs currency) prices shared by every API and worker process
+    through Redis.
+
+    Entries are fresh for ttl seconds and kept for stale_ttl. A stale hit
+    is returned right away while one background fetch refreshes it. Misses
+    are single-flight twice over: within a process, concurrent callers
+    await the same fetch task; across processes, a short Redis lock per
+    asset lets one process call CoinGecko while the others poll for its
+    result (and fetch themselves after lock_wait). Batch lookups read
+    every asset in one MGET and fetch all misses together. Redis failures
+    are logged and degrade to fetching upstream.
+    """
+
+    def __init__(self, client=None, ttl: Optional[int] = None, stale_ttl: Optional[int] = None,
+                 lock_timeout: Optional[int] = None, lock_wait: Optional[float] = None, fetcher=fetch_prices):
+        self._client = client
+        self.ttl = ttl or settings.PRICE_TTL
+        self.stale_ttl = max(stale_ttl or settings.PRICE_STALE_TTL, self.ttl)
+        self.lock_timeout = lock_timeout or settings.PRICE_LOCK_TIMEOUT
+        self.lock_wait = settings.PRICE_LOCK_WAIT if lock_wait is None else lock_wait
+        self._fetcher = fetcher
+        # Per event loop: (vs, asset) -> task fetching it
+        self._inflight = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self):
+        return self._client or get_async_redis()
+
+    async def get_price(self, asset: str, vs: str = "usd") -> Optional[float]:
+        return (await self.get_prices([asset], vs))[asset]
+
+    async def get_token_prices(self, platform: str, contract_addresses: Iterable[str],
+                               vs: str = "usd") -> Dict[str, Optional[float]]:
+        """Price per lowercase contract address on one platform, for any number of (repeated) contracts."""
+        assets = {token(platform, address): address.lower() for address in contract_addresses}
+        prices = await self.get_prices(assets, vs)
+        return {address: prices[asset] for asset, address in assets.items()}
+
+    async def get_prices(self, assets: Iterable[str], vs: str = "usd") -> Dict[str, Optional[float]]:
+        """Price per asset, None when unknown or unavailable."""
+        assets = list(dict.fromkeys(assets))
+        if not assets:
+            return {}
+        now = time.time()
+        prices, stale, missing = {}, [], []
+        cached = await self._read(assets, vs)
+        for asset in assets:
+            entry = cached.get(asset)
+            if entry is None:
+                missing.append(asset)
+                continue
+            prices[asset] = entry["price"]
+            if now - entry["fetched_at"] >= self.ttl:
+                stale.append(asset)
+        if stale:
+            self._start(stale, vs)
+        if missing:
+            for task in set(self._start(missing, vs).values()):
+                # shield: a caller going away must not cancel a fetch others are waiting on
+                prices.update(await asyncio.shield(task))
+        return {asset: prices.get(asset) for asset in assets}
+
+    def _start(self, assets: List[str], vs: str) -> Dict[str, asyncio.Task]:
+        """The in-flight fetch of each asset, starting one task for those nobody is fetching yet."""
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        new = [asset for asset in assets if (vs, asset) not in inflight]
+        if new:
+            task = asyncio.ensure_future(self._fetch_shared(new, vs))
+            for asset in new:
+                inflight[(vs, asset)] = task
+
+            def done(finished):
+                for asset in new:
+                    inflight.pop((vs, asset), None)
+                # Background refreshes have nobody awaiting them to see the error
+                if not finished.cancelled() and finished.exception():
+                    print(f"PRICE_ORACLE_ERROR: {vs} - {str(finished.exception())}")
+            task.add_done_callback(done)
+        return {asset: inflight[(vs, asset)] for asset in assets}
+
+    async def _read(self, assets: List[str], vs: str) -> Dict[str, dict]:
+        try:
+            values = await self.client.mget([PRICE_KEY.format(vs=vs, asset=asset) for asset in assets])
+        except redis.RedisError as e:
+            print(f"PRICE_ORACLE_ERROR: {vs} - {str(e)}")
+            return {}
+        return {asset: json.loads(value) for asset, value in zip(assets, values) if value is not None}
+
+    async def _lock(self, assets: List[str], vs: str) -> List[bool]:
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for asset in assets:
+                    pipe.set(LOCK_KEY.format(vs=vs, asset=asset), "1", nx=True, ex=self.lock_timeout)
+                return [bool(ok) for ok in await pipe.execute()]
+        except redis.RedisError as e:
+            print(f"PRICE_ORACLE_ERROR: {vs} - {str(e)}")
+            return [True] * len(assets)
+
+    async def _fetch_shared(self, assets: List[str], vs: str) -> Dict[str, Optional[float]]:
+        locked = await self._lock(assets, vs)
+        mine = [asset for asset, ok in zip(assets, locked) if ok]
+        others = [asset for asset, ok in zip(assets, locked) if not ok]
+        prices = await self._fetch_and_store(mine, vs) if mine else {}
+        if others:
+            prices.update(await self._wait_for(others, vs))
+            left = [asset for asset in others if asset not in prices]
+            if left:
+                prices.update(await self._fetch_and_store(left, vs))
+        return prices
+
+    async def _wait_for(self, assets: List[str], vs: str) -> Dict[str, Optional[float]]:
+        """Prices another process is fetching, for as long as lock_wait allows."""
+        deadline = time.monotonic() + self.lock_wait
+        prices = {}
+        while True:
+            cutoff = time.time() - self.ttl
+            pending = [asset for asset in assets if asset not in prices]
+            for asset, entry in (await self._read(pending, vs)).items():
+                if entry["fetched_at"] > cutoff:
+                    prices[asset] = entry["price"]
+            if len(prices) == len(assets) or time.monotonic() >= deadline:
+                return prices
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    async def _fetch_and_store(self, assets: List[str], vs: str) -> Dict[str, Optional[float]]:
+        prices = await self._fetcher(assets, vs)
+        fetched_at = time.time()
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for asset, price in prices.items():
+                    entry = json.dumps({"price": price, "fetched_at": fetched_at})
+                    pipe.set(PRICE_KEY.format(vs=vs, asset=asset), entry, ex=self.stale_ttl)
+                for asset in assets:
+                    pipe.delete(LOCK_KEY.format(vs=vs, asset=asset))
+                await pipe.execute()
+        except redis.RedisError as e:
+            print(f"PRICE_ORACLE_ERROR: {vs} - {str(e)}")
+        return prices
+
+
+price_oracle = PriceOracle()
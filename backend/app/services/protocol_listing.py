@@ -0,0 +1,59 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Protocol
+
+PROTOCOL_FIELDS = {attr.key: getattr(Protocol, attr.key) for attr in Protocol.__mapper__.column_attrs}
+# Per-chain TVL/token time series: megabytes per protocol, only served through /protocols/{slug}/tvl
+HEAVY_FIELDS = ("chain_tvls",)
+LIST_FIELDS = [name for name in PROTOCOL_FIELDS if name not in HEAVY_FIELDS]
+# chainTvls keys that are not chains (plus "<chain>-<extra>" variants); not part of the total
+EXTRA_TVL_KEYS = {"staking", "pool2", "borrowed", "doublecounted", "liquidstaking", "vesting", "offers",
+                  "treasury", "dcAndLsOverlap"}
+DEFAULT_MAX_POINTS = 500
+MAX_POINTS = 5000
+
+
+async def list_protocols(db: AsyncSession, include_tvls: bool = False) -> List[Dict[str, Any]]:
+    """Every protocol as a dict; the heavy JSONB columns are never read unless asked for."""
+    fields = list(PROTOCOL_FIELDS) if include_tvls else LIST_FIELDS
+    query = select(*[PROTOCOL_FIELDS[name].label(name) for name in fields]).order_by(Protocol.id)
+    return [dict(row) for row in (await db.execute(query)).mappings()]
+
+
+def _total_chains(chains: Optional[List[str]], series: Dict[str, Any]) -> List[str]:
+    listed = [chain for chain in chains or [] if chain in series]
+    if listed:
+        return listed
+    return [key for key in series if "-" not in key and key not in EXTRA_TVL_KEYS]
+
+
+async def tvl_series(db: AsyncSession, slug: str,
+                     chain: Optional[str] = None) -> Optional[Tuple[List[str], np.ndarray, np.ndarray]]:
+    """
+    (chains summed, dates, TVL in USD) for one chain, or summed over the
+    protocol's chains when chain is None. Postgres strips the token
+    breakdowns, so only the {date, totalLiquidityUSD} arrays leave the
+    database. None when the protocol doesn't exist; empty arrays when the
+    chain has no series.
+    """
+    each = func.jsonb_each(Protocol.chain_tvls).table_valued("key", "value")
+    tvl_by_chain = select(func.jsonb_object_agg(each.c.key, each.c.value.op("->")("tvl"))).scalar_subquery()
+    row = (await db.execute(select(Protocol.chains, tvl_by_chain).where(Protocol.slug == slug))).first()
+    if row is None:
+        return None
+
+    chains, series = row[0], row[1] or {}
+    names = [chain] if chain else _total_chains(chains, series)
+    points = [p for name in names for p in series.get(name) or []]
+    if not points:
+        return names, np.empty(0, dtype=np.int64), np.empty(0)
+
+    dates = np.fromiter((p["date"] for p in points), dtype=np.int64, count=len(points))
+    values = np.fromiter((p.get("totalLiquidityUSD") or 0 for p in points), dtype=np.float64, count=len(points))
+    # A chain missing on a date contributes 0 to that date's total
+    dates, inverse = np.unique(dates, return_inverse=True)
+    return names, dates, np.bincount(inverse, weights=values)
@@ -1,46 +1,174 @@
-import requests
 import json
-from typing import Dict, Any, List, Optional
+import codecs
+from typing import Dict, Any, List, Optional, Iterable, Iterator
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.services.http_cache import HttpCache, FileCacheBackend, RedisCacheBackend
 
 POOLS_URL = "https://yields.llama.fi/pools"
 PROTOCOL_URL_TMPL = "https://api.llama.fi/protocol/{slug}"
+CHART_URL_TMPL = "https://yields.llama.fi/chart/{pool_id}"
+
+# Seconds a cached DefiLlama response is used before it is revalidated
+CACHE_TTLS = {
+    "pools": 5 * 60,
+    "protocol": 60 * 60,
+    "chart": 60 * 60,
+}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+JSON_WHITESPACE = " \t\n\r"
+
+
+_http_cache = None
+
+
+def get_http_cache() -> HttpCache:
+    global _http_cache
+    if _http_cache is None:
+        if settings.HTTP_CACHE_BACKEND == "redis":
+            backend = RedisCacheBackend(get_redis())
+        else:
+            backend = FileCacheBackend(settings.HTTP_CACHE_DIR)
+        _http_cache = HttpCache(backend, CACHE_TTLS, offline=settings.HTTP_CACHE_OFFLINE)
+    return _http_cache
+
+
+class _JsonArrayStream:
+    """
+    Incremental reader for one array inside a top-level JSON object.
+
+    Bytes are pulled from `chunks` only when the buffer runs out, and the
+    consumed part of the buffer is dropped as parsing moves on, so memory
+    stays bounded by the chunk size plus the largest single array item.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._exhausted = False
+
+    def _fill(self) -> bool:
+        if self._exhausted:
+            return False
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        try:
+            self._buf += self._utf8.decode(next(self._chunks))
+        except StopIteration:
+            self._buf += self._utf8.decode(b"", final=True)
+            self._exhausted = True
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in JSON_WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self._pos}, got {char!r}")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self._buf) and not self._exhausted:
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+    def items(self, key: str) -> Iterator[Any]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            name = self._value()
+            self._expect(":")
+            if name == key:
+                self._expect("[")
+                if self._peek() == "]":
+                    return
+                while True:
+                    yield self._value()
+                    if self._expect(",]") == "]":
+                        return
+            self._value()
+            if self._expect(",}") == "}":
+                return
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str = "data") -> Iterator[Any]:
+    """Yield the items of the `key` array of a JSON object read from byte chunks."""
+    return _JsonArrayStream(chunks).items(key)
+
+
+def iter_pools(limit: Optional[int] = None, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Stream pools from the DefiLlama /pools feed one dict at a time.
+
+    The response body (or the cached copy of it) is parsed as it arrives;
+    once `limit` pools have been yielded the connection is closed without
+    downloading the rest.
+    """
+    chunks = get_http_cache().iter_bytes(POOLS_URL, "pools", chunk_size)
+    try:
+        count = 0
+        for pool in iter_json_array(chunks, "data"):
+            yield pool
+            count += 1
+            if limit and count >= limit:
+                return
+        # Read the few bytes after the array so a complete body gets cached
+        for _ in chunks:
+            pass
+    finally:
+        chunks.close()
+
+
+def iter_pool_chunks(size: int = 1000, limit: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """Same as iter_pools, grouped into lists of at most `size` pools."""
+    chunk = []
+    for pool in iter_pools(limit):
+        chunk.append(pool)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 
 def fetch_pools(limit: Optional[int] = None) -> List[Dict[str, Any]]:
-    resp = requests.get(POOLS_URL, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
-    pools = data.get("data", [])
-    return pools[:limit] if limit else pools
+    return list(iter_pools(limit))
 
 def fetch_protocol_details(slug: str) -> Dict[str, Any]:
-    resp = requests.get(PROTOCOL_URL_TMPL.format(slug=slug), timeout=30)
-    resp.raise_for_status()
-    return resp.json()
-
-def apy_search(pool_id):
-    url = f"https://yields.llama.fi/chart/{pool_id}"
-    response = requests.get(url)
-    data = response.json()
-    pool_data = data.get("data", [])
-    # Start from the latest and go backwards until apy is not 0
-    latest_valid = None
-    is_latest = True
-    count = 0
-    for entry in reversed(pool_data):
-        count += 1
-        apy = entry.get("apy")
-        if apy and apy != 0:
-            latest_valid = entry
-            break
-    if latest_valid is None and pool_data:
-        # fallback: return the latest even if apy is 0
-        latest_valid = pool_data[-1]
-        count = 0
-    if count > 1:
-        is_latest = False
-        latest_valid["main_apy"] = pool_data[-1]["apy"]
-    latest_valid["latest"] = is_latest
-
-    print(count)
-    print(latest_valid)
-    return latest_valid
\ No newline at end of file
+    return json.loads(get_http_cache().get_bytes(PROTOCOL_URL_TMPL.format(slug=slug), "protocol"))
+
+async def afetch_protocol_details(slug: str) -> Dict[str, Any]:
+    return json.loads(await get_http_cache().aget_bytes(PROTOCOL_URL_TMPL.format(slug=slug), "protocol"))
+
+def fetch_pool_chart(pool_id: str) -> List[Dict[str, Any]]:
+    """Full APY/TVL history of a pool; DefiLlama has no "since" parameter."""
+    return json.loads(get_http_cache().get_bytes(CHART_URL_TMPL.format(pool_id=pool_id), "chart")).get("data", [])
+
+async def afetch_pool_chart(pool_id: str) -> List[Dict[str, Any]]:
+    body = await get_http_cache().aget_bytes(CHART_URL_TMPL.format(pool_id=pool_id), "chart")
+    return json.loads(body).get("data", [])
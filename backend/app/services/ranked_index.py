@@ -0,0 +1,143 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from app.db import read_session_at
+from app.models.models import Pool
+from app.services.response_cache import get_dataset_state
+
+# Highest risk_score (percent) each tolerance accepts; pools without a score never match
+RISK_TOLERANCE_MAX_SCORE = {"low": 40.0, "medium": 65.0, "high": float("inf")}
+INDEX_FIELDS = ("pool_id", "pool_name", "chain", "project", "symbol", "apy", "tvl_usd", "risk_score",
+                "final_score", "stablecoin")
+# How often the dataset version is looked up in Redis; requests in between use the index as is
+VERSION_CHECK_INTERVAL = 1.0
+MAX_TOP_N = 100
+
+
+def _floats(values: Sequence[Any]) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+@dataclass
+class RankedPoolIndex:
+    """
+    Pools presorted by final_score (best first) with one boolean mask per
+    filter value. A query ANDs at most three masks and takes the first N
+    set positions, which are already the N best; the response records are
+    prebuilt, so nothing is sorted or serialized per request.
+    """
+    version: int
+    records: List[Dict[str, Any]]
+    risk_masks: Dict[str, np.ndarray]
+    chain_masks: Dict[str, np.ndarray]
+    stablecoin_mask: np.ndarray
+
+    @classmethod
+    def build(cls, rows: Sequence[Dict[str, Any]], version: int = 0) -> "RankedPoolIndex":
+        final_score = _floats([row["final_score"] for row in rows])
+        # Stable sort on -score keeps ties in input order; unscored pools (NaN) go last
+        order = np.argsort(-np.nan_to_num(final_score, nan=-np.inf), kind="stable")
+        rows = [rows[i] for i in order]
+
+        risk = _floats([row["risk_score"] for row in rows])
+        chains = np.array([(row["chain"] or "").lower() for row in rows], dtype=object)
+        records = [
+            {
+                "pool_id": str(row["pool_id"]),
+                **{name: row[name] for name in ("pool_name", "chain", "project", "symbol")},
+                **{name: None if row[name] is None else float(row[name])
+                   for name in ("apy", "tvl_usd", "risk_score", "final_score")},
+                "stablecoin": bool(row["stablecoin"]),
+            }
+            for row in rows
+        ]
+        with np.errstate(invalid="ignore"):
+            risk_masks = {name: risk <= cap for name, cap in RISK_TOLERANCE_MAX_SCORE.items()}
+        return cls(
+            version=version,
+            records=records,
+            risk_masks=risk_masks,
+            chain_masks={chain: chains == chain for chain in set(chains) if chain},
+            stablecoin_mask=np.array([record["stablecoin"] for record in records], dtype=bool),
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def top(self, n: int, risk_tolerance: Optional[str] = None, chain: Optional[str] = None,
+            stablecoin: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Best n pools matching every given filter, best first."""
+        if risk_tolerance is not None and risk_tolerance not in self.risk_masks:
+            raise ValueError(f"risk_tolerance must be one of {', '.join(self.risk_masks)}")
+        masks = []
+        if risk_tolerance is not None:
+            masks.append(self.risk_masks[risk_tolerance])
+        if chain:
+            mask = self.chain_masks.get(chain.lower())
+            if mask is None:
+                return []
+            masks.append(mask)
+        if stablecoin is not None:
+            masks.append(self.stablecoin_mask if stablecoin else ~self.stablecoin_mask)
+
+        if not masks:
+            return self.records[:n]
+        mask = masks[0] if len(masks) == 1 else np.logical_and.reduce(masks)
+        return [self.records[i] for i in np.flatnonzero(mask)[:n]]
+
+
+async def load_index_rows(lsn: Optional[str] = None) -> List[Dict[str, Any]]:
+    query = select(*[getattr(Pool, name).label(name) for name in INDEX_FIELDS])
+    async with read_session_at(lsn) as db:
+        return [dict(row) for row in (await db.execute(query)).mappings()]
+
+
+class RankedIndexHolder:
+    """
+    The API process's current RankedPoolIndex. It is rebuilt from Postgres
+    when the worker has bumped the "pools" dataset version; the version is
+    looked up at most once per VERSION_CHECK_INTERVAL. One rebuild runs at
+    a time and requests keep using the previous index meanwhile.
+    """
+
+    def __init__(self, loader=load_index_rows, check_interval: float = VERSION_CHECK_INTERVAL):
+        self.loader = loader
+        self.check_interval = check_interval
+        self.index: Optional[RankedPoolIndex] = None
+        self._checked_at = 0.0
+        self._rebuild: Optional[asyncio.Task] = None
+
+    async def _build(self, version: int, lsn: Optional[str]) -> RankedPoolIndex:
+        try:
+            # Read where that version's commit is visible, or a replica's older rows get its label
+            index = RankedPoolIndex.build(await self.loader(lsn), version)
+        except Exception as e:
+            print(f"RANKED_INDEX_ERROR: version {version} - {str(e)}")
+            raise
+        self.index = index
+        return index
+
+    async def get(self) -> RankedPoolIndex:
+        now = time.monotonic()
+        if self.index is not None and now - self._checked_at < self.check_interval:
+            return self.index
+        self._checked_at = now
+
+        version, lsn = await get_dataset_state("pools")
+        if self.index is not None and (version == self.index.version or version < 0):
+            return self.index
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.create_task(self._build(version, lsn))
+            # Already logged; retried on the next version check
+            self._rebuild.add_done_callback(lambda task: task.cancelled() or task.exception())
+        if self.index is None:
+            return await asyncio.shield(self._rebuild)
+        return self.index
+
+
+ranked_index = RankedIndexHolder()
@@ -3,7 +3,15 @@ import datetime
 from typing import Dict, Any, List, Optional
 import requests
 import math
-from app.pull_data import fetch_pools, fetch_protocol_details, apy_search
+from app.services.pull_data import fetch_pools, fetch_protocol_details
+from app.services.batch_scorer import score_pools_batch, top_n_indices
+
+def pool_apy(pool: dict) -> float:
+    """apyBase + apyReward when either is set, otherwise the pool's apy."""
+    apy = pool.get("apy")
+    if pool.get("apyBase") or pool.get("apyReward"):
+        apy = (pool.get("apyBase") or 0) + (pool.get("apyReward") or 0)
+    return apy
 
 def score_defillama_pool(pool: dict) -> dict:
     """
@@ -15,9 +23,7 @@ def score_defillama_pool(pool: dict) -> dict:
     - pool (the original pool data)
     """
     # 1) APY
-    apy = pool.get("apy")
-    if pool.get("apyBase") or pool.get("apyReward"):
-        apy = (pool.get("apyBase") or 0) + (pool.get("apyReward") or 0)
+    apy = pool_apy(pool)
 
     # 2) TVL score (log-scaled, 0-100)
     tvl_usd = pool.get("tvlUsd") or 0
@@ -57,6 +63,29 @@ def score_defillama_pool(pool: dict) -> dict:
 
     # final_score = max(0, min(final_score, 100))  # clamp to 0–100
 
+    return {
+        "apy": round(apy, 4),
+        "tvl_score": tvl_score,
+        "risk_score": f"{risk_score_percent}%",
+        "final_score": final_score,
+        "breakdown": build_breakdown(pool, tvl_score),
+        "pool": pool  # Add the original pool data to the response
+    }
+
+def build_breakdown(pool: dict, tvl_score: float) -> dict:
+    """
+    Human-readable explanation of a pool's score, as stored in Pool.breakdown.
+    Split out of score_defillama_pool so batch scoring can reuse it per row.
+    """
+    apy = pool_apy(pool)
+    tvl_usd = pool.get("tvlUsd") or 0
+    il_risk = pool.get("ilRisk", "no")
+    stablecoin = pool.get("stablecoin", False)
+    predicted_prob = (pool.get("predictions") or {}).get("predictedProbability", 100)
+    sigma = pool.get("sigma", 0)
+    exposure = pool.get("exposure", "single")
+    volatility_norm = min(sigma / 1.0, 1)
+
     # Explanations
     reasons = []
     if apy > 50: reasons.append("Very high APY may be unsustainable.")
@@ -67,23 +96,17 @@ def score_defillama_pool(pool: dict) -> dict:
     if not reasons: reasons.append("Pool appears relatively safe.")
 
     return {
-        "apy": round(apy, 4),
-        "tvl_score": tvl_score,
-        "risk_score": f"{risk_score_percent}%",
-        "final_score": final_score,
-        "breakdown": {
-            "tvl": f"Liquidity: ${tvl_usd:,.0f} → score {tvl_score}",
-            "impermanent_loss": "Yes" if il_risk == "yes" else "No",
-            "stablecoin": "Stablecoin pool" if stablecoin else "Volatile tokens",
-            "volatility_sigma": f"{sigma:.3f} (normalized {volatility_norm:.2f})",
-            "prediction_confidence": f"{predicted_prob}%",
-            "exposure": "Multi-asset" if exposure == "multi" else "Single-asset",
-            "explanation": " ".join(reasons)
-        },
-        "pool": pool  # Add the original pool data to the response
+        "tvl": f"Liquidity: ${tvl_usd:,.0f} → score {tvl_score}",
+        "impermanent_loss": "Yes" if il_risk == "yes" else "No",
+        "stablecoin": "Stablecoin pool" if stablecoin else "Volatile tokens",
+        "volatility_sigma": f"{sigma:.3f} (normalized {volatility_norm:.2f})",
+        "prediction_confidence": f"{predicted_prob}%",
+        "exposure": "Multi-asset" if exposure == "multi" else "Single-asset",
+        "explanation": " ".join(reasons)
     }
 
 def get_top_pools(pools: List[dict], top_n: int = 5) -> List[dict]:
-    scored_pools = [score_defillama_pool(pool) for pool in pools]
-    sorted_pools = sorted(scored_pools, key=lambda x: x["final_score"], reverse=True)
-    return sorted_pools[:top_n]
\ No newline at end of file
+    # Rank on the vectorized scores, then build the full score dict
+    # (breakdown included) only for the winning pools.
+    scores = score_pools_batch(pools)
+    return [score_defillama_pool(pools[i]) for i in top_n_indices(scores.final_score, top_n)]
\ No newline at end of file
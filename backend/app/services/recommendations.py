@@ -0,0 +1,178 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Float, cast, delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.models.models import Pool, Recommendation, User
+from app.services.ranked_index import RISK_TOLERANCE_MAX_SCORE
+
+RECOMMENDATIONS_PER_USER = 5
+# Users per INSERT ... SELECT; each statement carries the ids as one array
+USER_BATCH_SIZE = 10_000
+# pg_advisory_xact_lock key serializing materialize_recommendations runs
+MATERIALIZE_LOCK_KEY = 7_302_020
+# APY above this doesn't earn a growth cohort any more points
+APY_BONUS_CAP = 100
+
+EXPERIENCE_LEVELS = ("beginner", "intermediate", "advanced")
+GROWTH_WORDS = ("growth", "grow", "maximi", "max ", "high yield", "high return", "aggressive")
+STEADY_WORDS = ("steady", "low-risk", "low risk", "stable", "preserv", "safe", "passive", "income")
+# Per goal: (weight of capped APY, weight of risk_score, bonus for stablecoin pools), added to final_score
+GOAL_WEIGHTS = {
+    "steady": (0.0, 0.25, 5.0),
+    "balanced": (0.0, 0.0, 0.0),
+    "growth": (0.25, 0.0, 0.0),
+}
+
+# One statement per cohort batch: every user gets the cohort's top-K rows, pool columns are copied server-side
+INSERT_SQL = text("""
+    INSERT INTO recommendations
+        (user_id, pool_id, protocol_id, score, apy, tvl_score, risk_score, final_score, breakdown,
+         created_at, updated_at)
+    SELECT u.user_id, p.id, p.protocol_id, r.score, p.apy, r.tvl_score, p.risk_score, p.final_score, p.breakdown,
+           :now, :now
+    FROM unnest(CAST(:user_ids AS integer[])) AS u(user_id)
+    CROSS JOIN unnest(CAST(:pool_ids AS integer[]), CAST(:scores AS numeric[]), CAST(:tvl_scores AS numeric[]))
+        WITH ORDINALITY AS r(pool_id, score, tvl_score, rank)
+    JOIN pools p ON p.id = r.pool_id
+    ORDER BY u.user_id, r.rank
+""")
+
+
+def _floats(values: Sequence) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+class Cohort(NamedTuple):
+    risk_tolerance: str
+    experience_level: str
+    goal: str
+
+
+def goal_profile(primary_goal: Optional[str]) -> str:
+    """Free-text primary_goal -> "growth", "steady" or "balanced"."""
+    goal = f" {(primary_goal or '').lower()} "
+    if any(word in goal for word in GROWTH_WORDS):
+        return "growth"
+    if any(word in goal for word in STEADY_WORDS):
+        return "steady"
+    return "balanced"
+
+
+def cohort_for(risk_tolerance: Optional[str], experience_level: Optional[str], primary_goal: Optional[str]) -> Cohort:
+    """Normalized cohort of a user profile; unknown values fall back to the most cautious choice."""
+    risk = (risk_tolerance or "").strip().lower()
+    experience = (experience_level or "").strip().lower()
+    return Cohort(
+        risk if risk in RISK_TOLERANCE_MAX_SCORE else "low",
+        experience if experience in EXPERIENCE_LEVELS else "beginner",
+        goal_profile(primary_goal),
+    )
+
+
+@dataclass
+class PoolArrays:
+    """The pool columns ranking needs, one entry per pool (NaN for NULL numbers)."""
+    ids: np.ndarray
+    apy: np.ndarray
+    tvl_usd: np.ndarray
+    risk_score: np.ndarray
+    final_score: np.ndarray
+    stablecoin: np.ndarray
+    il_risk: np.ndarray
+    outlier: np.ndarray
+
+    @classmethod
+    def load(cls, db: Session) -> "PoolArrays":
+        rows = db.execute(select(
+            Pool.id, cast(Pool.apy, Float), cast(Pool.tvl_usd, Float), cast(Pool.risk_score, Float),
+            cast(Pool.final_score, Float), Pool.stablecoin, Pool.il_risk, Pool.outlier,
+        )).all()
+        ids, apy, tvl, risk, final, stablecoin, il_risk, outlier = zip(*rows) if rows else ([],) * 8
+        return cls(
+            ids=np.array(ids, dtype=np.int64),
+            apy=_floats(apy),
+            tvl_usd=_floats(tvl),
+            risk_score=_floats(risk),
+            final_score=_floats(final),
+            stablecoin=np.array([bool(v) for v in stablecoin], dtype=bool),
+            il_risk=np.array([str(v).lower() == "yes" for v in il_risk], dtype=bool),
+            outlier=np.array([bool(v) for v in outlier], dtype=bool),
+        )
+
+    def tvl_score(self) -> np.ndarray:
+        # Same log scale as score_defillama_pool
+        return np.minimum(100, np.round(np.log10(np.nan_to_num(self.tvl_usd) + 1) * 20, 2))
+
+
+def rank_cohort(pools: PoolArrays, cohort: Cohort, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions (into pools) of the cohort's top_k pools, best first, and their cohort scores."""
+    with np.errstate(invalid="ignore"):
+        eligible = ~np.isnan(pools.final_score) & (pools.risk_score <= RISK_TOLERANCE_MAX_SCORE[cohort.risk_tolerance])
+    if cohort.experience_level == "beginner":
+        eligible &= ~pools.il_risk & ~pools.outlier
+    elif cohort.experience_level == "intermediate":
+        eligible &= ~pools.outlier
+
+    apy_weight, risk_weight, stable_bonus = GOAL_WEIGHTS[cohort.goal]
+    score = (pools.final_score
+             + apy_weight * np.clip(np.nan_to_num(pools.apy), 0, APY_BONUS_CAP)
+             - risk_weight * np.nan_to_num(pools.risk_score)
+             + stable_bonus * pools.stablecoin)
+    candidates = np.flatnonzero(eligible)
+    # Ties broken by pool id so reruns write the same rows
+    best = candidates[np.lexsort((pools.ids[candidates], -score[candidates]))[:top_k]]
+    return best, np.round(score[best], 4)
+
+
+def group_users(db: Session) -> Dict[Cohort, List[int]]:
+    """User ids per normalized cohort; Postgres groups by the raw profile values first."""
+    query = select(
+        User.risk_tolerance, User.experience_level, User.primary_goal, func.array_agg(User.id),
+    ).group_by(User.risk_tolerance, User.experience_level, User.primary_goal)
+    cohorts = defaultdict(list)
+    for risk_tolerance, experience_level, primary_goal, user_ids in db.execute(query):
+        cohorts[cohort_for(risk_tolerance, experience_level, primary_goal)].extend(user_ids)
+    return cohorts
+
+
+def materialize_recommendations(db: Session, top_k: int = RECOMMENDATIONS_PER_USER) -> Dict[str, int]:
+    """
+    Replace every user's recommendations with the top_k pools of their
+    cohort. Each cohort is ranked once in numpy, then written with one
+    INSERT ... SELECT per USER_BATCH_SIZE users. Everything happens in one
+    transaction, so readers switch from the old set to the new one at commit.
+
+    Overlapping runs are serialized by a transaction-scoped advisory lock:
+    without it, neither run's DELETE sees the other's uncommitted inserts
+    and both sets survive. The lock is taken before reading anything, so a
+    run that waited ranks the pools as they are once it gets the lock.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(MATERIALIZE_LOCK_KEY)))
+    pools = PoolArrays.load(db)
+    tvl_score = pools.tvl_score()
+    cohorts = group_users(db)
+    now = datetime.utcnow()
+
+    db.execute(delete(Recommendation).where(Recommendation.user_id.isnot(None)))
+    written = 0
+    for cohort, user_ids in cohorts.items():
+        best, scores = rank_cohort(pools, cohort, top_k)
+        if not len(best):
+            continue
+        params = {
+            "now": now,
+            "pool_ids": pools.ids[best].tolist(),
+            "scores": scores.tolist(),
+            "tvl_scores": tvl_score[best].tolist(),
+        }
+        user_ids = sorted(user_ids)
+        for start in range(0, len(user_ids), USER_BATCH_SIZE):
+            batch = user_ids[start:start + USER_BATCH_SIZE]
+            written += db.execute(INSERT_SQL, {**params, "user_ids": batch}).rowcount
+    db.commit()
+    return {"users": sum(len(ids) for ids in cohorts.values()), "cohorts": len(cohorts), "rows": written}
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis, get_redis
+from app.core.responses import ENCODINGS, compress
+
+DATASETS = ("pools", "protocols", "recommendations")
+VERSION_KEY = "yieldsync:dataset_version:{dataset}"
+# Primary WAL position the version was bumped at, for reads from the replicas
+LSN_KEY = "yieldsync:dataset_lsn:{dataset}"
+ENTRY_KEY = "yieldsync:response:{dataset}:{version}:{digest}:{encoding}"
+STATS_KEY = "yieldsync:response_cache_stats"
+
+
+def bump_dataset_version(dataset: str, client: Optional[redis.Redis] = None, lsn: Optional[str] = None) -> int:
+    """
+    Called by the worker after it committed new data: readers move on to
+    entries of the new version, the old ones just expire. lsn is the
+    primary's WAL position after the commit (see db.current_wal_lsn); it
+    is stored together with the version so readers only fill the new
+    version from a replica that has replayed that far.
+    """
+    client = client or get_redis()
+    if lsn is None:
+        return client.incr(VERSION_KEY.format(dataset=dataset))
+    pipe = client.pipeline()
+    pipe.set(LSN_KEY.format(dataset=dataset), lsn)
+    pipe.incr(VERSION_KEY.format(dataset=dataset))
+    return pipe.execute()[1]
+
+
+async def get_dataset_state(dataset: str, client=None) -> Tuple[int, Optional[str]]:
+    """
+    (current version, WAL position published with it or None). The version
+    is 0 before the first bump and -1 when Redis is unreachable.
+    """
+    try:
+        version, lsn = await (client or get_async_redis()).mget(
+            [VERSION_KEY.format(dataset=dataset), LSN_KEY.format(dataset=dataset)]
+        )
+    except redis.RedisError as e:
+        print(f"RESPONSE_CACHE_ERROR: {dataset} - {str(e)}")
+        return -1, None
+    return int(version or 0), lsn.decode() if lsn else None
+
+
+async def get_dataset_version(dataset: str, client=None) -> int:
+    """Current version of a dataset, 0 before the first bump and -1 when Redis is unreachable."""
+    return (await get_dataset_state(dataset, client))[0]
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """Same effective query -> same key, whatever the parameter order; unset values are dropped."""
+    return json.dumps({k: v for k, v in sorted(params.items()) if v is not None}, separators=(",", ":"), default=str)
+
+
+def dataset_etag(dataset: str, version: int, params: Dict[str, Any], encoding: Optional[str] = None,
+                 weak: bool = False) -> str:
+    """
+    ETag of a response that only depends on the dataset version and the
+    query. Strong ETags name the content encoding, since each encoding is a
+    different byte sequence; responses compressed later by middleware get
+    a weak one instead.
+    """
+    digest = hashlib.sha256(normalize_params(params).encode("utf-8")).hexdigest()[:16]
+    if weak:
+        return f'W/"{dataset}-{version}-{digest}"'
+    return f'"{dataset}-{version}-{digest}-{encoding or "identity"}"'
+
+
+class ResponseCache:
+    """
+    Serialized API responses in Redis, keyed by dataset version + normalized
+    query parameters and stored once per content encoding (brotli, gzip), so
+    a hit goes out without recompressing. A bumped version makes every older
+    entry unreachable, so nothing stale is served and nothing has to be
+    deleted. Redis failures are logged and treated as misses.
+
+    Counters per dataset live in one Redis hash, so every API worker adds
+    to the same numbers: "requests" is counted on lookup and "misses" on
+    store (every miss stores), hits = requests - misses.
+    """
+
+    def __init__(self, client=None, ttl: Optional[int] = None):
+        self._client = client
+        self.ttl = ttl or settings.RESPONSE_CACHE_TTL
+        # Stores of the encodings nobody is waiting for; referenced until done
+        self._background = set()
+
+    @property
+    def client(self):
+        return self._client or get_async_redis()
+
+    @staticmethod
+    def entry_key(dataset: str, version: int, params: Dict[str, Any], encoding: str = "gzip") -> str:
+        digest = hashlib.sha256(normalize_params(params).encode("utf-8")).hexdigest()[:32]
+        return ENTRY_KEY.format(dataset=dataset, version=version, digest=digest, encoding=encoding)
+
+    async def get(self, dataset: str, params: Dict[str, Any], encoding: str = "gzip",
+                  version: Optional[int] = None) -> Tuple[int, Optional[bytes]]:
+        """
+        Return (current dataset version, body in that encoding or None). Pass
+        the version back to set(); pass it in when already looked up.
+        """
+        if version is not None and version < 0:
+            return version, None
+        try:
+            if version is None:
+                version = int(await self.client.get(VERSION_KEY.format(dataset=dataset)) or 0)
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(self.entry_key(dataset, version, params, encoding))
+            pipe.hincrby(STATS_KEY, f"{dataset}.requests", 1)
+            body, _ = await pipe.execute()
+            return version, body
+        except redis.RedisError as e:
+            print(f"RESPONSE_CACHE_ERROR: {dataset} - {str(e)}")
+            return -1, None
+
+    async def set(self, dataset: str, version: int, params: Dict[str, Any], body: bytes,
+                  encoding: Optional[str] = None) -> Dict[str, bytes]:
+        """
+        Store a serialized response in every encoding. Compression runs in
+        the default thread pool, off the event loop: `encoding` (the one the
+        client negotiated) before returning {encoding: body} for the
+        response, the others in the background. Returns {} for identity and
+        when Redis is down.
+        """
+        if version < 0:
+            return {}
+        bodies = {}
+        if encoding in ENCODINGS:
+            bodies[encoding] = await asyncio.get_running_loop().run_in_executor(None, compress, body, encoding)
+            await self._store(dataset, version, params, bodies, count_miss=True)
+        rest = [other for other in ENCODINGS if other not in bodies]
+        task = asyncio.create_task(self._compress_and_store(dataset, version, params, body, rest, not bodies))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return bodies
+
+    async def _compress_and_store(self, dataset: str, version: int, params: Dict[str, Any], body: bytes,
+                                  encodings: Iterable[str], count_miss: bool) -> None:
+        loop = asyncio.get_running_loop()
+        bodies = {encoding: await loop.run_in_executor(None, compress, body, encoding) for encoding in encodings}
+        await self._store(dataset, version, params, bodies, count_miss)
+
+    async def _store(self, dataset: str, version: int, params: Dict[str, Any], bodies: Dict[str, bytes],
+                     count_miss: bool) -> None:
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for encoding, compressed in bodies.items():
+                pipe.set(self.entry_key(dataset, version, params, encoding), compressed, ex=self.ttl)
+            if count_miss:
+                pipe.hincrby(STATS_KEY, f"{dataset}.misses", 1)
+            await pipe.execute()
+        except redis.RedisError as e:
+            print(f"RESPONSE_CACHE_ERROR: {dataset} - {str(e)}")
+
+    async def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Counters per dataset; all zero while Redis is unreachable."""
+        try:
+            raw = {k.decode(): int(v) for k, v in (await self.client.hgetall(STATS_KEY)).items()}
+        except redis.RedisError as e:
+            print(f"RESPONSE_CACHE_ERROR: stats - {str(e)}")
+            raw = {}
+        stats = {}
+        for dataset in DATASETS:
+            requests = raw.get(f"{dataset}.requests", 0)
+            misses = min(raw.get(f"{dataset}.misses", 0), requests)
+            stats[dataset] = {
+                "requests": requests,
+                "hits": requests - misses,
+                "misses": misses,
+                "hit_ratio": round((requests - misses) / requests, 4) if requests else None,
+            }
+        return stats
+
+
+response_cache = ResponseCache()
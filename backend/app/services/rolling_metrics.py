@@ -0,0 +1,254 @@
+import io
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import redis
+
+from app.core.redis_client import get_redis
+
+ROLLING_STATE_KEY = "yieldsync:rolling_apy"
+# A refresh holds the state lock from load to save, renewing it every third of the TTL;
+# a crashed holder's lock expires after ROLLING_LOCK_TTL
+ROLLING_LOCK_TTL = 60
+# How long a second refresh waits for the lock before giving up
+ROLLING_LOCK_WAIT = 30 * 60
+SECONDS_PER_DAY = 24 * 60 * 60
+MEAN_WINDOW_DAYS = 30
+# Today plus 30 days back, so apy_pct_30d can look at the day that just left the mean window
+RING_DAYS = MEAN_WINDOW_DAYS + 1
+
+# Pool dict key -> Pool column. The computed values are written back under the
+# feed's own keys, falling back to the feed's value while a window is still warming up.
+METRIC_FIELDS = {
+    "apyPct1D": "apy_pct_1d",
+    "apyPct7D": "apy_pct_7d",
+    "apyPct30D": "apy_pct_30d",
+    "apyMean30d": "apy_mean_30d",
+    "apyBaseInception": "apy_base_inception",
+}
+METRIC_DECIMALS = 6
+# Our history can't tell when a pool started, so these only fill in values the feed doesn't have
+FEED_PREFERRED_FIELDS = ("apyBaseInception",)
+
+
+def current_day(now: Optional[float] = None) -> int:
+    return int((time.time() if now is None else now) // SECONDS_PER_DAY)
+
+
+def _floats(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+class RollingApyState:
+    """
+    Daily APY ring buffer for every pool, plus running sums for the 30-day
+    mean and the base APY mean since the pool was first observed. The
+    30-day mean is only reported once a pool's history spans the window.
+
+    A day's slot holds the last observation of that day, so several refreshes
+    per day just overwrite it. Every update is vectorized over all pools:
+    slots that fall out of the window are subtracted from the running sums
+    and cleared, nothing is recomputed over the full history.
+    """
+
+    ARRAYS = ("ring", "last_day", "first_day", "mean_sum", "mean_count", "base_sum", "base_days", "base_today")
+
+    def __init__(self, pool_ids: Sequence[str] = ()):
+        n = len(pool_ids)
+        self.pool_ids = np.array(pool_ids, dtype="U64")
+        self.index = {pool_id: i for i, pool_id in enumerate(self.pool_ids.tolist())}
+        self.ring = np.full((n, RING_DAYS), np.nan)
+        self.last_day = np.zeros(n, dtype=np.int64)
+        self.first_day = np.zeros(n, dtype=np.int64)
+        self.mean_sum = np.zeros(n)
+        self.mean_count = np.zeros(n, dtype=np.int64)
+        self.base_sum = np.zeros(n)  # completed days only
+        self.base_days = np.zeros(n, dtype=np.int64)
+        self.base_today = np.full(n, np.nan)
+
+    def __len__(self) -> int:
+        return len(self.pool_ids)
+
+    def _rows(self, pool_ids: Sequence[str], day: int) -> np.ndarray:
+        new_ids = [p for p in dict.fromkeys(pool_ids) if p not in self.index]
+        if new_ids:
+            fresh = RollingApyState(new_ids)
+            fresh.last_day[:] = day
+            fresh.first_day[:] = day
+            self._append(fresh)
+        return np.fromiter((self.index[p] for p in pool_ids), dtype=np.int64, count=len(pool_ids))
+
+    def _append(self, other: "RollingApyState") -> None:
+        offset = len(self)
+        self.pool_ids = np.concatenate([self.pool_ids, other.pool_ids])
+        for name in self.ARRAYS:
+            setattr(self, name, np.concatenate([getattr(self, name), getattr(other, name)]))
+        self.index.update({p: offset + i for i, p in enumerate(other.pool_ids.tolist())})
+
+    def update(self, pool_ids: Sequence[str], apy: Sequence[Optional[float]],
+               apy_base: Sequence[Optional[float]], day: int) -> Dict[str, np.ndarray]:
+        """Record one observation per pool for `day` and return the metrics as arrays (NaN = unknown)."""
+        rows = self._rows(list(pool_ids), day)
+        apy, apy_base = _floats(apy), _floats(apy_base)
+        ring = self.ring[rows]
+        last = self.last_day[rows]
+        mean_sum, mean_count = self.mean_sum[rows], self.mean_count[rows]
+
+        # An observation older than the pool's last day (clock skew) lands on that day
+        step = np.maximum(day - last, 0)
+        days = last + step
+        slots = np.arange(RING_DAYS)
+
+        # Days leaving the 30-day mean window: last-29 .. last-30+step
+        leaving = (slots - (last[:, None] - MEAN_WINDOW_DAYS + 1)) % RING_DAYS < np.minimum(step, MEAN_WINDOW_DAYS)[:, None]
+        leaving &= ~np.isnan(ring)
+        mean_sum -= np.where(leaving, ring, 0.0).sum(axis=1)
+        mean_count -= leaving.sum(axis=1)
+
+        # Slots reused by the days last+1 .. day start empty
+        reused = (slots - (last[:, None] + 1)) % RING_DAYS < np.minimum(step, RING_DAYS)[:, None]
+        ring[reused] = np.nan
+
+        # Today's slot may already hold an earlier refresh of the same day
+        today = days % RING_DAYS
+        positions = np.arange(len(rows))
+        previous = ring[positions, today]
+        had_previous = ~np.isnan(previous)
+        mean_sum -= np.where(had_previous, previous, 0.0)
+        mean_count -= had_previous
+        ring[positions, today] = apy
+        has_apy = ~np.isnan(apy)
+        mean_sum += np.where(has_apy, apy, 0.0)
+        mean_count += has_apy
+
+        # Since-inception base APY: fold the previous day in once the day rolls over
+        base_sum, base_days, base_today = self.base_sum[rows], self.base_days[rows], self.base_today[rows]
+        closing = (step > 0) & ~np.isnan(base_today)
+        base_sum += np.where(closing, base_today, 0.0)
+        base_days += closing
+        base_today = apy_base
+
+        self.ring[rows] = ring
+        self.last_day[rows] = days
+        self.mean_sum[rows], self.mean_count[rows] = mean_sum, mean_count
+        self.base_sum[rows], self.base_days[rows], self.base_today[rows] = base_sum, base_days, base_today
+
+        has_base = ~np.isnan(base_today)
+        base_total = base_days + has_base
+        window_covered = days - self.first_day[rows] + 1 >= MEAN_WINDOW_DAYS
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "apyPct1D": apy - ring[positions, (days - 1) % RING_DAYS],
+                "apyPct7D": apy - ring[positions, (days - 7) % RING_DAYS],
+                "apyPct30D": apy - ring[positions, (days - 30) % RING_DAYS],
+                "apyMean30d": np.where(window_covered & (mean_count > 0), mean_sum / mean_count, np.nan),
+                "apyBaseInception": np.where(
+                    base_total > 0, (base_sum + np.where(has_base, base_today, 0.0)) / base_total, np.nan
+                ),
+            }
+
+    def prune(self, day: int) -> None:
+        """Drop pools that haven't been observed for longer than the ring covers."""
+        keep = self.last_day >= day - RING_DAYS
+        if keep.all():
+            return
+        self.pool_ids = self.pool_ids[keep]
+        for name in self.ARRAYS:
+            setattr(self, name, getattr(self, name)[keep])
+        self.index = {pool_id: i for i, pool_id in enumerate(self.pool_ids.tolist())}
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, pool_ids=self.pool_ids, **{name: getattr(self, name) for name in self.ARRAYS})
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "RollingApyState":
+        with np.load(io.BytesIO(data)) as arrays:
+            state = cls(arrays["pool_ids"].tolist())
+            for name in cls.ARRAYS:
+                if name in arrays.files:
+                    setattr(state, name, arrays[name])
+            if "first_day" not in arrays.files:
+                # Saved before first_day existed: count the history from now on
+                state.first_day = state.last_day.copy()
+        return state
+
+
+class RollingApyStore:
+    """The RollingApyState of all pools, kept as one compressed blob in Redis."""
+
+    def __init__(self, client: Optional[redis.Redis] = None, key: str = ROLLING_STATE_KEY):
+        self.client = client or get_redis()
+        self.key = key
+
+    def load(self) -> RollingApyState:
+        data = self.client.get(self.key)
+        return RollingApyState.from_bytes(data) if data else RollingApyState()
+
+    def save(self, state: RollingApyState, lock=None) -> bool:
+        """Store the state; with a lock, only while it is still ours (else another refresh may own the state)."""
+        if lock is not None and not lock.owned():
+            print(f"ROLLING_METRICS_ERROR: {self.key} - lock lost before save, state not saved")
+            return False
+        self.client.set(self.key, state.to_bytes())
+        return True
+
+    @contextmanager
+    def lock(self, ttl: float = ROLLING_LOCK_TTL, wait: float = ROLLING_LOCK_WAIT):
+        """
+        Held from load to save, so overlapping refreshes advance the state
+        one after the other instead of overwriting each other's updates.
+        A background thread extends the lock while the holder works, however
+        long the ingest takes; yields the lock for save().
+        """
+        lock = self.client.lock(f"{self.key}:lock", timeout=ttl, blocking_timeout=wait)
+        if not lock.acquire():
+            raise redis.exceptions.LockError(f"{self.key}: still locked after {wait}s")
+        stop = threading.Event()
+        renewer = threading.Thread(target=self._renew, args=(lock, ttl, stop), daemon=True)
+        renewer.start()
+        try:
+            yield lock
+        finally:
+            stop.set()
+            renewer.join()
+            try:
+                lock.release()
+            except redis.exceptions.LockError as e:
+                # Expired and maybe taken over; save() already refused to write
+                print(f"ROLLING_METRICS_ERROR: {self.key} - {str(e)}")
+
+    def _renew(self, lock, ttl: float, stop: threading.Event) -> None:
+        while not stop.wait(ttl / 3):
+            try:
+                lock.reacquire()
+            except redis.RedisError as e:
+                print(f"ROLLING_METRICS_ERROR: {self.key} - lock renewal failed: {str(e)}")
+                return
+
+
+def apply_rolling_metrics(pools: List[Dict[str, Any]], state: RollingApyState, day: Optional[int] = None) -> None:
+    """
+    Feed this refresh's APYs into the state and write the trend metrics into
+    the pool dicts (under the feed's keys), in place. Metrics still warming
+    up keep the feed's value, and FEED_PREFERRED_FIELDS only fill gaps.
+    """
+    if not pools:
+        return
+    day = current_day() if day is None else day
+    metrics = state.update(
+        [p.get("pool") for p in pools], [p.get("apy") for p in pools], [p.get("apyBase") for p in pools], day
+    )
+    for field, values in metrics.items():
+        rounded = np.round(values, METRIC_DECIMALS).tolist()
+        for pool, value in zip(pools, rounded):
+            if value != value:  # NaN
+                continue
+            if field in FEED_PREFERRED_FIELDS and pool.get(field) is not None:
+                continue
+            pool[field] = value
+    state.prune(day)
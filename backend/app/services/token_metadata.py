@@ -0,0 +1,153 @@
+import asyncio
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+from cachetools import LRUCache
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import TokenMetadata
+from app.services import http_client
+
+load_dotenv()
+
+ALCHEMY_URL_TMPL = "https://{network}.g.alchemy.com/v2/{api_key}"
+# wallets.chain -> Alchemy network
+ALCHEMY_NETWORKS = {
+    "ethereum": "eth-mainnet",
+    "polygon": "polygon-mainnet",
+    "arbitrum": "arb-mainnet",
+    "optimism": "opt-mainnet",
+    "base": "base-mainnet",
+}
+# Other spellings found in wallets.chain
+CHAIN_ALIASES = {"eth": "ethereum", "mainnet": "ethereum", "matic": "polygon", "arb": "arbitrum", "op": "optimism"}
+# Requests per JSON-RPC batch POST; chunks go out concurrently, bounded by http_client's per-host limit
+RPC_BATCH_SIZE = 100
+FIELDS = ("name", "symbol", "decimals", "logo")
+# ERC-20 decimals is a uint8; anything else is junk from a non-conforming contract
+MAX_DECIMALS = 255
+
+
+def normalize_chain(chain: Optional[str]) -> str:
+    """wallets.chain as a key of ALCHEMY_NETWORKS (unknown chains come back lowercased, unmapped)."""
+    chain = (chain or "").strip().lower()
+    return CHAIN_ALIASES.get(chain, chain)
+
+
+def rpc_url(chain: str) -> str:
+    return ALCHEMY_URL_TMPL.format(network=ALCHEMY_NETWORKS[chain], api_key=os.getenv("ALCHEMY_API_KEY"))
+
+
+def batch_payloads(method: str, params: List[list], batch_size: int = RPC_BATCH_SIZE) -> List[List[dict]]:
+    """JSON-RPC batch bodies of at most batch_size calls; each call's id is its index into params."""
+    calls = [{"jsonrpc": "2.0", "id": i, "method": method, "params": p} for i, p in enumerate(params)]
+    return [calls[start:start + batch_size] for start in range(0, len(calls), batch_size)]
+
+
+async def _post_batch(url: str, payload: List[dict]) -> Dict[int, dict]:
+    response = await http_client.apost(url, json=payload)
+    response.raise_for_status()
+    body = response.json()
+    if not isinstance(body, list):
+        # A whole-batch error (e.g. rate limited) comes back as a single object
+        raise ValueError(str(body.get("error", body)))
+    return {item["id"]: item["result"] for item in body if item.get("result") is not None}
+
+
+async def rpc_batch(url: str, method: str, params: List[list]) -> Dict[int, dict]:
+    """
+    Result per call index. Calls that errored, individually or with their
+    whole chunk, are left out.
+    """
+    payloads = batch_payloads(method, params)
+    results = {}
+    for payload, result in zip(payloads, await asyncio.gather(
+            *[_post_batch(url, payload) for payload in payloads], return_exceptions=True)):
+        if isinstance(result, (httpx.HTTPError, ValueError)):
+            print(f"TOKEN_METADATA_ERROR: {method} x{len(payload)} - {str(result)}")
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            results.update(result)
+    return results
+
+
+def clean_metadata(result: dict) -> dict:
+    """
+    Metadata as stored: text fields without NUL bytes (Postgres rejects
+    them), decimals only when it is a valid uint8, anything else None.
+    """
+    cleaned = {}
+    for field in ("name", "symbol", "logo"):
+        value = result.get(field)
+        cleaned[field] = value.replace("\x00", "") if isinstance(value, str) else None
+    decimals = result.get("decimals")
+    valid = isinstance(decimals, int) and not isinstance(decimals, bool) and 0 <= decimals <= MAX_DECIMALS
+    cleaned["decimals"] = decimals if valid else None
+    return {field: cleaned[field] for field in FIELDS}
+
+
+async def fetch_token_metadata(chain: str, addresses: List[str]) -> Dict[str, dict]:
+    results = await rpc_batch(rpc_url(chain), "alchemy_getTokenMetadata", [[address] for address in addresses])
+    return {addresses[i]: clean_metadata(result) for i, result in results.items()}
+
+
+class TokenMetadataCache:
+    """
+    Read-through token metadata: an in-process LRU in front of the
+    token_metadata table, in front of batched alchemy_getTokenMetadata
+    calls. A portfolio whose tokens were all seen before costs no RPC
+    calls, and after the first load in a process no queries either.
+    Tokens whose fetch failed are retried on the next lookup.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, fetcher=fetch_token_metadata):
+        self._local = LRUCache(maxsize or settings.TOKEN_METADATA_CACHE_SIZE)
+        self._lock = threading.Lock()
+        self._fetcher = fetcher
+
+    async def get_many(self, db: AsyncSession, chain: str, addresses: Iterable[str]) -> Dict[str, dict]:
+        """Metadata per lowercase contract address; addresses that couldn't be resolved are left out."""
+        addresses = list(dict.fromkeys(address.lower() for address in addresses))
+        with self._lock:
+            found = {a: self._local[(chain, a)] for a in addresses if (chain, a) in self._local}
+        missing = [a for a in addresses if a not in found]
+
+        if missing:
+            rows = (await db.execute(select(TokenMetadata).where(
+                TokenMetadata.chain == chain, TokenMetadata.contract_address.in_(missing),
+            ))).scalars().all()
+            stored = {row.contract_address: {field: getattr(row, field) for field in FIELDS} for row in rows}
+            unknown = [a for a in missing if a not in stored]
+            fetched = await self._fetcher(chain, unknown) if unknown else {}
+            if fetched:
+                await self._store(db, chain, fetched)
+            with self._lock:
+                for address, metadata in {**stored, **fetched}.items():
+                    self._local[(chain, address)] = metadata
+            found.update(stored)
+            found.update(fetched)
+        return found
+
+    @staticmethod
+    async def _store(db: AsyncSession, chain: str, fetched: Dict[str, dict]) -> None:
+        # A failed write only costs the table tier: the metadata is still returned and cached here
+        try:
+            await db.execute(pg_insert(TokenMetadata.__table__).on_conflict_do_nothing(), [
+                {"chain": chain, "contract_address": address, **metadata}
+                for address, metadata in fetched.items()
+            ])
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            print(f"TOKEN_METADATA_ERROR: {chain} x{len(fetched)} - {str(e)}")
+
+
+token_metadata = TokenMetadataCache()
@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import redis
+from cachetools import TLRUCache
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis, get_redis
+from app.models.models import User
+
+SNAPSHOT_KEY = "yieldsync:user_snapshot:{user_id}"
+# session.info key: ids of the users changed in the session's open transaction
+PENDING_KEY = "user_cache_invalidate"
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Detached, read-only copy of a User's profile columns: no session, no lazy loads."""
+    id: int
+    username: str
+    email: str
+    primary_goal: Optional[str] = None
+    risk_tolerance: Optional[str] = None
+    experience_level: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(user.id, user.username, user.email, user.primary_goal, user.risk_tolerance, user.experience_level)
+
+
+class UserCache:
+    """
+    Verified token -> UserSnapshot, for get_current_user_dep.
+
+    The in-process tier is a TLRU keyed by a digest of the token: a hit
+    skips both JWT verification and the database. Entries live at most
+    ttl seconds and never past the token's own expiry. The optional Redis
+    tier shares snapshots by user id between API workers, so another
+    worker's miss costs a token check and a GET instead of a query.
+
+    Any ORM update or delete of a User drops that user from this process
+    and from Redis once the session commits; other processes' local
+    entries expire within ttl.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, maxsize: Optional[int] = None, ttl: Optional[int] = None,
+                 use_redis: Optional[bool] = None, redis_ttl: Optional[int] = None):
+        self.enabled = settings.USER_CACHE_ENABLED if enabled is None else enabled
+        self.ttl = settings.USER_CACHE_TTL if ttl is None else ttl
+        self.use_redis = settings.USER_CACHE_REDIS if use_redis is None else use_redis
+        self.redis_ttl = redis_ttl or settings.USER_CACHE_REDIS_TTL
+        self._local = TLRUCache(maxsize or settings.USER_CACHE_SIZE, ttu=self._expires)
+        # Sync sessions (Celery, threadpool routes) can invalidate from other threads
+        self._lock = threading.Lock()
+        # Shared snapshot deletes started from the event loop; referenced until done
+        self._background = set()
+
+    def _expires(self, key, value, now):
+        # value is (snapshot, token expiry as a unix timestamp or None)
+        _, token_exp = value
+        lifetime = self.ttl if token_exp is None else min(self.ttl, token_exp - time.time())
+        return now + lifetime
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._local.get(self._key(token))
+        return entry[0] if entry else None
+
+    def put(self, token: str, snapshot: UserSnapshot, token_exp: Optional[float] = None) -> None:
+        if self.enabled:
+            with self._lock:
+                self._local[self._key(token)] = (snapshot, token_exp)
+
+    async def get_shared(self, user_id: int) -> Optional[UserSnapshot]:
+        if not (self.enabled and self.use_redis):
+            return None
+        try:
+            raw = await get_async_redis().get(SNAPSHOT_KEY.format(user_id=user_id))
+        except redis.RedisError as e:
+            print(f"USER_CACHE_ERROR: {user_id} - {str(e)}")
+            return None
+        return UserSnapshot(**json.loads(raw)) if raw else None
+
+    async def share(self, snapshot: UserSnapshot) -> None:
+        if not (self.enabled and self.use_redis):
+            return
+        try:
+            await get_async_redis().set(SNAPSHOT_KEY.format(user_id=snapshot.id), json.dumps(asdict(snapshot)),
+                                        ex=self.redis_ttl)
+        except redis.RedisError as e:
+            print(f"USER_CACHE_ERROR: {snapshot.id} - {str(e)}")
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drop every cached token of this user here, and the shared snapshot.
+        On the event loop the Redis delete goes out as a background task
+        instead of blocking it.
+        """
+        with self._lock:
+            stale = [key for key, (snapshot, _) in self._local.items() if snapshot.id == user_id]
+            for key in stale:
+                self._local.pop(key, None)
+        if not self.use_redis:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                get_redis().delete(SNAPSHOT_KEY.format(user_id=user_id))
+            except redis.RedisError as e:
+                print(f"USER_CACHE_ERROR: {user_id} - {str(e)}")
+            return
+        task = loop.create_task(self._unshare(user_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _unshare(self, user_id: int) -> None:
+        try:
+            await get_async_redis().delete(SNAPSHOT_KEY.format(user_id=user_id))
+        except redis.RedisError as e:
+            print(f"USER_CACHE_ERROR: {user_id} - {str(e)}")
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_on_commit(mapper, connection, target):
+    # Evicting at flush time would let a request re-cache the old row before the commit lands
+    session = object_session(target)
+    if session is None:
+        user_cache.invalidate(target.id)
+    else:
+        session.info.setdefault(PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(PENDING_KEY, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_users(session, previous_transaction):
+    # Only a rollback of the outermost transaction discards every change; after a savepoint's, evicting is harmless
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
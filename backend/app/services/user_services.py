@@ -1,10 +1,12 @@
 from app.models.models import User
-from app.db import get_db
-from sqlalchemy.orm import Session
+from app.db import get_async_db
+from app.services.passwords import PasswordHasherBusy, password_hasher
+from app.services.user_cache import UserSnapshot, user_cache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt
 from datetime import datetime, timedelta
 import os
-import bcrypt
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -19,13 +21,24 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60*24  # 1 day
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+def _hasher_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests, try again shortly",
+        headers={"Retry-After": "1"},
+    )
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+
+async def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return await password_hasher.verify(password, hashed)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
 def create_jwt_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -41,16 +54,26 @@ def verify_jwt_token(token: str):
     except jwt.JWTError:
         return None
 
-def get_current_user(token: str, db: Session):
+async def get_current_user(token: str, db: AsyncSession):
+    """Snapshot of the token's user: from the user cache, else verified and loaded once, then cached."""
+    snapshot = user_cache.get(token)
+    if snapshot:
+        return snapshot
     payload = verify_jwt_token(token)
-    if payload:
-        user_id = payload.get("user_id")
-        if user_id:
-            return db.query(User).filter(User.id == user_id).first()
-    return None
+    if not payload or not payload.get("user_id"):
+        return None
+    snapshot = await user_cache.get_shared(payload["user_id"])
+    if snapshot is None:
+        user = await get_user_by_id(payload["user_id"], db)
+        if not user:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        await user_cache.share(snapshot)
+    user_cache.put(token, snapshot, payload.get("exp"))
+    return snapshot
 
-def get_current_user_dep(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    user = get_current_user(token, db)
+async def get_current_user_dep(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(token, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,20 +82,35 @@ def get_current_user_dep(token: str = Depends(oauth2_scheme), db: Session = Depe
         )
     return user
 
-def create_user(user: User, db: Session):
-    user.password_hash = hash_password(user.password_hash)
+async def create_user(user: User, db: AsyncSession):
+    user.password_hash = await hash_password(user.password_hash)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     token = create_jwt_token({"sub": user.email, "user_id": user.id})
     return {"user": user, "access_token": token}
 
-def login_user(email: str, password: str, db: Session):
-    user = db.query(User).filter(User.email == email).first()
-    if user and verify_password(password, user.password_hash):
+async def login_user(email: str, password: str, db: AsyncSession):
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    if user and await verify_password(password, user.password_hash):
+        if password_hasher.needs_rehash(user.password_hash):
+            await _rehash(user, password, db)
         token = create_jwt_token({"sub": user.email, "user_id": user.id})
         return {"user": user, "access_token": token}
     return None
 
-def get_user_by_id(user_id: int, db: Session):
-    return db.query(User).filter(User.id == user_id).first()
\ No newline at end of file
+async def _rehash(user: User, password: str, db: AsyncSession):
+    """
+    BCRYPT_ROUNDS changed since this hash was made; the password is at hand,
+    so move it over. Best effort: a busy hasher must not fail the login, the
+    next one retries.
+    """
+    try:
+        user.password_hash = await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        print(f"PASSWORD_REHASH_ERROR: {user.id} - hasher busy, kept the old hash")
+        return
+    await db.commit()
+
+async def get_user_by_id(user_id: int, db: AsyncSession):
+    return await db.get(User, user_id)
\ No newline at end of file
@@ -1,36 +1,40 @@
 from app.models.models import Wallet, User, Transaction, TokenTransfer, WalletActivityScore
-from app.db import get_db
 from app.models.schemas import WalletCreate, WalletSchema
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
+import asyncio
 import os
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-import requests
+from app.services import http_client
+from app.services.price_oracle import COINGECKO_PLATFORMS, coin, price_oracle, token
+from app.services.token_metadata import ALCHEMY_NETWORKS, normalize_chain, rpc_url, token_metadata
 
 load_dotenv()
 
-ALCHEMY_API_KEY = os.getenv("ALCHEMY_API_KEY")
-base_url = f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}"
 etherscan_api_key = os.getenv("ETHERSCAN_API_KEY")
 
-def create_wallet(db: Session, wallet_data: WalletCreate):
-    db_wallet = db.query(Wallet).filter(Wallet.address == wallet_data.address).first()
+async def create_wallet(db: AsyncSession, wallet_data: WalletCreate):
+    db_wallet = await get_wallet_by_address(db, wallet_data.address)
     if db_wallet:
         raise HTTPException(status_code=400, detail="Wallet already exists")
     wallet = Wallet(**wallet_data.dict())
     db.add(wallet)
-    db.commit()
-    db.refresh(wallet)
+    await db.commit()
+    await db.refresh(wallet)
     return wallet
 
-def delete_wallet(db: Session, wallet: Wallet):
-    db.delete(wallet)
-    db.commit()
+async def delete_wallet(db: AsyncSession, wallet: Wallet):
+    await db.delete(wallet)
+    await db.commit()
     return {"message": "Wallet deleted successfully"}
 
-def get_wallet_balance_eth(address):
+async def get_user_wallets(db: AsyncSession, user_id: int):
+    return (await db.execute(select(Wallet).where(Wallet.user_id == user_id))).scalars().all()
+
+async def get_wallet_balance_eth(address):
     url = f"https://api.etherscan.io/v2/api"
     params = {
         "chainid": 1,
@@ -40,17 +44,12 @@ def get_wallet_balance_eth(address):
         "tag": "latest",
         "apikey": etherscan_api_key
     }
-    response = requests.get(url, params=params)
+    response = await http_client.aget(url, params=params)
     data = response.json()
     if data.get("status") == "1":
         wei_balance = int(data["result"])
         eth_balance = wei_balance / 1e18
-        # Get ETH price in USD
-        price_url = "https://api.coingecko.com/api/v3/simple/price"
-        price_params = {"ids": "ethereum", "vs_currencies": "usd"}
-        price_response = requests.get(price_url, params=price_params)
-        price_data = price_response.json()
-        eth_price_usd = price_data.get("ethereum", {}).get("usd", None)
+        eth_price_usd = await price_oracle.get_price(coin("ethereum"))
         if eth_price_usd is not None:
             usd_balance = eth_balance * eth_price_usd
             return {
@@ -69,55 +68,42 @@ def get_wallet_balance_eth(address):
         return {"error": data.get("message", "Failed to fetch balance")}
 
 
-def get_wallet_by_address(db: Session, address: str):
-    return db.query(Wallet).filter(Wallet.address == address).first()
+async def get_wallet_by_address(db: AsyncSession, address: str):
+    return (await db.execute(select(Wallet).where(Wallet.address == address))).scalars().first()
 
 def wallet_analysis():
     pass
 
 
-def get_token_balances(address):
+async def get_token_balances(address, chain="ethereum"):
     payload = {
         "jsonrpc": "2.0",
         "method": "alchemy_getTokenBalances",
         "params": [address],
         "id": 42
     }
-    response = requests.post(base_url, json=payload)
+    response = await http_client.apost(rpc_url(chain), json=payload)
     result = response.json().get("result", {})
     token_balances = result.get("tokenBalances", [])
     # Filter out zero balances
-    non_zero = [token for token in token_balances if token["tokenBalance"] != "0"]
+    non_zero = [token for token in token_balances if int(token["tokenBalance"] or "0x0", 16) != 0]
     return non_zero
 
-def get_token_metadata(contract_address):
-    payload = {
-        "jsonrpc": "2.0",
-        "method": "alchemy_getTokenMetadata",
-        "params": [contract_address],
-        "id": 1
-    }
-    response = requests.post(base_url, json=payload)
-    return response.json().get("result", {})
+async def get_token_usdt_price(contract_address):
+    return await price_oracle.get_price(token("ethereum", contract_address), vs="usdt")
 
-def get_token_usdt_price(contract_address):
-    url = "https://api.coingecko.com/api/v3/simple/token_price/ethereum"
-    params = {
-        "contract_addresses": contract_address,
-        "vs_currencies": "usdt"
-    }
-    response = requests.get(url, params=params)
-    data = response.json()
-    price = data.get(contract_address.lower(), {}).get("usdt", None)
-    return price
+async def get_token_usdt_prices(contract_addresses):
+    """Contract -> USDT price for many contracts, batched into as few CoinGecko calls as possible."""
+    return await price_oracle.get_token_prices("ethereum", contract_addresses, vs="usdt")
 
-def get_token_balances_and_metadata(address):
+async def get_token_balances_and_metadata(db: AsyncSession, address, chain="ethereum"):
     token_list = []
-    tokens = get_token_balances(address)
-    print(f"Token balances of {address}:\n")
-    for i, token in enumerate(tokens, start=1):
+    tokens = await get_token_balances(address, chain)
+    # One lookup for every held token: cache, then table, then batched RPC for the rest
+    metadata_by_contract = await token_metadata.get_many(db, chain, [token["contractAddress"] for token in tokens])
+    for token in tokens:
         balance = int(token["tokenBalance"], 16)
-        metadata = get_token_metadata(token["contractAddress"])
+        metadata = metadata_by_contract.get(token["contractAddress"].lower(), {})
         decimals = metadata.get("decimals")
         if decimals is None:
             decimals = 18  # fallback to 18 if missing
@@ -132,3 +118,65 @@ def get_token_balances_and_metadata(address):
             "contract_address": contract_address
         })
     return token_list
+
+def supported_chain(chain) -> bool:
+    return chain in ALCHEMY_NETWORKS and chain in COINGECKO_PLATFORMS
+
+async def get_portfolio_value(db: AsyncSession, wallets):
+    """
+    Token holdings of several (address, chain) wallets valued in USD.
+    Balances are fetched concurrently per wallet from the chain's Alchemy
+    network; metadata and prices are looked up once per chain for the
+    deduplicated set of contracts held on it. Wallets on chains without an
+    Alchemy network or CoinGecko platform are listed with an error and
+    left out of the total.
+    """
+    wallets = [(address, normalize_chain(chain)) for address, chain in wallets]
+    supported = [(address, chain) for address, chain in wallets if supported_chain(chain)]
+    balances = dict(zip(supported, await asyncio.gather(
+        *[get_token_balances(address, chain) for address, chain in supported]
+    )))
+    contracts_by_chain = {}
+    for (_, chain), wallet_tokens in balances.items():
+        contracts_by_chain.setdefault(chain, set()).update(token["contractAddress"].lower() for token in wallet_tokens)
+    # One AsyncSession can't run queries concurrently, so metadata goes chain by chain
+    metadata_by_chain = {chain: await token_metadata.get_many(db, chain, contracts)
+                         for chain, contracts in contracts_by_chain.items()}
+    prices_by_chain = dict(zip(contracts_by_chain, await asyncio.gather(*[
+        price_oracle.get_token_prices(COINGECKO_PLATFORMS[chain], contracts)
+        for chain, contracts in contracts_by_chain.items()
+    ])))
+
+    results, total, unpriced, unsupported = [], 0.0, 0, set()
+    for address, chain in wallets:
+        if (address, chain) not in balances:
+            unsupported.add(chain)
+            results.append({"address": address, "chain": chain, "tokens": [], "value_usd": None,
+                            "error": f"Unsupported chain: {chain}"})
+            continue
+        holdings, wallet_value = [], 0.0
+        for token in balances[(address, chain)]:
+            contract_address = token["contractAddress"].lower()
+            metadata = metadata_by_chain[chain].get(contract_address, {})
+            decimals = metadata.get("decimals")
+            if decimals is None:
+                decimals = 18  # fallback to 18 if missing
+            human_balance = int(token["tokenBalance"], 16) / (10 ** int(decimals))
+            price = prices_by_chain[chain].get(contract_address)
+            value = human_balance * price if price is not None else None
+            if value is None:
+                unpriced += 1
+            else:
+                wallet_value += value
+            holdings.append({
+                "name": metadata.get("name", "Unknown"),
+                "symbol": metadata.get("symbol", ""),
+                "balance": round(human_balance, 2),
+                "contract_address": token["contractAddress"],
+                "price_usd": price,
+                "value_usd": value,
+            })
+        results.append({"address": address, "chain": chain, "tokens": holdings, "value_usd": wallet_value})
+        total += wallet_value
+    return {"wallets": results, "value_usd": total, "unpriced_tokens": unpriced,
+            "unsupported_chains": sorted(unsupported)}
@@ -1,13 +1,27 @@
 from celery import Celery
 from app.core.config import settings
-from app.pull_data import fetch_pools, fetch_protocol_details
-from app.models.models import Recommendation, Protocol, Pool, User, Wallet, Transaction, TokenTransfer, WalletActivityScore,
-from app.db import get_db
-from app.services.rec_engine import score_defillama_pool
+from app.services.pull_data import fetch_pools, fetch_protocol_details, afetch_protocol_details
+from app.models.models import Recommendation, Protocol, Pool, User, Wallet, Transaction, TokenTransfer, WalletActivityScore
+from app.db import current_wal_lsn, get_db
+from app.services.ingestion import build_pool_rows, ingest_pool_rows, load_protocol_ids, protocol_row, upsert_protocols
+from app.services.fingerprints import PoolFingerprintStore, pool_fingerprint
+from app.services.apy_history import backfill_history, BACKFILL_CONCURRENCY
+from app.services.rolling_metrics import RollingApyStore, apply_rolling_metrics
+from app.services.history_store import HistoryStore, export_history
+from app.services.response_cache import bump_dataset_version
+from app.services.recommendations import RECOMMENDATIONS_PER_USER, materialize_recommendations
+from app.core.redis_client import get_redis
+from app.services import http_client
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
 from sqlalchemy.orm import Session
 import json
 import requests
 
+PROTOCOL_CLAIM_PREFIX = "yieldsync:protocol_backfill:"
+PROTOCOL_CLAIM_TTL = 60 * 60
+
 celery_app = Celery(
     "yieldsync_worker",
     broker=settings.REDIS_URL,
@@ -23,84 +37,146 @@ def pull_protocol_data(slug: str):
     protocols = fetch_protocol_details(slug)
     if not protocols:
         return None
-        
-    proto_json = protocols
-    protocol = Protocol(
-    name=proto_json.get("name"),
-    protocol_id=proto_json.get("id"),
-    address=proto_json.get("address"),
-    symbol=proto_json.get("symbol"),
-    url=proto_json.get("url"),
-    description=proto_json.get("description"),
-    chain=proto_json.get("chain"),
-    logo=proto_json.get("logo"),
-    audits=proto_json.get("audits"),
-    category=proto_json.get("category"),
-    twitter=proto_json.get("twitter"),
-    parent_protocol=proto_json.get("parentProtocol"),
-    chains=proto_json.get("chains"),
-    chain_tvls=proto_json.get("chainTvls"),
-    listed_at=proto_json.get("listedAt"),
-    slug=proto_json.get("slug"),
-    )
-
-    db.add(protocol)
-    db.commit()
-    db.refresh(protocol)
 
+    upsert_protocols(db, [protocol_row(protocols, slug)])
+    bump_dataset_version("protocols", lsn=current_wal_lsn())
     return protocols
 
+async def _fetch_protocol_or_none(slug: str):
+    try:
+        return await afetch_protocol_details(slug)
+    except Exception as e:
+        print(f"PROTOCOL_FETCH_ERROR: {slug} - {str(e)}")
+        return None
+
+async def _fetch_protocols(slugs: List[str]):
+    # Concurrency per upstream host is bounded by http_client
+    try:
+        return await asyncio.gather(*[_fetch_protocol_or_none(slug) for slug in slugs])
+    finally:
+        await http_client.aclose()
+
+def _claim_protocol_slugs(slugs):
+    """
+    Keep only the slugs no other run is already backfilling. A claim simply
+    expires, which also rate-limits retries for slugs DefiLlama doesn't know.
+    """
+    redis_client = get_redis()
+    pipe = redis_client.pipeline()
+    for slug in slugs:
+        pipe.set(f"{PROTOCOL_CLAIM_PREFIX}{slug}", 1, nx=True, ex=PROTOCOL_CLAIM_TTL)
+    return [slug for slug, claimed in zip(slugs, pipe.execute()) if claimed]
+
+@celery_app.task
+def backfill_protocols(slugs: List[str], limit: Optional[int] = None, mode: Optional[str] = None):
+    """
+    Fetch all missing protocols concurrently (one request per slug), store
+    them, then re-run pull_pool_data so the pools skipped for lack of a
+    protocol get ingested; their fingerprints were never saved.
+    """
+    db: Session = next(get_db())
+    results = asyncio.run(_fetch_protocols(slugs))
+
+    rows = [protocol_row(proto_json, slug) for slug, proto_json in zip(slugs, results) if proto_json]
+    stored = upsert_protocols(db, rows)
+    if stored:
+        bump_dataset_version("protocols", lsn=current_wal_lsn())
+        pull_pool_data.delay(limit, mode)
+    return {"stored": len(stored), "failed": [slug for slug, r in zip(slugs, results) if not r]}
+
 @celery_app.task
-def pull_pool_data(limit: int = 10):
+def pull_pool_data(limit: int = 10, mode: Optional[str] = None, full: bool = False):
+    """
+    Fetch pools from DefiLlama, score them in one batch and bulk-upsert them.
+    `mode` is "upsert" (batched INSERT ... ON CONFLICT) or "copy" (COPY into a
+    staging table, then merge); by default it is picked from the number of rows.
+
+    Every pool's APY first goes through the rolling-metrics stage (1d/7d/30d
+    change, 30-day mean, base APY since inception), which is part of the
+    fingerprint, so a pool is rewritten when only its trend moved.
+
+    Pools whose fingerprint matches the last written one are skipped before
+    scoring; pass full=True to rewrite everything (e.g. after a DB restore).
+    """
     db: Session = next(get_db())
     pools = fetch_pools(limit)
     if not pools:
         return None
 
-    for pool_json in pools:
-        score = score_defillama_pool(pool_json)
-        protocol = db.query(Protocol).filter(Protocol.name == pool_json.get("project")).first()
-        if not protocol:
-            pull_protocol_data.delay(pool_json.get("project"))
+    rolling_store = RollingApyStore()
+    with rolling_store.lock() as lock:
+        rolling_state = rolling_store.load()
+        apply_rolling_metrics(pools, rolling_state)
+        result = _ingest_changed_pools(db, pools, limit, mode, full)
+        # Only after the pools are committed: a failed run leaves the state as it was for the retry
+        rolling_store.save(rolling_state, lock)
+    return result
+
+
+def _ingest_changed_pools(db: Session, pools: List[dict], limit: int, mode: Optional[str], full: bool):
+    fingerprint_store = PoolFingerprintStore()
+    if full:
+        changed = pools
+        fingerprints = {p.get("pool"): pool_fingerprint(p) for p in pools}
+    else:
+        changed, fingerprints = fingerprint_store.changed(pools)
+
+    known_protocols = load_protocol_ids(db)
+    ready, protocol_ids = [], []
+    missing = set()
+    for pool_json in changed:
+        protocol_id = known_protocols.get(pool_json.get("project"))
+        if protocol_id is None:
+            missing.add(pool_json.get("project"))
             continue
+        ready.append(pool_json)
+        protocol_ids.append(protocol_id)
 
-        pool = Pool(
-            pool_id=pool_json.get("pool"),
-            protocol_id=protocol.id,
-            pool_name=f"{pool_json.get('project')} - {pool_json.get('symbol')}",
-            chain=pool_json.get("chain"),
-            project=pool_json.get("project"),
-            symbol=pool_json.get("symbol"),
-            tvl_usd=pool_json.get("tvlUsd"),
-            apy_base=pool_json.get("apyBase"),
-            apy_reward=pool_json.get("apyReward"),
-            apy=pool_json.get("apy"),
-            predictions=pool_json.get("predictions"),
-            pool_meta=pool_json.get("poolMeta"),
-            stablecoin=pool_json.get("stablecoin"),
-            il_risk=pool_json.get("ilRisk"),
-            exposure=pool_json.get("exposure"),
-            reward_tokens=pool_json.get("rewardTokens"),
-            underlying_tokens=pool_json.get("underlyingTokens"),
-            volume_usd_1d=pool_json.get("volumeUsd1d"),
-            volume_usd_7d=pool_json.get("volumeUsd7d"),
-            mu=pool_json.get("mu"),
-            sigma=pool_json.get("sigma"),
-            count=pool_json.get("count"),
-            outlier=pool_json.get("outlier"),
-
-            tvl_score=score.get("tvl_score"),
-            risk_score=score.get("risk_score"),
-            final_score=score.get("final_score"),
-            breakdown=score.get("breakdown"),
-        )
-
-        db.add(pool)
-
-
-    db.commit()
-    db.refresh(pool)
-    return score
+    rows = build_pool_rows(ready, protocol_ids)
+    stats = ingest_pool_rows(db, rows, mode)
+    fingerprint_store.save({p.get("pool"): fingerprints[p.get("pool")] for p in ready})
+    if stats.inserted or stats.updated:
+        bump_dataset_version("pools", lsn=current_wal_lsn())
+        materialize_user_recommendations.delay()
+
+    # One backfill task for every protocol this run is missing
+    missing.discard(None)
+    to_fetch = _claim_protocol_slugs(sorted(missing))
+    if to_fetch:
+        backfill_protocols.delay(to_fetch, limit, mode)
+
+    return {
+        **stats.as_dict(),
+        "skipped": len(changed) - len(ready),
+        "missing_protocols": len(missing),
+        "fingerprint_unchanged": len(pools) - len(changed),
+    }
+
+
+@celery_app.task
+def backfill_apy_history(pool_ids: Optional[List[str]] = None, concurrency: int = BACKFILL_CONCURRENCY):
+    """Append new chart points for the given pools (all known pools by default)."""
+    if pool_ids is None:
+        db: Session = next(get_db())
+        pool_ids = [str(pool_id) for (pool_id,) in db.query(Pool.pool_id).all()]
+    return backfill_history(pool_ids, concurrency)
+
+
+@celery_app.task
+def export_history_files(since_days: Optional[int] = None):
+    """Append pool_apy_history to the columnar history files (all of it by default)."""
+    db: Session = next(get_db())
+    since = datetime.utcnow() - timedelta(days=since_days) if since_days else None
+    return export_history(db, HistoryStore(settings.HISTORY_DIR), since)
+
+
+@celery_app.task
+def materialize_user_recommendations(top_k: int = RECOMMENDATIONS_PER_USER):
+    """Recompute every user's top_k recommendations, one ranking per profile cohort."""
+    db: Session = next(get_db())
+    result = materialize_recommendations(db, top_k)
+    bump_dataset_version("recommendations", lsn=current_wal_lsn())
+    return result
 
 
 @celery_app.task
@@ -0,0 +1,136 @@
+"""
+Benchmark: requests/sec and latency percentiles under 200 concurrent clients
+for the old route pattern (async def + blocking sync Session) against the
+AsyncSession path the routers use now. Both routes run the same /pools
+first-page query, optionally behind a pg_sleep to stand in for a slow query.
+
+Starts its own uvicorn on --port and needs the database from the environment.
+
+    python tests/api_concurrency_bench.py --clients 200 --seconds 10 --query-delay 0.02
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal, get_async_db
+from app.services.pool_listing import PoolFilters, fetch_page, parse_fields, pools_query
+
+QUERY_DELAY = float(os.getenv("BENCH_QUERY_DELAY", "0"))
+# Requests stuck longer than this (e.g. waiting on an exhausted sync pool) count as errors
+CLIENT_TIMEOUT = 10
+FIELDS = parse_fields("pool_id,chain,project,apy,risk_score")
+QUERY = pools_query(PoolFilters(), "apy", "desc", FIELDS)
+
+bench_app = FastAPI()
+
+
+def get_sync_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@bench_app.get("/sync")
+async def sync_route(db: Session = Depends(get_sync_db)):
+    # What every route did before: blocking calls straight on the event loop
+    if QUERY_DELAY:
+        db.execute(text("SELECT pg_sleep(:s)"), {"s": QUERY_DELAY})
+    rows = db.execute(QUERY.limit(100)).mappings().all()
+    return {"pools": [dict(row) for row in rows]}
+
+
+@bench_app.get("/async")
+async def async_route(db: AsyncSession = Depends(get_async_db)):
+    if QUERY_DELAY:
+        await db.execute(text("SELECT pg_sleep(:s)"), {"s": QUERY_DELAY})
+    pools, _ = await fetch_page(db, QUERY, FIELDS, "apy", "desc", 100)
+    return {"pools": pools}
+
+
+async def load(url: str, clients: int, seconds: float):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(limits=limits, timeout=CLIENT_TIMEOUT) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    (await client.get(url)).raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(clients)])
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def report(name, latencies, errors, elapsed):
+    if not latencies:
+        print(f"{name:6s} no successful requests ({errors} errors)")
+        return
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:6s} {len(latencies) / elapsed:8.1f} req/s   p50 {statistics.median(latencies) * 1e3:8.1f} ms"
+          f"   p99 {p99 * 1e3:8.1f} ms   errors {errors}")
+
+
+def wait_until_up(server: subprocess.Popen, base_url: str, timeout: float = 20):
+    deadline = time.time() + timeout
+    while time.time() < deadline and server.poll() is None:
+        try:
+            httpx.get(base_url + "/async", timeout=5)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("benchmark server did not start")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--query-delay", type=float, default=0.02, help="pg_sleep seconds per request")
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    # A fresh server per variant: the sync one can wedge itself for good
+    env = {**os.environ, "BENCH_QUERY_DELAY": str(args.query_delay)}
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"{args.clients} clients, {args.seconds:.0f}s each, query delay {args.query_delay * 1e3:.0f} ms")
+    for name in ("sync", "async"):
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api_concurrency_bench:bench_app", "--port", str(args.port),
+             "--log-level", "critical", "--no-access-log"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        )
+        try:
+            wait_until_up(server, base_url)
+            report(name, *asyncio.run(load(f"{base_url}/{name}", args.clients, args.seconds)))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                # A loop blocked on the sync pool may never get to handle SIGTERM
+                server.kill()
+                server.wait()
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+try:
+    # Importing the models runs create_all, which already needs the database
+    from app.db import engine
+    from app.services import apy_history
+    from app.services.apy_history import _backfill, insert_history_rows, latest_valid_apy, new_history_rows
+except OperationalError:
+    pytest.skip("database not reachable", allow_module_level=True)
+
+CHART = [
+    {"timestamp": "2024-04-21T00:00:00.000Z", "tvlUsd": 100, "apy": 5.0, "apyBase": 4.0, "apyReward": 1.0, "il7d": None, "apyBase7d": None},
+    {"timestamp": "2024-04-22T00:00:00.000Z", "tvlUsd": 110, "apy": 5.5, "apyBase": 4.5, "apyReward": 1.0, "il7d": None, "apyBase7d": None},
+    {"timestamp": "2024-04-23T00:00:00.000Z", "tvlUsd": 120, "apy": 0, "apyBase": None, "apyReward": None, "il7d": None, "apyBase7d": None},
+]
+
+
+def test_without_watermark_keeps_every_point():
+    rows = new_history_rows("pool-1", CHART, None)
+    assert [r["timestamp"] for r in rows] == [datetime(2024, 4, 21), datetime(2024, 4, 22), datetime(2024, 4, 23)]
+    assert rows[1] == {
+        "pool_id": "pool-1", "timestamp": datetime(2024, 4, 22), "apy": 5.5, "apy_base": 4.5,
+        "apy_reward": 1.0, "tvl_usd": 110, "il_7d": None, "apy_base_7d": None,
+    }
+
+
+def test_watermark_keeps_only_newer_points():
+    rows = new_history_rows("pool-1", CHART, datetime(2024, 4, 22))
+    assert [r["timestamp"] for r in rows] == [datetime(2024, 4, 23)]
+    assert new_history_rows("pool-1", CHART, datetime(2024, 4, 23)) == []
+
+
+@pytest.fixture
+def db():
+    # Rolled back afterwards; the code's commits only release a savepoint
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+def test_latest_valid_apy_skips_trailing_zero_points(db):
+    pool_id = str(uuid.uuid4())
+    insert_history_rows(db, new_history_rows(pool_id, CHART, None))
+    entry = latest_valid_apy(db, pool_id)
+    assert entry["timestamp"] == "2024-04-22T00:00:00"
+    assert entry["apy"] == 5.5 and entry["apyBase"] == 4.5
+    assert entry["latest"] is False
+    assert entry["main_apy"] == 0.0
+
+
+def test_latest_valid_apy_is_the_newest_point_when_non_zero(db):
+    pool_id = str(uuid.uuid4())
+    insert_history_rows(db, new_history_rows(pool_id, CHART[:2], None))
+    entry = latest_valid_apy(db, pool_id)
+    assert entry["timestamp"] == "2024-04-22T00:00:00" and entry["latest"] is True
+    assert "main_apy" not in entry
+    assert latest_valid_apy(db, str(uuid.uuid4())) is None
+
+
+def test_latest_valid_apy_falls_back_when_every_apy_is_zero(db):
+    pool_id = str(uuid.uuid4())
+    insert_history_rows(db, new_history_rows(pool_id, CHART[2:], None))
+    entry = latest_valid_apy(db, pool_id)
+    assert entry["apy"] == 0.0 and entry["latest"] is True
+
+
+def test_backfill_writes_each_chart_past_its_watermark(db, monkeypatch):
+    known, new, failing = (str(uuid.uuid4()) for _ in range(3))
+    insert_history_rows(db, new_history_rows(known, CHART[:2], None))
+
+    async def afetch_pool_chart(pool_id):
+        await asyncio.sleep(0.01)
+        if pool_id == failing:
+            raise ValueError("upstream error")
+        return CHART
+
+    monkeypatch.setattr(apy_history, "SessionLocal", lambda: db)
+    monkeypatch.setattr(apy_history, "afetch_pool_chart", afetch_pool_chart)
+    stats = asyncio.run(_backfill([known, new, failing], concurrency=2))
+
+    assert stats == {"pools": 2, "points": 1 + 3, "failed": 1}
+    assert latest_valid_apy(db, known)["main_apy"] == 0.0
+    assert latest_valid_apy(db, new)["timestamp"] == "2024-04-22T00:00:00"
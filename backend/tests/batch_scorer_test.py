@@ -0,0 +1,31 @@
+import numpy as np
+
+from app.services.batch_scorer import score_pools_batch, top_n_indices
+from app.services.rec_engine import score_defillama_pool, get_top_pools
+from pool_factory import make_pools
+
+
+def test_batch_scores_match_per_pool_scores():
+    pools = make_pools(5000)
+    batch = score_pools_batch(pools)
+    for i, pool in enumerate(pools):
+        expected = score_defillama_pool(pool)
+        assert batch.apy[i] == expected["apy"]
+        assert batch.tvl_score[i] == expected["tvl_score"]
+        assert f"{batch.risk_score[i]}%" == expected["risk_score"]
+        assert batch.final_score[i] == expected["final_score"]
+
+
+def test_top_pools_match_full_sort():
+    pools = make_pools(2000, seed=7)
+    scored = [score_defillama_pool(pool) for pool in pools]
+    for top_n in (1, 5, 50, 2000, 5000):
+        expected = sorted(scored, key=lambda x: x["final_score"], reverse=True)[:top_n]
+        assert get_top_pools(pools, top_n) == expected
+
+
+def test_top_n_indices_breaks_ties_by_position():
+    scores = np.array([1.0, 3.0, 3.0, 2.0, 3.0])
+    assert top_n_indices(scores, 2).tolist() == [1, 2]
+    assert top_n_indices(scores, 4).tolist() == [1, 2, 4, 3]
+    assert top_n_indices(scores, 0).tolist() == []
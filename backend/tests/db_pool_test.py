@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.db_pool import TimedQueuePool, pool_metrics
+
+
+def make_pool(**kwargs):
+    return TimedQueuePool(lambda: sqlite3.connect(":memory:"), **kwargs)
+
+
+def test_checkouts_and_saturation_are_counted():
+    pool = make_pool(pool_size=2, max_overflow=1)
+    held = [pool.connect() for _ in range(3)]
+
+    metrics = pool_metrics(pool)
+    assert metrics["capacity"] == 3
+    assert metrics["checked_out"] == 3
+    assert metrics["overflow"] == 1
+    assert metrics["saturation"] == 1.0
+    assert metrics["checkouts"] == 3 and metrics["timeouts"] == 0
+
+    for connection in held:
+        connection.close()
+    metrics = pool_metrics(pool)
+    assert metrics["checked_out"] == 0
+    assert metrics["saturation"] == 0.0
+
+
+def test_wait_for_an_exhausted_pool_is_a_timeout():
+    pool = make_pool(pool_size=1, max_overflow=0, timeout=0.05)
+    held = pool.connect()
+    with pytest.raises(PoolTimeoutError):
+        pool.connect()
+
+    metrics = pool_metrics(pool)
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_ms_max"] >= 50
+    held.close()
+
+
+def test_stats_survive_recreate():
+    pool = make_pool(pool_size=1, max_overflow=0)
+    pool.connect().close()
+    fresh = pool.recreate()
+    fresh.connect().close()
+    assert isinstance(fresh, TimedQueuePool)
+    assert fresh.stats is pool.stats
+    assert pool_metrics(fresh)["checkouts"] == 2
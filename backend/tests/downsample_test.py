@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.downsample import bucket_average, downsample, lttb
+
+DAY = 24 * 60 * 60
+
+
+def series(size=1000, seed=7):
+    rng = np.random.default_rng(seed)
+    x = np.arange(size, dtype=np.float64) * DAY
+    y = 1e6 + np.cumsum(rng.normal(0, 1e4, size))
+    return x, y
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x, y = series()
+    y[400] = 5e7
+    y[700] = -5e7
+    dx, dy = lttb(x, y, 50)
+
+    assert len(dx) == 50
+    assert (dx[0], dx[-1]) == (x[0], x[-1])
+    assert np.all(np.diff(dx) > 0)
+    assert set(dy) <= set(y)
+    assert 5e7 in dy and -5e7 in dy
+
+
+def test_bucket_average_preserves_the_mean():
+    x, y = series(1000)
+    dx, dy = bucket_average(x, y, 100)
+    assert len(dx) == 100
+    # Equal buckets of 10 points: the mean of the means is the overall mean
+    assert dy.mean() == pytest.approx(y.mean())
+    assert dx[0] == pytest.approx(x[:10].mean())
+
+
+@pytest.mark.parametrize("method", ["lttb", "avg"])
+def test_short_series_are_returned_unchanged(method):
+    x, y = series(20)
+    dx, dy = downsample(x, y, 500, method)
+    np.testing.assert_array_equal(dx, x)
+    np.testing.assert_array_equal(dy, y)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        downsample([0, 1], [0, 1], 10, "median")
@@ -0,0 +1,39 @@
+from app.services.fingerprints import PoolFingerprintStore, pool_fingerprint
+from pool_factory import make_pools
+
+
+class DictRedis:
+    """Just enough of the redis client for a single hash."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(f) for f in fields]
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+def test_fingerprint_ignores_fields_not_stored():
+    pool = make_pools(1)[0]
+    same = {**pool, "apyBase7d": 99, "il7d": 1.5}
+    assert pool_fingerprint(pool) == pool_fingerprint(same)
+    assert pool_fingerprint(pool) != pool_fingerprint({**pool, "tvlUsd": pool["tvlUsd"] + 1})
+
+
+def test_only_changed_pools_are_returned_after_save():
+    store = PoolFingerprintStore(client=DictRedis())
+    pools = make_pools(50)
+
+    changed, fingerprints = store.changed(pools)
+    assert changed == pools
+    store.save(fingerprints)
+
+    pools[3] = {**pools[3], "apy": 1234.5}
+    changed, fingerprints = store.changed(pools)
+    assert changed == [pools[3]]
+    assert list(fingerprints) == [pools[3]["pool"]]
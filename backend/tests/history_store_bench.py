@@ -0,0 +1,56 @@
+"""
+Benchmark: range queries and rolling statistics over the columnar history
+files, for thousands of pools with years of daily points.
+
+    python tests/history_store_bench.py 2000 1825
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.history_store import HistoryStore, rolling_mean, rolling_std, window_summary
+
+DAY = 24 * 60 * 60
+
+
+def build(store, pools, days):
+    rng = np.random.default_rng(0)
+    ts = (np.arange(days, dtype=np.int64) + 18000) * DAY
+    for i in range(pools):
+        apy = np.abs(np.cumsum(rng.normal(0, 0.3, days)) + rng.uniform(1, 30)).astype(np.float32)
+        tvl = rng.uniform(1e5, 1e9, days).astype(np.float32)
+        store.write(f"pool-{i}", ts, apy, tvl)
+    return ts
+
+
+if __name__ == "__main__":
+    pools = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 5 * 365
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(directory)
+        start = time.perf_counter()
+        ts = build(store, pools, days)
+        print(f"write {pools} pools x {days} days     {time.perf_counter() - start:8.2f} s "
+              f"({pools * days * 16 / 1e6:.1f} MB on disk)")
+        keys = store.keys()
+
+        start = time.perf_counter()
+        summary = window_summary(store, keys, start=int(ts[-90]), end=int(ts[-1]) + 1)
+        print(f"90-day summary, all pools          {(time.perf_counter() - start) * 1e3:8.1f} ms ({len(summary)} pools)")
+
+        start = time.perf_counter()
+        for key in keys:
+            apy = store.open(key).range(int(ts[-365])).apy
+            rolling_mean(apy, 30)
+            rolling_std(apy, 30)
+        print(f"1y rolling 30d mean+std, all pools {(time.perf_counter() - start) * 1e3:8.1f} ms")
+
+        start = time.perf_counter()
+        series = store.open(keys[0]).range(int(ts[100]), int(ts[400]))
+        print(f"single pool range query            {(time.perf_counter() - start) * 1e6:8.1f} us ({len(series)} points)")
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.history_store import HistoryStore, rolling_mean, rolling_std, window_summary
+
+DAY = 24 * 60 * 60
+
+
+def test_round_trip_is_a_view_on_the_file(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write("pool-a", [0, DAY, 2 * DAY], [1.5, None, 3.0], [100, 200, None])
+
+    series = store.open("pool-a")
+    assert series.ts.tolist() == [0, DAY, 2 * DAY]
+    np.testing.assert_array_equal(series.apy, np.array([1.5, np.nan, 3.0], dtype=np.float32))
+    assert not series.ts.flags.owndata
+    assert not series.apy.flags.writeable
+    assert store.open("missing") is None
+
+
+def test_append_only_adds_newer_points(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert store.append("p", [0, DAY], [1, 2], [10, 20]) == 2
+    assert store.append("p", [DAY, 2 * DAY, 3 * DAY], [9, 3, 4], [9, 30, 40]) == 2
+    series = store.open("p")
+    assert series.ts.tolist() == [0, DAY, 2 * DAY, 3 * DAY]
+    assert series.apy.tolist() == [1, 2, 3, 4]
+    assert store.last_ts("p") == 3 * DAY
+
+
+def test_range_uses_half_open_interval(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    ts = np.arange(10) * DAY
+    store.write("p", ts, np.arange(10, dtype=np.float32), np.zeros(10, dtype=np.float32))
+    series = store.open("p")
+    part = series.range(2 * DAY, 5 * DAY)
+    assert part.apy.tolist() == [2, 3, 4]
+    assert np.shares_memory(part.apy, series.apy)
+
+
+def test_rolling_stats_match_naive_windows():
+    rng = np.random.default_rng(1)
+    values = rng.uniform(0, 30, 200)
+    values[rng.choice(200, 20, replace=False)] = np.nan
+    window = 7
+    naive = [values[i:i + window] for i in range(len(values) - window + 1)]
+    np.testing.assert_allclose(rolling_mean(values, window), [np.nanmean(w) for w in naive], rtol=1e-9)
+    np.testing.assert_allclose(rolling_std(values, window), [np.nanstd(w) for w in naive], rtol=1e-6, atol=1e-6)
+    with pytest.raises(ValueError):
+        rolling_mean(values, 0)
+
+
+def test_window_summary(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write("a", [0, DAY, 2 * DAY], [1, 5, 3], [10, 20, 30])
+    store.write("b", [0], [None], [1])
+    summary = window_summary(store, ["a", "b", "c"], start=DAY)
+    assert summary == {"a": {"points": 2, "apy_mean": 4.0, "apy_min": 3.0, "apy_max": 5.0, "apy_last": 3.0, "tvl_last": 30.0}}
@@ -0,0 +1,125 @@
+import json
+import os
+
+import httpx
+import pytest
+import redis
+
+from app.api import metrics
+from app.services import http_client
+from app.services.http_cache import FileCacheBackend, HttpCache, HttpCacheMiss, RedisCacheBackend
+
+URL = "https://yields.llama.fi/pools"
+BODY = json.dumps({"status": "success", "data": [{"pool": str(i)} for i in range(2000)]}).encode()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Serve BODY with an ETag through the shared client and record requests."""
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=BODY, headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(http_client, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(http_client, "_client_pid", os.getpid())
+    return seen
+
+
+def test_fresh_hit_then_conditional_revalidation(tmp_path, upstream):
+    cache = HttpCache(FileCacheBackend(str(tmp_path)), {"pools": 60})
+    assert cache.get_bytes(URL, "pools") == BODY
+    assert cache.get_bytes(URL, "pools") == BODY
+    assert len(upstream) == 1
+
+    cache.ttls["pools"] = 0
+    assert cache.get_bytes(URL, "pools") == BODY
+    assert upstream[-1].headers["if-none-match"] == '"v1"'
+    assert cache.stats() == {"miss": 1, "pools.miss": 1, "hit": 1, "pools.hit": 1,
+                             "revalidated": 1, "pools.revalidated": 1}
+
+
+def test_streamed_body_is_cached_only_when_fully_read(tmp_path, upstream):
+    cache = HttpCache(FileCacheBackend(str(tmp_path)), {"pools": 60})
+    chunks = cache.iter_bytes(URL, "pools", chunk_size=1024)
+    next(chunks)
+    chunks.close()
+    assert cache.backend.get(cache.key(URL)) is None
+
+    assert b"".join(cache.iter_bytes(URL, "pools", chunk_size=1024)) == BODY
+    assert b"".join(cache.iter_bytes(URL, "pools", chunk_size=1024)) == BODY
+    assert len(upstream) == 2
+
+
+def test_offline_mode_serves_cache_without_network(tmp_path, upstream):
+    HttpCache(FileCacheBackend(str(tmp_path)), {}).get_bytes(URL, "pools")
+    offline = HttpCache(FileCacheBackend(str(tmp_path)), {"pools": 0}, offline=True)
+    assert offline.get_bytes(URL, "pools") == BODY
+    with pytest.raises(HttpCacheMiss):
+        offline.get_bytes(URL + "?other", "pools")
+    assert len(upstream) == 1
+
+
+class DictRedis:
+    """The sync hash commands RedisCacheBackend uses, over a dict."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    def hgetall(self, key):
+        return {k.encode(): str(v).encode() if isinstance(v, int) else v for k, v in self.hashes.get(key, {}).items()}
+
+    def pipeline(self, transaction=True):
+        store, ops = self, []
+
+        class Pipeline:
+            def hset(self, key, mapping):
+                ops.append(lambda: store.hashes.setdefault(key, {}).update(
+                    {k: v.encode() if isinstance(v, str) else v for k, v in mapping.items()}))
+
+            def hincrby(self, key, field, amount):
+                ops.append(lambda: store.hashes.setdefault(key, {}).update(
+                    {field: store.hashes[key].get(field, 0) + amount}))
+
+            def expire(self, key, seconds):
+                pass
+
+            def execute(self):
+                return [op() for op in ops]
+
+        return Pipeline()
+
+
+class DownRedis(DictRedis):
+    def hgetall(self, key):
+        raise redis.ConnectionError("down")
+
+
+def test_redis_backend_counts_across_processes(upstream, monkeypatch):
+    client = DictRedis()
+    worker, api = (HttpCache(RedisCacheBackend(client), {"pools": 60}) for _ in range(2))
+    worker.get_bytes(URL, "pools")
+    worker.get_bytes(URL, "pools")
+    api.get_bytes(URL, "pools")
+    assert api.stats() == {"miss": 1, "pools.miss": 1, "hit": 2, "pools.hit": 2}
+    assert api.counters == {"hit": 1, "pools.hit": 1}
+
+    monkeypatch.setattr(metrics, "get_http_cache", lambda: api)
+    assert metrics.get_http_cache_metrics() == {"scope": "all processes", "counters": api.stats()}
+
+
+def test_counters_fall_back_to_this_process(tmp_path, upstream, monkeypatch):
+    down = HttpCache(RedisCacheBackend(DownRedis()), {"pools": 60})
+    down.get_bytes(URL, "pools")
+    assert down.stats() == {"miss": 1, "pools.miss": 1}
+
+    local = HttpCache(FileCacheBackend(str(tmp_path)), {"pools": 60})
+    local.get_bytes(URL, "pools")
+    monkeypatch.setattr(metrics, "get_http_cache", lambda: local)
+    assert metrics.get_http_cache_metrics() == {"scope": "this process", "counters": {"miss": 1, "pools.miss": 1}}
@@ -0,0 +1,60 @@
+"""
+Benchmark: bare requests.get (new connection per call) against the pooled
+http_client, for sequential calls and a concurrent fan-out.
+
+    python tests/http_client_bench.py https://api.llama.fi/protocol/aave-v3 20
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import http_client
+
+DEFAULT_URL = "https://api.llama.fi/protocol/aave-v3"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def sequential(call, url, n):
+    return [timed(lambda: call(url).raise_for_status()) for _ in range(n)]
+
+
+async def async_fan_out(url, n):
+    try:
+        responses = await asyncio.gather(*[http_client.aget(url) for _ in range(n)])
+        for response in responses:
+            response.raise_for_status()
+    finally:
+        await http_client.aclose()
+
+
+def threaded_fan_out(url, n):
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        for response in executor.map(lambda _: requests.get(url, timeout=30), range(n)):
+            response.raise_for_status()
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_URL
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    bare = sequential(lambda u: requests.get(u, timeout=30), url, n)
+    pooled = sequential(http_client.get, url, n)
+    print(f"sequential x{n}   requests.get   median {statistics.median(bare) * 1e3:8.1f} ms/call")
+    print(f"sequential x{n}   http_client    median {statistics.median(pooled) * 1e3:8.1f} ms/call")
+
+    t_threads = timed(lambda: threaded_fan_out(url, n))
+    t_async = timed(lambda: asyncio.run(async_fan_out(url, n)))
+    print(f"fan-out x{n}      threads+requests total {t_threads * 1e3:8.1f} ms")
+    print(f"fan-out x{n}      http_client async  total {t_async * 1e3:8.1f} ms")
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sys
+
+import bcrypt
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+
+from app.services.passwords import PasswordHasher, PasswordHasherBusy, hash_rounds
+
+try:
+    # user_services imports the models, whose create_all needs the database
+    from app.models.models import User
+    from app.services import user_services
+except OperationalError:
+    pytest.skip("database not reachable", allow_module_level=True)
+
+
+class OneUserSession:
+    """The two AsyncSession calls login_user makes."""
+
+    def __init__(self, user):
+        self.user, self.commits = user, 0
+
+    async def execute(self, query):
+        user = self.user
+
+        class Result:
+            def scalars(self):
+                return self
+
+            def first(self):
+                return user
+
+        return Result()
+
+    async def commit(self):
+        self.commits += 1
+
+
+class BusyHasher(PasswordHasher):
+    async def hash(self, password):
+        raise PasswordHasherBusy()
+
+
+def old_cost_user():
+    return User(id=7, email="alice@example.com", password_hash=bcrypt.hashpw(b"hunter2", bcrypt.gensalt(4)).decode())
+
+
+def test_login_moves_the_hash_to_the_current_cost(monkeypatch):
+    monkeypatch.setattr(user_services, "password_hasher", PasswordHasher(rounds=5, workers=1, max_pending=4))
+    db = OneUserSession(old_cost_user())
+
+    result = asyncio.run(user_services.login_user("alice@example.com", "hunter2", db))
+    assert result["access_token"]
+    assert hash_rounds(db.user.password_hash) == 5
+    assert bcrypt.checkpw(b"hunter2", db.user.password_hash.encode())
+    assert db.commits == 1
+
+
+def test_busy_hasher_skips_the_rehash_but_not_the_login(monkeypatch):
+    monkeypatch.setattr(user_services, "password_hasher", BusyHasher(rounds=5, workers=1, max_pending=4))
+    user = old_cost_user()
+    old_hash = user.password_hash
+    db = OneUserSession(user)
+
+    result = asyncio.run(user_services.login_user("alice@example.com", "hunter2", db))
+    assert result["access_token"]
+    assert user.password_hash == old_hash
+    assert db.commits == 0
+    assert asyncio.run(user_services.login_user("alice@example.com", "wrong", db)) is None
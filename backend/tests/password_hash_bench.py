@@ -0,0 +1,130 @@
+"""
+Benchmark: /health latency while a signup storm hashes passwords, with bcrypt
+run inline on the event loop (what /users/signup did before) against the
+PasswordHasher thread pool it uses now. No database: both storm routes only
+hash, so the difference is purely where bcrypt runs.
+
+Starts its own uvicorn on --port.
+
+    python tests/password_hash_bench.py --storm-clients 20 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import bcrypt
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, HTTPException
+
+from app.core.config import settings
+from app.services.passwords import PasswordHasherBusy, password_hasher
+
+CLIENT_TIMEOUT = 30
+# Paced probe, one request at a time, so it measures the loop's responsiveness rather than its throughput
+PROBE_INTERVAL = 0.05
+
+bench_app = FastAPI()
+
+
+@bench_app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@bench_app.post("/signup-inline")
+async def signup_inline():
+    bcrypt.hashpw(b"correct horse battery staple", bcrypt.gensalt(settings.BCRYPT_ROUNDS))
+    return {}
+
+
+@bench_app.post("/signup-pooled")
+async def signup_pooled():
+    try:
+        await password_hasher.hash("correct horse battery staple")
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503)
+    return {}
+
+
+async def probe(client: httpx.AsyncClient, url: str, seconds: float):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        (await client.get(url)).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+async def storm(client: httpx.AsyncClient, url: str, clients: int, seconds: float):
+    counts = {"ok": 0, "shed": 0}
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            response = await client.post(url)
+            counts["ok" if response.status_code == 200 else "shed"] += 1
+
+    await asyncio.gather(*[worker() for _ in range(clients)])
+    return counts
+
+
+async def run(base_url: str, storm_path, clients: int, seconds: float):
+    limits = httpx.Limits(max_connections=clients + 1)
+    async with httpx.AsyncClient(limits=limits, timeout=CLIENT_TIMEOUT) as client:
+        if storm_path is None:
+            return await probe(client, base_url + "/health", seconds), None
+        latencies, counts = await asyncio.gather(
+            probe(client, base_url + "/health", seconds),
+            storm(client, base_url + storm_path, clients, seconds),
+        )
+        return latencies, counts
+
+
+def report(name, latencies, counts, seconds):
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    line = (f"  {name:26s} /health p50 {statistics.median(latencies) * 1e3:7.1f} ms   p99 {p99 * 1e3:7.1f} ms"
+            f"   max {latencies[-1] * 1e3:7.1f} ms")
+    if counts:
+        line += f"   signups {counts['ok'] / seconds:5.1f}/s   shed {counts['shed']}"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storm-clients", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8797)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "tests.password_hash_bench:bench_app", "--port", str(args.port),
+         "--log-level", "critical", "--no-access-log"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(base_url + "/health")
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+
+        print(f"bcrypt rounds {settings.BCRYPT_ROUNDS}, {settings.PASSWORD_HASH_WORKERS} hash workers, "
+              f"{args.storm_clients} signup clients, {args.seconds:.0f}s each")
+        for name, path in [("idle", None), ("storm, bcrypt inline", "/signup-inline"),
+                           ("storm, bcrypt thread pool", "/signup-pooled")]:
+            report(name, *asyncio.run(run(base_url, path, args.storm_clients, args.seconds)), args.seconds)
+    finally:
+        server.terminate()
+        server.wait()
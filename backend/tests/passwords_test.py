@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+
+import bcrypt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.passwords import PasswordHasher, PasswordHasherBusy, hash_rounds
+
+
+def test_hash_and_verify_off_the_loop():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=4)
+
+    async def run():
+        hashed = await hasher.hash("hunter2")
+        return hashed, await hasher.verify("hunter2", hashed), await hasher.verify("hunter3", hashed)
+
+    hashed, good, bad = asyncio.run(run())
+    assert hash_rounds(hashed) == 4
+    assert good and not bad
+
+
+def test_verify_rejects_non_bcrypt_hash():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=4)
+    assert asyncio.run(hasher.verify("hunter2", "plain-text")) is False
+
+
+def test_needs_rehash_when_cost_changes():
+    old = bcrypt.hashpw(b"hunter2", bcrypt.gensalt(5)).decode()
+    assert PasswordHasher(rounds=6, workers=1).needs_rehash(old)
+    assert PasswordHasher(rounds=4, workers=1).needs_rehash(old)
+    assert not PasswordHasher(rounds=5, workers=1).needs_rehash(old)
+    assert hash_rounds("not-a-hash") is None
+
+
+def test_rejects_calls_past_max_pending():
+    hasher = PasswordHasher(rounds=10, workers=1, max_pending=2)
+
+    async def run():
+        return await asyncio.gather(*[hasher.hash("hunter2") for _ in range(4)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 2
+    assert sum(isinstance(r, str) for r in results) == 2
+    assert hasher._pending == 0
@@ -0,0 +1,53 @@
+import random
+import uuid
+
+CHAINS = ["Ethereum", "Arbitrum", "Base", "Polygon", "Solana", "BSC"]
+PROJECTS = ["aave-v3", "compound-v2", "uniswap-v3", "curve-dex", "lido", "maple", "pendle"]
+
+
+def make_pool(rng: random.Random) -> dict:
+    """Build a random pool dict shaped like one entry of yields.llama.fi/pools."""
+    apy_base = rng.choice([None, 0, round(rng.uniform(0, 40), 5)])
+    apy_reward = rng.choice([None, 0, round(rng.uniform(0, 80), 5)])
+    apy = (apy_base or 0) + (apy_reward or 0) or round(rng.uniform(0, 20), 5)
+    prob = rng.choice([None, 0, rng.randint(1, 100)])
+    predictions = rng.choice([
+        None,
+        {},
+        {"predictedClass": "Stable/Up", "predictedProbability": prob, "binnedConfidence": 2},
+    ])
+    return {
+        "chain": rng.choice(CHAINS),
+        "project": rng.choice(PROJECTS),
+        "symbol": rng.choice(["USDC", "WETH", "WBTC", "DAI", "USDC-WETH"]),
+        "tvlUsd": rng.choice([0, rng.randint(1, 10_000), rng.randint(10_000, 60_000_000_000)]),
+        "apyBase": apy_base,
+        "apyReward": apy_reward,
+        "apy": apy,
+        "rewardTokens": [],
+        "pool": str(uuid.UUID(int=rng.getrandbits(128))),
+        "apyPct1D": round(rng.uniform(-1, 1), 5),
+        "apyPct7D": round(rng.uniform(-3, 3), 5),
+        "apyPct30D": round(rng.uniform(-5, 5), 5),
+        "stablecoin": rng.random() < 0.4,
+        "ilRisk": rng.choice(["no", "yes"]),
+        "exposure": rng.choice(["single", "multi"]),
+        "predictions": predictions,
+        "poolMeta": None,
+        "mu": round(rng.uniform(0, 30), 5),
+        "sigma": round(rng.uniform(0, 2), 5),
+        "count": rng.randint(1, 1500),
+        "outlier": rng.random() < 0.05,
+        "underlyingTokens": ["0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"],
+        "il7d": None,
+        "apyBase7d": None,
+        "apyMean30d": round(rng.uniform(0, 30), 5),
+        "volumeUsd1d": None,
+        "volumeUsd7d": None,
+        "apyBaseInception": None,
+    }
+
+
+def make_pools(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [make_pool(rng) for _ in range(n)]
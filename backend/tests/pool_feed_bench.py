@@ -0,0 +1,93 @@
+"""
+Benchmark: parsing the yields.llama.fi/pools feed with resp.json() against
+the streaming parser in pull_data (iter_json_array).
+
+Uses a recorded feed if given, otherwise generates synthetic feeds:
+    curl -o /tmp/pools.json https://yields.llama.fi/pools
+    python tests/pool_feed_bench.py /tmp/pools.json
+
+Peak memory is measured with tracemalloc (Python allocations only).
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.pull_data import iter_json_array, STREAM_CHUNK_SIZE
+from pool_factory import make_pools
+
+SYNTHETIC_SIZES = [10_000, 50_000]
+
+
+def file_chunks(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def load_whole(path, limit):
+    # What fetch_pools did before: read the full body, json-decode, slice
+    with open(path, "rb") as f:
+        pools = json.loads(f.read()).get("data", [])
+    return len(pools[:limit] if limit else pools)
+
+
+def stream(path, limit):
+    count = 0
+    for _ in iter_json_array(file_chunks(path), "data"):
+        count += 1
+        if limit and count >= limit:
+            break
+    return count
+
+
+def measure(fn, *args):
+    # Timed and memory-traced in separate runs, tracemalloc slows parsing down a lot
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def write_fixture(n):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"status": "success", "data": make_pools(n)}, f)
+    return path
+
+
+def report(path, label):
+    size_mb = os.path.getsize(path) / 1e6
+    for limit in (10, None):
+        t_whole, m_whole = measure(load_whole, path, limit)
+        t_stream, m_stream = measure(stream, path, limit)
+        print(
+            f"{label:>10} {size_mb:>7.1f} {str(limit or 'all'):>6} "
+            f"{t_whole * 1e3:>10.1f} {m_whole / 1e6:>10.1f} "
+            f"{t_stream * 1e3:>10.1f} {m_stream / 1e6:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    print(f"{'feed':>10} {'MB':>7} {'limit':>6} {'json ms':>10} {'json MB':>10} {'stream ms':>10} {'stream MB':>10}")
+    if len(sys.argv) > 1:
+        report(sys.argv[1], "recorded")
+    else:
+        for n in SYNTHETIC_SIZES:
+            path = write_fixture(n)
+            try:
+                report(path, f"{n} pools")
+            finally:
+                os.remove(path)
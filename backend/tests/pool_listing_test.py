@@ -0,0 +1,45 @@
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pool_listing import PoolFilters, decode_cursor, encode_cursor, parse_fields, pools_query
+
+
+def test_cursor_round_trip_keeps_exact_values():
+    cursor = encode_cursor("risk_score", "asc", Decimal("42.50000001"), 17)
+    assert decode_cursor(cursor, "risk_score", "asc") == (Decimal("42.50000001"), 17)
+    assert decode_cursor(encode_cursor("apy", "desc", None, 3), "apy", "desc") == (None, 3)
+
+
+def test_cursor_rejects_garbage_and_other_sort_orders():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", "apy", "desc")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("apy", "desc", 1, 1), "apy", "asc")
+
+
+def test_fields_projection():
+    assert parse_fields("apy, chain,apy") == ["apy", "chain"]
+    assert "pool_metadata" in parse_fields(None)
+    with pytest.raises(ValueError):
+        parse_fields("apy,password")
+
+
+def test_query_selects_only_requested_columns_plus_keyset():
+    query = pools_query(PoolFilters(chain="Base"), "apy", "desc", ["chain"], encode_cursor("apy", "desc", 5, 9))
+    assert [c.name for c in query.selected_columns] == ["chain", "_sort_key", "_pk"]
+    sql = str(query.compile(compile_kwargs={"literal_binds": True}))
+    assert "(pools.apy, pools.id) < (5, 9)" in sql
+    assert "ORDER BY pools.apy DESC NULLS LAST, pools.id DESC" in sql
+
+
+def test_numeric_output_columns_are_floats_but_the_cursor_key_is_not():
+    query = pools_query(PoolFilters(), "risk_score", "asc", ["apy", "count"])
+    sql = str(query.compile())
+    assert "CAST(pools.apy AS FLOAT) AS apy" in sql
+    assert "pools.count AS count" in sql
+    assert "pools.risk_score AS _sort_key" in sql
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+
+from app.services.token_metadata import normalize_chain
+
+try:
+    # wallet_services imports the models, whose create_all needs the database
+    from app.services import wallet_services
+except OperationalError:
+    pytest.skip("database not reachable", allow_module_level=True)
+
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+
+
+def test_chain_aliases():
+    assert normalize_chain("eth") == normalize_chain(" Ethereum ") == "ethereum"
+    assert normalize_chain("MATIC") == "polygon"
+    assert normalize_chain("solana") == "solana"
+
+
+def test_wallets_are_valued_per_chain(monkeypatch):
+    balance_calls, metadata_calls, price_calls = [], [], []
+
+    async def get_token_balances(address, chain="ethereum"):
+        balance_calls.append((address, chain))
+        return [{"contractAddress": USDC, "tokenBalance": hex(2_000_000)}]
+
+    async def get_many(db, chain, addresses):
+        metadata_calls.append((chain, sorted(addresses)))
+        return {address: {"name": "USD Coin", "symbol": "USDC", "decimals": 6} for address in addresses}
+
+    async def get_token_prices(platform, addresses, vs="usd"):
+        price_calls.append((platform, sorted(addresses)))
+        return {address: 1.0 if platform == "ethereum" else 0.5 for address in addresses}
+
+    monkeypatch.setattr(wallet_services, "get_token_balances", get_token_balances)
+    monkeypatch.setattr(wallet_services.token_metadata, "get_many", get_many)
+    monkeypatch.setattr(wallet_services.price_oracle, "get_token_prices", get_token_prices)
+
+    wallets = [("0x1", "eth"), ("0x2", "Arbitrum"), ("0x3", "ethereum"), ("0x4", "solana")]
+    portfolio = asyncio.run(wallet_services.get_portfolio_value(None, wallets))
+
+    assert sorted(balance_calls) == [("0x1", "ethereum"), ("0x2", "arbitrum"), ("0x3", "ethereum")]
+    # One metadata and one price lookup per chain, on that chain's CoinGecko platform
+    assert sorted(metadata_calls) == [("arbitrum", [USDC.lower()]), ("ethereum", [USDC.lower()])]
+    assert sorted(price_calls) == [("arbitrum-one", [USDC.lower()]), ("ethereum", [USDC.lower()])]
+    assert [w["value_usd"] for w in portfolio["wallets"]] == [2.0, 1.0, 2.0, None]
+    assert portfolio["wallets"][3]["error"] == "Unsupported chain: solana"
+    assert portfolio["value_usd"] == 5.0
+    assert portfolio["unsupported_chains"] == ["solana"]
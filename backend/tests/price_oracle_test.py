@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import redis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import http_client
+from app.services.price_oracle import PRICE_KEY, PriceOracle, chunk_by_url_length, coin, token
+
+ETH = coin("ethereum")
+USDC = token("ethereum", "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48")
+
+
+class DictRedis:
+    """The few async Redis calls the oracle makes, over a dict (expiry isn't modelled)."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return DictPipeline(self)
+
+
+class DictPipeline:
+    def __init__(self, store):
+        self.store, self.ops = store, []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, nx=False, ex=None):
+        self.ops.append(("set", key, value, nx))
+
+    def delete(self, key):
+        self.ops.append(("delete", key, None, False))
+
+    async def execute(self):
+        results = []
+        for op, key, value, nx in self.ops:
+            if op == "delete":
+                results.append(self.store.data.pop(key, None) is not None)
+            elif nx and key in self.store.data:
+                results.append(None)
+            else:
+                self.store.data[key] = value
+                results.append(True)
+        return results
+
+
+class DownRedis:
+    async def mget(self, keys):
+        raise redis.ConnectionError("down")
+
+    def pipeline(self, transaction=True):
+        raise redis.ConnectionError("down")
+
+
+class Upstream:
+    def __init__(self, prices, delay=0.05):
+        self.prices, self.delay, self.calls = prices, delay, []
+
+    async def __call__(self, assets, vs):
+        self.calls.append(sorted(assets))
+        await asyncio.sleep(self.delay)
+        return {asset: self.prices.get(asset) for asset in assets}
+
+
+def cache_entry(price, age):
+    return json.dumps({"price": price, "fetched_at": time.time() - age})
+
+
+def test_concurrent_misses_make_one_upstream_call():
+    upstream = Upstream({ETH: 3000.0})
+    oracle = PriceOracle(client=DictRedis(), ttl=30, fetcher=upstream)
+
+    async def run():
+        return await asyncio.gather(*[oracle.get_price(ETH) for _ in range(20)])
+
+    assert asyncio.run(run()) == [3000.0] * 20
+    assert upstream.calls == [[ETH]]
+
+
+def test_processes_share_the_cache_and_the_fetch():
+    upstream = Upstream({ETH: 3000.0}, delay=0.2)
+    store = DictRedis()
+    api, worker = (PriceOracle(client=store, ttl=30, lock_wait=1, fetcher=upstream) for _ in range(2))
+
+    async def run():
+        return await asyncio.gather(api.get_price(ETH), worker.get_price(ETH))
+
+    assert asyncio.run(run()) == [3000.0, 3000.0]
+    assert upstream.calls == [[ETH]]
+    assert asyncio.run(worker.get_price(ETH)) == 3000.0
+    assert len(upstream.calls) == 1
+
+
+def test_stale_hit_is_served_then_refreshed_once():
+    upstream = Upstream({ETH: 3100.0})
+    store = DictRedis()
+    store.data[PRICE_KEY.format(vs="usd", asset=ETH)] = cache_entry(3000.0, age=60)
+    oracle = PriceOracle(client=store, ttl=30, fetcher=upstream)
+
+    async def run():
+        first = await asyncio.gather(*[oracle.get_price(ETH) for _ in range(5)])
+        await asyncio.sleep(0.2)
+        return first, await oracle.get_price(ETH)
+
+    served, refreshed = asyncio.run(run())
+    assert served == [3000.0] * 5
+    assert refreshed == 3100.0
+    assert upstream.calls == [[ETH]]
+
+
+def test_batch_fetches_only_the_misses():
+    upstream = Upstream({USDC: 1.0})
+    store = DictRedis()
+    store.data[PRICE_KEY.format(vs="usd", asset=ETH)] = cache_entry(3000.0, age=1)
+    oracle = PriceOracle(client=store, ttl=30, fetcher=upstream)
+    unknown = token("ethereum", "0xdead")
+
+    prices = asyncio.run(oracle.get_prices([ETH, USDC, unknown, USDC]))
+    assert prices == {ETH: 3000.0, USDC: 1.0, unknown: None}
+    assert upstream.calls == [sorted([USDC, unknown])]
+    # Unknown assets are cached too
+    assert asyncio.run(oracle.get_prices([unknown])) == {unknown: None}
+    assert len(upstream.calls) == 1
+
+
+def test_redis_down_still_prices():
+    upstream = Upstream({ETH: 3000.0})
+    oracle = PriceOracle(client=DownRedis(), ttl=30, fetcher=upstream)
+    assert asyncio.run(oracle.get_prices([ETH])) == {ETH: 3000.0}
+
+
+def test_chunks_stay_within_url_limits():
+    url = "https://api.coingecko.com/api/v3/simple/token_price/ethereum"
+    addresses = [f"0x{i:040x}" for i in range(500)]
+    chunks = chunk_by_url_length(url, "contract_addresses", addresses, {"vs_currencies": "usd"},
+                                 max_length=2000, max_count=100)
+    assert [a for chunk in chunks for a in chunk] == addresses
+    for chunk in chunks:
+        params = {"contract_addresses": ",".join(chunk), "vs_currencies": "usd"}
+        assert len(str(httpx.URL(url, params=params))) <= 2000
+    # 42-char addresses plus an encoded comma each: 42 fit next to the ~95-character base URL
+    assert len(chunks[0]) == 42 and len(chunks) == 12
+    assert len(chunk_by_url_length(url, "contract_addresses", addresses, {}, max_length=10**6, max_count=100)) == 5
+
+
+def test_token_prices_are_deduped_and_chunked(monkeypatch):
+    calls = []
+
+    async def aget(url, params=None, **kwargs):
+        calls.append(params["contract_addresses"].split(","))
+        return httpx.Response(200, request=httpx.Request("GET", url),
+                              json={address.upper().replace("0X", "0x"): {"usd": 2.0} for address in calls[-1][1:]})
+
+    monkeypatch.setattr(http_client, "aget", aget)
+    addresses = [f"0x{i:040X}" for i in range(120)]
+    oracle = PriceOracle(client=DownRedis(), ttl=30)
+
+    prices = asyncio.run(oracle.get_token_prices("ethereum", addresses + addresses[:60]))
+    assert len(prices) == 120
+    assert sorted(a for chunk in calls for a in chunk) == sorted(a.lower() for a in addresses)
+    assert sorted(len(chunk) for chunk in calls) == [36, 42, 42]
+    # The first address of every chunk is unknown upstream
+    assert sum(price is None for price in prices.values()) == 3
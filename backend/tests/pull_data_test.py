@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from app.services.pull_data import iter_json_array
+from pool_factory import make_pools
+
+
+def chunked(body: bytes, size: int):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def test_iter_json_array_matches_json_loads_for_any_chunk_size():
+    pools = make_pools(200)
+    pools[3]["symbol"] = "ÉTH-€"  # multi-byte characters split across chunks
+    body = json.dumps({"status": "success", "data": pools}, indent=1).encode("utf-8")
+    for size in (1, 7, 4096, len(body)):
+        assert list(iter_json_array(chunked(body, size), "data")) == pools
+
+
+def test_iter_json_array_stops_reading_when_consumer_stops():
+    body = json.dumps({"status": "success", "data": make_pools(1000)}).encode("utf-8")
+    chunks = chunked(body, 1024)
+    items = iter_json_array(chunks, "data")
+    first = [next(items) for _ in range(3)]
+    assert len(first) == 3
+    assert sum(1 for _ in chunks) > 0  # the rest of the body was never pulled
+
+
+def test_iter_json_array_edge_cases():
+    assert list(iter_json_array([b'{"data": []}'])) == []
+    assert list(iter_json_array([b'{}'])) == []
+    assert list(iter_json_array([b'{"status": "ok"}'])) == []
+    assert list(iter_json_array([b'{"meta": {"a": [1, 2]}, "data": [1, 2', b'3, -4.5e1]}'])) == [1, 23, -45.0]
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"data": [{"a": 1}, {"b"']))
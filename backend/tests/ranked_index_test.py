@@ -0,0 +1,94 @@
+import asyncio
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import ranked_index as ranked_index_module
+from app.services.ranked_index import RISK_TOLERANCE_MAX_SCORE, RankedIndexHolder, RankedPoolIndex
+
+CHAINS = ["Ethereum", "Arbitrum", "Base", None]
+
+
+def make_rows(count=500, seed=3):
+    rng = random.Random(seed)
+    return [
+        {
+            "pool_id": f"pool-{i}",
+            "pool_name": f"pool {i}",
+            "chain": rng.choice(CHAINS),
+            "project": "proj",
+            "symbol": "USDC",
+            "apy": rng.uniform(0, 50),
+            "tvl_usd": rng.uniform(1e5, 1e9),
+            "risk_score": None if i % 50 == 0 else round(rng.uniform(5, 95), 2),
+            # Coarse scores so ties are common
+            "final_score": None if i % 77 == 0 else round(rng.uniform(-10, 90)),
+            "stablecoin": rng.random() < 0.3,
+        }
+        for i in range(count)
+    ]
+
+
+def reference_top(rows, n, risk_tolerance=None, chain=None, stablecoin=None):
+    matches = [
+        row for row in rows
+        if (risk_tolerance is None or (row["risk_score"] is not None
+                                       and row["risk_score"] <= RISK_TOLERANCE_MAX_SCORE[risk_tolerance]))
+        and (chain is None or (row["chain"] or "").lower() == chain.lower())
+        and (stablecoin is None or row["stablecoin"] == stablecoin)
+    ]
+    scored = sorted((row for row in matches if row["final_score"] is not None), key=lambda row: -row["final_score"])
+    unscored = [row for row in matches if row["final_score"] is None]
+    return [row["pool_id"] for row in (scored + unscored)[:n]]
+
+
+@pytest.mark.parametrize("risk_tolerance", [None, "low", "medium", "high"])
+@pytest.mark.parametrize("chain", [None, "ethereum", "Base"])
+@pytest.mark.parametrize("stablecoin", [None, True, False])
+def test_top_matches_sort_and_filter(risk_tolerance, chain, stablecoin):
+    rows = make_rows()
+    index = RankedPoolIndex.build(rows)
+    for n in (1, 10, 1000):
+        got = [record["pool_id"] for record in index.top(n, risk_tolerance, chain, stablecoin)]
+        assert got == reference_top(rows, n, risk_tolerance, chain, stablecoin)
+
+
+def test_unknown_filters():
+    index = RankedPoolIndex.build(make_rows())
+    assert index.top(10, chain="solana") == []
+    with pytest.raises(ValueError):
+        index.top(10, risk_tolerance="yolo")
+
+
+def test_holder_rebuilds_only_on_a_new_version(monkeypatch):
+    versions = [4]
+    loads = []
+
+    async def fake_state(dataset):
+        return versions[0], "0/16B3748"
+
+    async def loader(lsn):
+        assert lsn == "0/16B3748"
+        loads.append(versions[0])
+        return make_rows(20)
+
+    monkeypatch.setattr(ranked_index_module, "get_dataset_state", fake_state)
+    holder = RankedIndexHolder(loader, check_interval=0)
+
+    async def scenario():
+        first = await holder.get()
+        assert first.version == 4 and len(first) == 20
+        assert await holder.get() is first
+
+        versions[0] = 5
+        # The old index is served while the rebuild runs in the background
+        assert await holder.get() is first
+        await holder._rebuild
+        assert (await holder.get()).version == 5
+
+    asyncio.run(scenario())
+    assert loads == [4, 5]
@@ -0,0 +1,118 @@
+"""
+materialize_recommendations against Postgres: INSERT_SQL, the replace
+path, and the advisory lock that serializes overlapping runs.
+
+Every test runs in a transaction that is rolled back (the function's
+commit only releases a savepoint). Needs the database from the environment
+with migrations applied; skipped when it can't be reached.
+"""
+import os
+import sys
+import threading
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+try:
+    # Importing the models runs create_all, which already needs the database
+    from app.db import engine
+    from app.models.models import Pool, Protocol, Recommendation, User
+    from app.services.recommendations import MATERIALIZE_LOCK_KEY, materialize_recommendations
+except OperationalError:
+    pytest.skip("database not reachable", allow_module_level=True)
+
+TOP_K = 3
+
+
+@pytest.fixture
+def db():
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+def seed(db):
+    protocol = Protocol(slug=f"test-{uuid.uuid4().hex[:8]}", name="Test")
+    db.add(protocol)
+    db.flush()
+    pools = [
+        Pool(pool_id=uuid.uuid4(), protocol_id=protocol.id, chain="Ethereum", project=protocol.slug, symbol="USDC",
+             apy=apy, tvl_usd=1e6, risk_score=risk, final_score=final, stablecoin=True, il_risk="no", outlier=False,
+             breakdown={"apy": apy})
+        # Scores far above real pools', so these outrank whatever else the table holds
+        for apy, risk, final in [(4.0, 20, 9000.0), (6.0, 25, 8000.0), (8.0, 30, 7000.0), (9.0, 35, 6000.0),
+                                 (50.0, 90, 9900.0)]
+    ]
+    users = [
+        User(username=f"u{i}", email=f"{uuid.uuid4().hex}@example.com", password_hash="x",
+             risk_tolerance="low", experience_level="beginner", primary_goal="balanced")
+        for i in range(4)
+    ]
+    db.add_all(pools + users)
+    db.flush()
+    return pools, users
+
+
+def user_rows(db, users):
+    return db.execute(
+        select(Recommendation.user_id, Recommendation.pool_id, Recommendation.apy, Recommendation.breakdown)
+        .where(Recommendation.user_id.in_([u.id for u in users]))
+        .order_by(Recommendation.user_id, Recommendation.score.desc())
+    ).all()
+
+
+def test_insert_writes_each_users_top_k_with_pool_columns(db):
+    pools, users = seed(db)
+    materialize_recommendations(db, top_k=TOP_K)
+
+    rows = user_rows(db, users)
+    assert len(rows) == len(users) * TOP_K
+    # Low risk tolerance drops the risk-90 pool; the rest rank by final_score
+    expected = [pools[0].id, pools[1].id, pools[2].id]
+    for user in users:
+        mine = [row for row in rows if row.user_id == user.id]
+        assert [row.pool_id for row in mine] == expected
+        assert [float(row.apy) for row in mine] == [4.0, 6.0, 8.0]
+        assert mine[0].breakdown == {"apy": 4.0}
+
+
+def test_rerun_replaces_instead_of_appending(db):
+    pools, users = seed(db)
+    materialize_recommendations(db, top_k=TOP_K)
+    pools[3].final_score = 9500.0
+    db.flush()
+    materialize_recommendations(db, top_k=TOP_K)
+
+    rows = user_rows(db, users)
+    assert len(rows) == len(users) * TOP_K
+    assert rows[0].pool_id == pools[3].id
+
+
+def test_overlapping_runs_wait_for_the_lock(db):
+    seed(db)
+    holder = engine.connect()
+    holder_transaction = holder.begin()
+    holder.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MATERIALIZE_LOCK_KEY})
+
+    run = threading.Thread(target=materialize_recommendations, args=(db, TOP_K))
+    run.start()
+    run.join(timeout=1)
+    blocked = run.is_alive()
+    # Ending the other transaction releases its lock
+    holder_transaction.rollback()
+    holder.close()
+    run.join(timeout=30)
+
+    assert blocked
+    assert not run.is_alive()
+    assert db.execute(select(func.count()).select_from(Recommendation)).scalar() > 0
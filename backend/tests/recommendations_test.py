@@ -0,0 +1,71 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.recommendations import (
+    APY_BONUS_CAP, EXPERIENCE_LEVELS, GOAL_WEIGHTS, Cohort, PoolArrays, cohort_for, goal_profile, rank_cohort
+)
+from app.services.ranked_index import RISK_TOLERANCE_MAX_SCORE
+
+
+def make_pools(count=400, seed=5):
+    rng = random.Random(seed)
+    return PoolArrays(
+        ids=np.arange(100, 100 + count, dtype=np.int64),
+        apy=np.array([rng.choice([np.nan, rng.uniform(0, 300)]) for _ in range(count)]),
+        tvl_usd=np.array([rng.uniform(0, 1e10) for _ in range(count)]),
+        risk_score=np.array([np.nan if i % 40 == 0 else round(rng.uniform(5, 95), 1) for i in range(count)]),
+        # Integer scores so cohorts see plenty of ties
+        final_score=np.array([np.nan if i % 33 == 0 else float(rng.randint(-20, 60)) for i in range(count)]),
+        stablecoin=np.array([rng.random() < 0.4 for _ in range(count)]),
+        il_risk=np.array([rng.random() < 0.3 for _ in range(count)]),
+        outlier=np.array([rng.random() < 0.1 for _ in range(count)]),
+    )
+
+
+def reference_rank(pools, cohort, top_k):
+    apy_weight, risk_weight, stable_bonus = GOAL_WEIGHTS[cohort.goal]
+    scored = []
+    for i in range(len(pools.ids)):
+        if np.isnan(pools.final_score[i]) or not pools.risk_score[i] <= RISK_TOLERANCE_MAX_SCORE[cohort.risk_tolerance]:
+            continue
+        if cohort.experience_level != "advanced" and pools.outlier[i]:
+            continue
+        if cohort.experience_level == "beginner" and pools.il_risk[i]:
+            continue
+        apy = 0 if np.isnan(pools.apy[i]) else min(max(pools.apy[i], 0), APY_BONUS_CAP)
+        score = (pools.final_score[i] + apy_weight * apy - risk_weight * pools.risk_score[i]
+                 + stable_bonus * pools.stablecoin[i])
+        scored.append((-score, pools.ids[i]))
+    return [pool_id for _, pool_id in sorted(scored)[:top_k]]
+
+
+@pytest.mark.parametrize("cohort", [
+    Cohort(risk, experience, goal)
+    for risk in RISK_TOLERANCE_MAX_SCORE for experience in EXPERIENCE_LEVELS for goal in GOAL_WEIGHTS
+])
+def test_rank_cohort_matches_reference(cohort):
+    pools = make_pools()
+    for top_k in (1, 5, 1000):
+        best, scores = rank_cohort(pools, cohort, top_k)
+        assert pools.ids[best].tolist() == reference_rank(pools, cohort, top_k)
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_profiles_normalize_into_cohorts():
+    assert cohort_for("low", "beginner", "earn steady, low-risk yield") == Cohort("low", "beginner", "steady")
+    assert cohort_for(" HIGH ", "Advanced", "Maximize returns") == Cohort("high", "advanced", "growth")
+    assert cohort_for(None, "guru", None) == Cohort("low", "beginner", "balanced")
+    assert goal_profile("long-term growth, but stable") == "growth"
+    assert goal_profile("preserve capital") == "steady"
+
+
+def test_tvl_score_matches_scorer_scale():
+    pools = make_pools(3)
+    pools.tvl_usd = np.array([0.0, 99.0, 1e12])
+    assert pools.tvl_score().tolist() == [0.0, 40.0, 100.0]
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sys
+
+import redis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.responses import decompress
+from app.services.response_cache import (
+    STATS_KEY, ResponseCache, bump_dataset_version, dataset_etag, get_dataset_state
+)
+
+
+class DictRedis:
+    """Sync INCR/SET pipelines and async MGET over one dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def incr(self, key):
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def pipeline(self, transaction=True):
+        store, ops = self, []
+
+        class Pipeline:
+            def set(self, key, value):
+                ops.append(lambda: store.data.update({key: value.encode()}))
+
+            def incr(self, key):
+                ops.append(lambda: store.incr(key))
+
+            def execute(self):
+                return [op() for op in ops]
+
+        return Pipeline()
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+
+class AsyncDictRedis:
+    """The async pipeline ResponseCache.set writes through, over a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        store, ops = self, []
+
+        class Pipeline:
+            def set(self, key, value, ex=None):
+                ops.append(lambda: store.data.update({key: value}))
+
+            def hincrby(self, key, field, amount):
+                hash_ = store.data.setdefault(key, {})
+                ops.append(lambda: hash_.update({field: hash_.get(field, 0) + amount}))
+
+            async def execute(self):
+                return [op() for op in ops]
+
+        return Pipeline()
+
+
+class DownRedis:
+    async def mget(self, keys):
+        raise redis.ConnectionError("down")
+
+    async def hgetall(self, key):
+        raise redis.ConnectionError("down")
+
+
+def test_key_ignores_parameter_order_and_unset_values():
+    a = ResponseCache.entry_key("pools", 3, {"chain": "Base", "limit": 50, "cursor": None})
+    b = ResponseCache.entry_key("pools", 3, {"limit": 50, "chain": "Base"})
+    assert a == b
+    assert a != ResponseCache.entry_key("pools", 3, {"limit": 51, "chain": "Base"})
+
+
+def test_key_changes_with_dataset_version():
+    params = {"sort_by": "apy", "fields": ["pool_id", "apy"]}
+    assert ResponseCache.entry_key("pools", 3, params) != ResponseCache.entry_key("pools", 4, params)
+    assert ResponseCache.entry_key("pools", 4, params).startswith("yieldsync:response:pools:4:")
+
+
+def test_etag_follows_version_query_and_encoding():
+    params = {"chain": "Base", "limit": 50}
+    etag = dataset_etag("pools", 7, params, "br")
+    assert etag == dataset_etag("pools", 7, {"limit": 50, "chain": "Base", "cursor": None}, "br")
+    assert etag.startswith('"pools-7-') and etag.endswith('-br"')
+    assert etag != dataset_etag("pools", 8, params, "br")
+    assert etag != dataset_etag("pools", 7, params, "gzip")
+    assert dataset_etag("pools", 7, params).endswith('-identity"')
+    assert dataset_etag("pools", 7, params, weak=True).startswith('W/"pools-7-')
+
+
+def test_version_is_published_with_the_primary_wal_position():
+    client = DictRedis()
+    assert asyncio.run(get_dataset_state("pools", client)) == (0, None)
+    assert bump_dataset_version("pools", client) == 1
+    assert asyncio.run(get_dataset_state("pools", client)) == (1, None)
+    assert bump_dataset_version("pools", client, lsn="0/16B3748") == 2
+    assert asyncio.run(get_dataset_state("pools", client)) == (2, "0/16B3748")
+    assert asyncio.run(get_dataset_state("pools", DownRedis())) == (-1, None)
+
+
+def test_set_compresses_the_negotiated_encoding_first_and_the_rest_in_the_background():
+    client = AsyncDictRedis()
+    cache = ResponseCache(client=client, ttl=60)
+    body = b'{"pools":[]}' * 500
+    params = {"limit": 50}
+
+    async def run():
+        bodies = await cache.set("pools", 3, params, body, "gzip")
+        assert list(bodies) == ["gzip"]
+        assert cache.entry_key("pools", 3, params, "br") not in client.data
+        await asyncio.gather(*cache._background)
+        # Identity clients get nothing back; both encodings are still cached
+        assert await cache.set("pools", 3, {"limit": 10}, body) == {}
+        await asyncio.gather(*cache._background)
+
+    asyncio.run(run())
+    assert decompress(client.data[cache.entry_key("pools", 3, params, "br")], "br") == body
+    assert decompress(client.data[cache.entry_key("pools", 3, {"limit": 10}, "gzip")], "gzip") == body
+    # One miss per stored response, not per encoding
+    assert client.data[STATS_KEY] == {"pools.misses": 2}
+
+
+def test_stats_are_empty_while_redis_is_down():
+    stats = asyncio.run(ResponseCache(client=DownRedis()).stats())
+    assert stats["pools"] == {"requests": 0, "hits": 0, "misses": 0, "hit_ratio": None}
@@ -0,0 +1,51 @@
+import os
+import sys
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.responses import compress, decompress, dumps, encoded_response, etag_matches, negotiate_encoding
+
+
+def test_negotiate_prefers_brotli_and_respects_q0():
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip") == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("*") == "br"
+    # The wildcard only covers encodings that weren't refused
+    assert negotiate_encoding("br;q=0, *") == "gzip"
+    assert negotiate_encoding("*, br;q=0") == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0, *") is None
+
+
+def test_etag_matching_is_weak():
+    etag = '"pools-3-abc-br"'
+    assert etag_matches('"pools-3-abc-br"', etag)
+    assert etag_matches('W/"pools-3-abc-br", "other"', etag)
+    assert etag_matches('"x", W/"pools-3-abc-br"', 'W/"pools-3-abc-br"')
+    assert etag_matches("*", etag)
+    assert not etag_matches('"pools-4-abc-br"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_dumps_handles_decimals_and_numpy():
+    assert dumps({"apy": Decimal("1.5"), "tvl": np.float64(2.0), "n": np.arange(2)}) == b'{"apy":1.5,"tvl":2.0,"n":[0,1]}'
+
+
+def test_encoded_response_picks_the_negotiated_body():
+    body = b'{"pools":[]}' * 200
+    bodies = {encoding: compress(body, encoding) for encoding in ("br", "gzip")}
+    assert decompress(bodies["br"], "br") == body
+
+    response = encoded_response(bodies, "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.body == bodies["gzip"]
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    identity = encoded_response({"gzip": bodies["gzip"]}, None)
+    assert "content-encoding" not in identity.headers
+    assert identity.body == body
@@ -0,0 +1,151 @@
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import redis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rolling_metrics import RollingApyState, RollingApyStore, apply_rolling_metrics
+
+
+def reference(apy_by_day, base_by_day, day):
+    """Recompute every metric from the full history of one pool."""
+    now = apy_by_day.get(day)
+    covered = day - min(apy_by_day) + 1 >= 30
+
+    def pct(n):
+        past = apy_by_day.get(day - n)
+        return math.nan if now is None or past is None else now - past
+
+    window = [v for d, v in apy_by_day.items() if day - 30 < d <= day and v is not None]
+    bases = [v for v in base_by_day.values() if v is not None]
+    return {
+        "apyPct1D": pct(1),
+        "apyPct7D": pct(7),
+        "apyPct30D": pct(30),
+        "apyMean30d": sum(window) / len(window) if window and covered else math.nan,
+        "apyBaseInception": sum(bases) / len(bases) if bases else math.nan,
+    }
+
+
+def test_incremental_matches_full_recompute():
+    rng = random.Random(7)
+    pool_ids = [f"pool-{i}" for i in range(40)]
+    state = RollingApyState()
+    history = {p: ({}, {}) for p in pool_ids}
+    day = 19000
+    for _ in range(300):
+        day += rng.choice([0, 0, 1, 1, 1, 2, 5])
+        seen = [p for p in pool_ids if rng.random() < 0.8]
+        apy = [rng.choice([None, round(rng.uniform(0, 50), 3)]) for _ in seen]
+        base = [rng.choice([None, round(rng.uniform(0, 20), 3)]) for _ in seen]
+        metrics = state.update(seen, apy, base, day)
+        for i, (pool_id, a, b) in enumerate(zip(seen, apy, base)):
+            history[pool_id][0][day] = a
+            history[pool_id][1][day] = b
+            expected = reference(*history[pool_id], day)
+            for field, value in expected.items():
+                np.testing.assert_allclose(metrics[field][i], value, rtol=1e-9, atol=1e-9, err_msg=field)
+
+
+def test_apply_falls_back_to_feed_values_and_survives_round_trip():
+    feed = {"apyPct1D": 0.3, "apyPct30D": -1.0, "apyMean30d": 4.2, "apyBaseInception": 3.9}
+    pools = [{"pool": "a", "apy": 5.0, "apyBase": 4.0, **feed}]
+    state = RollingApyState()
+    apply_rolling_metrics(pools, state, day=100)
+    # No history yet: the feed's own values are kept
+    assert pools[0]["apyPct1D"] == 0.3 and pools[0]["apyMean30d"] == 4.2
+
+    state = RollingApyState.from_bytes(state.to_bytes())
+    pools = [{"pool": "a", "apy": 6.5, "apyBase": 2.0, **feed}]
+    apply_rolling_metrics(pools, state, day=101)
+    assert pools[0]["apyPct1D"] == 1.5
+    assert pools[0]["apyPct30D"] == -1.0
+    # Two days don't make a 30-day mean, and the feed knows the real inception
+    assert pools[0]["apyMean30d"] == 4.2
+    assert pools[0]["apyBaseInception"] == 3.9
+
+    pools = [{"pool": "a", "apy": 6.5, "apyBase": 2.0, "apyMean30d": None}]
+    apply_rolling_metrics(pools, state, day=101)
+    assert pools[0]["apyMean30d"] is None
+    assert pools[0]["apyBaseInception"] == 3.0
+
+
+def test_mean_replaces_the_feed_once_the_window_is_covered():
+    state = RollingApyState()
+    for day in range(100, 129):
+        pools = [{"pool": "a", "apy": float(day - 99), "apyMean30d": -1.0}]
+        apply_rolling_metrics(pools, state, day=day)
+        assert pools[0]["apyMean30d"] == -1.0
+    pools = [{"pool": "a", "apy": 30.0, "apyMean30d": -1.0}]
+    apply_rolling_metrics(pools, state, day=129)
+    assert pools[0]["apyMean30d"] == 15.5
+
+
+def test_pools_not_seen_for_a_month_are_pruned():
+    state = RollingApyState()
+    apply_rolling_metrics([{"pool": "a", "apy": 1.0}, {"pool": "b", "apy": 2.0}], state, day=0)
+    apply_rolling_metrics([{"pool": "b", "apy": 2.0}], state, day=40)
+    assert state.pool_ids.tolist() == ["b"]
+
+
+class FakeLock:
+    """redis-py Lock calls RollingApyStore makes, without Lua scripts."""
+
+    def __init__(self):
+        self.acquired = self.released = False
+        self.renewals = 0
+        self.lost = False
+
+    def acquire(self):
+        self.acquired = True
+        return True
+
+    def reacquire(self):
+        self.renewals += 1
+
+    def owned(self):
+        return not self.lost
+
+    def release(self):
+        self.released = True
+        if self.lost:
+            raise redis.exceptions.LockNotOwnedError("expired")
+
+
+class LockingRedis:
+    def __init__(self):
+        self.data, self.locks = {}, []
+
+    def lock(self, name, timeout=None, blocking_timeout=None):
+        self.locks.append(FakeLock())
+        return self.locks[-1]
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+def test_lock_is_renewed_while_held_and_released():
+    client = LockingRedis()
+    store = RollingApyStore(client=client)
+    with store.lock(ttl=0.03) as lock:
+        time.sleep(0.1)
+        assert store.save(store.load(), lock)
+    assert lock.renewals >= 2 and lock.released
+    assert store.key in client.data
+
+
+def test_state_is_not_saved_once_the_lock_was_lost():
+    client = LockingRedis()
+    store = RollingApyStore(client=client)
+    with store.lock() as lock:
+        lock.lost = True
+        assert not store.save(RollingApyState(), lock)
+    assert store.key not in client.data
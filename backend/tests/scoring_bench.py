@@ -0,0 +1,55 @@
+"""
+Benchmark: per-pool scoring (score_defillama_pool + sorted) against the
+vectorized batch scorer (score_pools_batch + argpartition top-N).
+
+Run from the backend directory:
+    python tests/scoring_bench.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.batch_scorer import pools_to_columns, score_columns, top_n_indices
+from app.services.rec_engine import score_defillama_pool
+from pool_factory import make_pools
+
+SIZES = [1_000, 10_000, 50_000]
+TOP_N = 5
+REPEATS = 3
+
+
+def best_of(fn, repeats=REPEATS):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_pool(pools):
+    scored = [score_defillama_pool(pool) for pool in pools]
+    return sorted(scored, key=lambda x: x["final_score"], reverse=True)[:TOP_N]
+
+
+def batch(pools):
+    scores = score_columns(pools_to_columns(pools))
+    return top_n_indices(scores.final_score, TOP_N)
+
+
+if __name__ == "__main__":
+    print(f"{'pools':>8} {'per-pool ms':>12} {'batch ms':>10} {'(columns)':>10} {'(score+topN)':>13} {'speedup':>8}")
+    for n in SIZES:
+        pools = make_pools(n)
+        t_loop = best_of(lambda: per_pool(pools))
+        t_batch = best_of(lambda: batch(pools))
+        t_cols = best_of(lambda: pools_to_columns(pools))
+        cols = pools_to_columns(pools)
+        t_score = best_of(lambda: top_n_indices(score_columns(cols).final_score, TOP_N))
+        print(
+            f"{n:>8} {t_loop * 1e3:>12.1f} {t_batch * 1e3:>10.1f} "
+            f"{t_cols * 1e3:>10.1f} {t_score * 1e3:>13.2f} {t_loop / t_batch:>7.1f}x"
+        )
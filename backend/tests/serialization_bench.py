@@ -0,0 +1,92 @@
+"""
+Benchmark: encoding a 10k-pool /pools response (every column) the old way,
+jsonable_encoder + JSONResponse over rows holding Decimals and UUIDs, against
+the orjson path over the rows the float/text-cast query returns now. Then
+bytes on the wire and compression time for gzip and brotli.
+
+Needs the database settings in the environment (the models are imported).
+
+    python tests/serialization_bench.py --pools 10000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import compress, dumps
+from app.services.ingestion import build_pool_rows
+from app.services.pool_listing import POOL_FIELDS
+from pool_factory import make_pools
+
+REPEAT = 5
+NUMERIC_FIELDS = [name for name in POOL_FIELDS if type(POOL_FIELDS[name].type).__name__ == "Numeric"]
+
+
+def api_rows(count):
+    """Rows as the driver returns them: with Decimals and UUIDs, and as cast floats/strings."""
+    now = datetime.utcnow()
+    rows = build_pool_rows(make_pools(count), [1] * count)
+    decimal_rows, float_rows = [], []
+    for i, row in enumerate(rows):
+        row = {name: row.get(name) for name in POOL_FIELDS}
+        row.update(id=i + 1, created_at=now, updated_at=now)
+        as_decimal = {**row, "pool_id": uuid.UUID(row["pool_id"])}
+        as_float = dict(row)
+        for name in NUMERIC_FIELDS:
+            if row[name] is not None:
+                as_decimal[name] = Decimal(str(row[name]))
+                as_float[name] = float(row[name])
+        decimal_rows.append(as_decimal)
+        float_rows.append(as_float)
+    return decimal_rows, float_rows
+
+
+def best_of(fn, *args):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def default_path(rows):
+    return JSONResponse(jsonable_encoder({"pools": rows, "next_cursor": None})).body
+
+
+def orjson_path(rows):
+    return dumps({"pools": rows, "next_cursor": None})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pools", type=int, default=10_000)
+    args = parser.parse_args()
+
+    decimal_rows, float_rows = api_rows(args.pools)
+    print(f"{args.pools} pools, {len(POOL_FIELDS)} columns, best of {REPEAT}")
+
+    for name, fn, rows in [
+        ("jsonable_encoder + json (Decimal rows)", default_path, decimal_rows),
+        ("orjson (Decimal rows, default hook)", orjson_path, decimal_rows),
+        ("orjson (float rows from SQL casts)", orjson_path, float_rows),
+    ]:
+        elapsed, body = best_of(fn, rows)
+        print(f"  {name:40s} {elapsed * 1e3:8.1f} ms  {len(body) / 1e6:6.2f} MB")
+
+    body = orjson_path(float_rows)
+    print("Bytes on the wire")
+    print(f"  {'identity':40s} {'':8s}     {len(body) / 1e6:6.2f} MB")
+    for encoding in ("gzip", "br"):
+        elapsed, compressed = best_of(compress, body, encoding)
+        print(f"  {encoding:40s} {elapsed * 1e3:8.1f} ms  {len(compressed) / 1e6:6.2f} MB"
+              f"  ({len(body) / len(compressed):.1f}x)")
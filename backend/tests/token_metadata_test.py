@@ -0,0 +1,139 @@
+import asyncio
+import os
+import sys
+import uuid
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete
+from sqlalchemy.exc import OperationalError
+
+from app.services import http_client
+
+try:
+    # Importing the models runs create_all, which already needs the database
+    from app.db import AsyncSessionLocal
+    from app.models.models import TokenMetadata
+    from app.services.token_metadata import TokenMetadataCache, batch_payloads, clean_metadata, rpc_batch
+except OperationalError:
+    pytest.skip("database not reachable", allow_module_level=True)
+
+URL = "https://eth-mainnet.g.alchemy.com/v2/test"
+
+
+def test_batch_payloads_chunk_and_number_calls():
+    payloads = batch_payloads("alchemy_getTokenMetadata", [[f"0x{i}"] for i in range(250)], batch_size=100)
+    assert [len(p) for p in payloads] == [100, 100, 50]
+    assert [call["id"] for p in payloads for call in p] == list(range(250))
+    assert payloads[2][0] == {"jsonrpc": "2.0", "id": 200, "method": "alchemy_getTokenMetadata", "params": ["0x200"]}
+
+
+def test_rpc_batch_drops_failed_calls_and_chunks(monkeypatch):
+    posts = []
+
+    async def apost(url, json=None, **kwargs):
+        posts.append(len(json))
+        request = httpx.Request("POST", url)
+        if json[0]["id"] == 0:
+            return httpx.Response(429, json={"error": "rate limited"}, request=request)
+        return httpx.Response(200, request=request, json=[
+            {"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32602}} if call["id"] == 150 else
+            {"jsonrpc": "2.0", "id": call["id"], "result": {"symbol": call["params"][0]}}
+            for call in json
+        ])
+
+    monkeypatch.setattr(http_client, "apost", apost)
+    results = asyncio.run(rpc_batch(URL, "alchemy_getTokenMetadata", [[f"0x{i}"] for i in range(200)]))
+    assert sorted(posts) == [100, 100]
+    # First chunk failed as a whole, call 150 on its own
+    assert sorted(results) == [i for i in range(100, 200) if i != 150]
+    assert results[120] == {"symbol": "0x120"}
+
+
+def test_cached_tokens_need_no_query_or_rpc():
+    calls = []
+
+    async def fetcher(chain, addresses):
+        calls.append(addresses)
+        return {address: {"name": "Token", "symbol": "TKN", "decimals": 6, "logo": None} for address in addresses}
+
+    class NoDB:
+        async def execute(self, *args, **kwargs):
+            raise AssertionError("queried the database")
+
+    cache = TokenMetadataCache(maxsize=10, fetcher=fetcher)
+    cache._local[("ethereum", "0xabc")] = {"name": "Cached", "symbol": "C", "decimals": 18, "logo": None}
+    found = asyncio.run(cache.get_many(NoDB(), "ethereum", ["0xABC", "0xabc"]))
+    assert found == {"0xabc": {"name": "Cached", "symbol": "C", "decimals": 18, "logo": None}}
+    assert calls == []
+
+
+SPAM = {"name": "Visit claim-rewards.example\x00" * 500, "symbol": "$" * 1000,
+        "decimals": 10 ** 30, "logo": "https://example.com/" + "a" * 5000}
+
+
+def test_clean_metadata_strips_nul_and_drops_bad_decimals():
+    cleaned = clean_metadata(SPAM)
+    assert "\x00" not in cleaned["name"] and len(cleaned["name"]) == 27 * 500
+    assert cleaned["decimals"] is None
+    assert clean_metadata({"name": None, "symbol": 5, "decimals": 6})["decimals"] == 6
+    assert clean_metadata({"decimals": -1}) == {"name": None, "symbol": None, "decimals": None, "logo": None}
+
+
+def test_spam_token_is_stored_and_served():
+    chain = f"test-{uuid.uuid4().hex[:8]}"
+    address = "0x" + "5" * 40
+    calls = []
+
+    async def fetcher(chain, addresses):
+        calls.append(addresses)
+        return {address: clean_metadata(SPAM) for address in addresses}
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            try:
+                found = await TokenMetadataCache(maxsize=10, fetcher=fetcher).get_many(db, chain, [address])
+                # A fresh process finds it in the table instead of asking Alchemy again
+                again = await TokenMetadataCache(maxsize=10, fetcher=fetcher).get_many(db, chain, [address])
+                return found, again
+            finally:
+                await db.execute(delete(TokenMetadata).where(TokenMetadata.chain == chain))
+                await db.commit()
+
+    found, again = asyncio.run(run())
+    assert found[address]["symbol"] == "$" * 1000 and found[address]["decimals"] is None
+    assert again == found
+    assert calls == [[address]]
+
+
+def test_failed_write_still_returns_fetched_metadata():
+    async def fetcher(chain, addresses):
+        return {address: {"name": "Token", "symbol": "TKN", "decimals": 6, "logo": None} for address in addresses}
+
+    class BrokenDB:
+        rolled_back = False
+
+        async def execute(self, statement, *args, **kwargs):
+            if args:
+                raise OperationalError("INSERT", {}, Exception("value too long"))
+
+            class Empty:
+                def scalars(self):
+                    return self
+
+                def all(self):
+                    return []
+
+            return Empty()
+
+        async def rollback(self):
+            self.rolled_back = True
+
+    db = BrokenDB()
+    cache = TokenMetadataCache(maxsize=10, fetcher=fetcher)
+    found = asyncio.run(cache.get_many(db, "ethereum", ["0xABC"]))
+    assert found == {"0xabc": {"name": "Token", "symbol": "TKN", "decimals": 6, "logo": None}}
+    assert db.rolled_back
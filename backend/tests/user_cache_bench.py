@@ -0,0 +1,127 @@
+"""
+Benchmark: /users/me and /wallets/me throughput with the token -> user
+cache on and off (USER_CACHE_ENABLED). Starts the real app with uvicorn on
+--port for each setting; needs the database and Redis from the environment.
+Signs up a throwaway user with one wallet and deletes them afterwards.
+
+    python tests/user_cache_bench.py --clients 50 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIENT_TIMEOUT = 10
+
+
+async def load(url: str, headers: dict, clients: int, seconds: float):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(limits=limits, timeout=CLIENT_TIMEOUT, headers=headers) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    (await client.get(url)).raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(clients)])
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def report(name, latencies, errors, elapsed):
+    if not latencies:
+        print(f"  {name:24s} no successful requests ({errors} errors)")
+        return
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"  {name:24s} {len(latencies) / elapsed:8.1f} req/s   p50 {statistics.median(latencies) * 1e3:7.1f} ms"
+          f"   p99 {p99 * 1e3:7.1f} ms   errors {errors}")
+
+
+def start_server(port: int, cache_enabled: bool) -> subprocess.Popen:
+    env = {**os.environ, "USER_CACHE_ENABLED": str(cache_enabled).lower()}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "critical",
+         "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline and server.poll() is None:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=5)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("benchmark server did not start")
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def create_bench_user(base_url: str) -> dict:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    signup = httpx.post(f"{base_url}/users/signup", json={"username": "bench", "email": email, "password": "bench"})
+    signup.raise_for_status()
+    headers = {"Authorization": f"Bearer {signup.json()['access_token']}"}
+    wallet = {"address": f"0x{uuid.uuid4().hex}{uuid.uuid4().hex[:8]}", "chain": "ethereum"}
+    httpx.post(f"{base_url}/wallets/me", json=wallet, headers=headers).raise_for_status()
+    return headers
+
+
+def delete_bench_user(base_url: str, headers: dict):
+    for wallet in httpx.get(f"{base_url}/wallets/me", headers=headers).json()["wallets"]:
+        httpx.delete(f"{base_url}/wallets/{wallet['id']}", headers=headers)
+    from app.db import SessionLocal
+    from app.models.models import User
+    db = SessionLocal()
+    user_id = httpx.get(f"{base_url}/users/me", headers=headers).json()["id"]
+    db.query(User).filter(User.id == user_id).delete()
+    db.commit()
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8798)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    headers = None
+    print(f"{args.clients} clients, {args.seconds:.0f}s per endpoint")
+    for cache_enabled in (False, True):
+        server = start_server(args.port, cache_enabled)
+        try:
+            headers = headers or create_bench_user(base_url)
+            print(f"user cache {'on' if cache_enabled else 'off'}")
+            for path in ("/users/me", "/wallets/me"):
+                report(path, *asyncio.run(load(base_url + path, headers, args.clients, args.seconds)))
+            if cache_enabled:
+                delete_bench_user(base_url, headers)
+        finally:
+            stop_server(server)
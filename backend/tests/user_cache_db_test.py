@@ -0,0 +1,77 @@
+"""
+User cache invalidation against Postgres: updates and deletes evict the
+user only once the session commits. Every test runs in a transaction that
+is rolled back; skipped when the database can't be reached.
+"""
+import os
+import sys
+import time
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+try:
+    from app.db import engine
+    from app.models.models import User
+    from app.services import user_cache as user_cache_module
+    from app.services.user_cache import UserCache, UserSnapshot
+except OperationalError:
+    pytest.skip("database not reachable", allow_module_level=True)
+
+
+@pytest.fixture
+def db():
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = UserCache(enabled=True, maxsize=100, ttl=60, use_redis=False)
+    monkeypatch.setattr(user_cache_module, "user_cache", cache)
+    return cache
+
+
+def cached_user(db, cache):
+    user = User(username="cached", email=f"{uuid.uuid4().hex}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    cache.put("token", UserSnapshot.from_user(user), time.time() + 3600)
+    return user
+
+
+def test_update_evicts_on_commit_not_on_flush(db, cache):
+    user = cached_user(db, cache)
+    user.risk_tolerance = "high"
+    db.flush()
+    assert cache.get("token") is not None
+    db.commit()
+    assert cache.get("token") is None
+
+
+def test_delete_evicts_on_commit(db, cache):
+    user = cached_user(db, cache)
+    db.delete(user)
+    db.flush()
+    assert cache.get("token") is not None
+    db.commit()
+    assert cache.get("token") is None
+
+
+def test_rolled_back_update_keeps_the_entry(db, cache):
+    user = cached_user(db, cache)
+    user.risk_tolerance = "high"
+    db.flush()
+    db.rollback()
+    db.commit()
+    assert cache.get("token") is not None
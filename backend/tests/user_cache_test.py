@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.user_cache import UserCache, UserSnapshot
+
+ALICE = UserSnapshot(1, "alice", "alice@example.com", "growth", "high", "advanced")
+BOB = UserSnapshot(2, "bob", "bob@example.com")
+
+
+def make_cache(**kwargs):
+    return UserCache(**{"enabled": True, "maxsize": 100, "ttl": 60, "use_redis": False, **kwargs})
+
+
+def test_hit_after_put():
+    cache = make_cache()
+    assert cache.get("token-a") is None
+    cache.put("token-a", ALICE, time.time() + 3600)
+    assert cache.get("token-a") == ALICE
+    assert cache.get("token-b") is None
+
+
+def test_entries_never_outlive_the_token():
+    cache = make_cache()
+    cache.put("expired", ALICE, time.time() - 1)
+    cache.put("no-exp", BOB)
+    assert cache.get("expired") is None
+    assert cache.get("no-exp") == BOB
+
+
+def test_entries_expire_after_ttl():
+    cache = make_cache(ttl=0)
+    cache.put("token-a", ALICE, time.time() + 3600)
+    assert cache.get("token-a") is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = make_cache(enabled=False)
+    cache.put("token-a", ALICE, time.time() + 3600)
+    assert cache.get("token-a") is None
+
+
+def test_invalidate_drops_only_that_users_tokens():
+    cache = make_cache()
+    exp = time.time() + 3600
+    cache.put("alice-laptop", ALICE, exp)
+    cache.put("alice-phone", ALICE, exp)
+    cache.put("bob", BOB, exp)
+    cache.invalidate(ALICE.id)
+    assert cache.get("alice-laptop") is None
+    assert cache.get("alice-phone") is None
+    assert cache.get("bob") == BOB